@@ -0,0 +1,67 @@
+import typing
+
+import numpy as np
+import pandas as pd
+
+
+class OnlineAggregator:
+    """
+    This class aggregates the stats of many simulations, one simulation at
+    a time, without keeping them.
+    For every key (e.g. walker type and step) it keeps the number of
+    simulations, the mean and the sum of squared differences from the mean
+    of every value, and merges every new simulation into them (Chan's
+    pairwise version of Welford's algorithm), so the memory does not grow
+    with the number of simulations.
+    """
+
+    def __init__(self, keys: list[str]) -> None:
+        self.__keys = keys
+        self.__count: typing.Optional[pd.Series] = None
+        self.__mean: typing.Optional[pd.DataFrame] = None
+        self.__m2: typing.Optional[pd.DataFrame] = None
+
+    def add(self, df: pd.DataFrame) -> None:
+        """
+        This method merges the stats of a simulation into the aggregate.
+        Several rows with the same key (e.g. replicas run at once) count as
+        separate simulations.
+        """
+        grouped = df.groupby(self.__keys)
+        count = grouped.size().astype(float)
+        mean = grouped.mean()
+        m2 = grouped.var(ddof=0).mul(count, axis=0)
+        if self.__count is None:
+            self.__count, self.__mean, self.__m2 = count, mean, m2
+            return
+        index = self.__count.index.union(count.index)
+        count_a = self.__count.reindex(index, fill_value=0)
+        count_b = count.reindex(index, fill_value=0)
+        mean_a = self.__mean.reindex(index, fill_value=0)
+        mean_b = mean.reindex(index, fill_value=0)
+        total = count_a + count_b
+        delta = mean_b - mean_a
+        self.__mean = mean_a + delta.mul(count_b / total, axis=0)
+        self.__m2 = self.__m2.reindex(index, fill_value=0) + \
+            m2.reindex(index, fill_value=0) + \
+            (delta ** 2).mul(count_a * count_b / total, axis=0)
+        self.__count = total
+
+    def get_df(self) -> pd.DataFrame:
+        """
+        This method returns, for every key, the mean of every value (under
+        the value's name), its sample variance (_var) and standard error
+        (_sem), and the number of simulations (count).
+        """
+        if self.__count is None:
+            return pd.DataFrame(columns=self.__keys)
+        variance = self.__m2.div(
+            (self.__count - 1).where(self.__count > 1), axis=0)
+        sem = np.sqrt(variance.div(self.__count, axis=0))
+        columns = {}
+        for column in self.__mean.columns:
+            columns[column] = self.__mean[column]
+            columns[f"{column}_var"] = variance[column]
+            columns[f"{column}_sem"] = sem[column]
+        columns["count"] = self.__count.astype(np.int64)
+        return pd.DataFrame(columns).sort_index().reset_index()
@@ -0,0 +1,65 @@
+import argparse
+import time
+
+import numpy as np
+
+import forces
+
+
+def time_solver(solver: forces.ForceSolver, locations: np.ndarray,
+                charges: np.ndarray) -> tuple[float, np.ndarray]:
+    """
+    This function returns the time it took the solver to compute the
+    attractions of all the locations to each other, and the attractions.
+    """
+    start = time.perf_counter()
+    attractions = solver.get_attractions(locations, charges, locations,
+                                         charges)
+    return time.perf_counter() - start, attractions
+
+
+def run_benchmark(sizes: list[int], density: float, seed: int) -> None:
+    """
+    This function compares the approximating force solvers to the direct sum,
+    for dense uniform clouds of mixed charges of the given sizes.
+    """
+    rng = np.random.default_rng(seed)
+    solvers = {"barnes_hut": forces.BarnesHutForceSolver(),
+               "particle_mesh": forces.ParticleMeshForceSolver()}
+    print(f"{'N':>8} {'solver':>14} {'seconds':>10} {'speedup':>9} "
+          f"{'rms error':>10}")
+    for size in sizes:
+        half_side = np.sqrt(size / density) / 2
+        locations = rng.uniform(-half_side, half_side, (size, 2))
+        charges = rng.choice([-1.0, 1.0], size)
+        direct_time, expected = time_solver(forces.DirectForceSolver(),
+                                            locations, charges)
+        print(f"{size:>8} {'direct':>14} {direct_time:>10.3f} "
+              f"{1:>9.1f} {0:>10.4f}")
+        for name, solver in solvers.items():
+            solver_time, attractions = time_solver(solver, locations,
+                                                   charges)
+            error = np.linalg.norm(attractions - expected) / \
+                np.linalg.norm(expected)
+            print(f"{size:>8} {name:>14} {solver_time:>10.3f} "
+                  f"{direct_time / solver_time:>9.1f} {error:>10.4f}")
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    This function parses the arguments from the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the force solvers against the direct sum")
+    parser.add_argument("-n", nargs="+", type=int,
+                        default=[1000, 4000, 16000],
+                        help="Numbers of charged walkers")
+    parser.add_argument("--density", type=float, default=1.0,
+                        help="Walkers per unit area")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    run_benchmark(args.n, args.density, args.seed)
@@ -5,9 +5,22 @@ import typing
 import obstacles
 from obstacles import ObstacleRectangle, ObstacleCircle
 import walker
+import ensemble
+import forces
 import magical_gates
+import spatial_index
 import numpy as np
 
+# the default resolution and margin of the static field grid
+FIELD_GRID_RESOLUTION = 0.25
+FIELD_GRID_MARGIN = 50
+# how far before an obstacle a long step is stopped
+STEP_BACK = 1e-6
+# the default resolution of the distance field, and the max distance from
+# the shapes it keeps (and its default extent reaches)
+DISTANCE_FIELD_RESOLUTION = 0.5
+DISTANCE_FIELD_MARGIN = 64
+
 
 class Board:
     """
@@ -27,21 +40,72 @@ class Board:
     def get_magical_gates(self) -> list[magical_gates.MagicalGate]:
         return self._magical_gates
 
-    def move_walkers(self, rand_walkers: list[walker.Walker]) -> None:
+    def move_walkers(self, rand_walkers: list[walker.Walker],
+                     active: typing.Optional[np.ndarray] = None) -> None:
         raise NotImplementedError("move_walker is not implemented")
 
+    def get_distances(self, locations: np.ndarray) -> np.ndarray:
+        raise NotImplementedError("get_distances is not implemented")
+
 
 class Board2D(Board):
     """
     This class represents a 2D board, which contains obstacles and magical gates.
     """
-    def __init__(self, obstacles: list[dict], magical_gates: list[dict]) -> None:
+    def __init__(self, obstacles: list[dict], magical_gates: list[dict],
+                 force_solver: typing.Optional[forces.ForceSolver] = None,
+                 field_grid: typing.Optional[dict[str, typing.Any]] = None,
+                 distance_field: typing.Optional[
+                     dict[str, typing.Any]] = None) -> None:
         super().__init__()
         self._obstacles_dict = obstacles
         self.__add_obstacles()
         self._magical_gates_dict = magical_gates
         self.__add_magical_gates()
         self.__min_size = self.__min_size_board_shapes()
+        self.__obstacles_grid = spatial_index.UniformGrid(self._obstacles)
+        self.__gates_grid = spatial_index.UniformGrid(self._magical_gates)
+        self.__boxes = np.array([shape.get_bounding_box() for shape
+                                 in self._obstacles + self._magical_gates],
+                                dtype=float).reshape(-1, 4)
+        self._force_solver = force_solver if force_solver is not None \
+            else forces.DirectForceSolver()
+        self.__obstacles_locations, self.__obstacles_charges = \
+            forces.get_charged_obstacles(self._obstacles)
+        self.__static_field = self.__create_static_field(field_grid)
+        # the lattice map is built on the first use by walkers on the lattice
+        self.__lattice_map: typing.Optional[spatial_index.LatticeMap] = None
+        self.__lattice_end_points = np.zeros((0, 2), dtype=np.int32)
+        self.__lattice_map_created = False
+        # the distance field is built on the first distance query. The
+        # steps are checked with it only if it was configured, otherwise it
+        # is built only for the modes which need the distances
+        self.__distance_field_options = distance_field \
+            if distance_field is not None else {}
+        self.__distance_field_checks = distance_field is not None
+        self.__distance_field: typing.Optional[
+            spatial_index.DistanceField] = None
+
+    def __create_static_field(self, field_grid: typing.Optional[
+            dict[str, typing.Any]]) -> typing.Optional[forces.StaticFieldGrid]:
+        """
+        This method precomputes the field of the charged obstacles on a grid,
+        if a grid was requested and there are charged obstacles.
+        The grid covers the given extent, or the charged obstacles with a
+        margin around them.
+        """
+        if field_grid is None or not len(self.__obstacles_charges):
+            return None
+        extent = field_grid.get("extent")
+        if extent is None:
+            corner = np.min(self.__obstacles_locations, axis=0) - \
+                FIELD_GRID_MARGIN
+            edge = np.max(self.__obstacles_locations, axis=0) + \
+                FIELD_GRID_MARGIN
+            extent = [corner[0], corner[1], edge[0], edge[1]]
+        return forces.StaticFieldGrid(
+            self.__obstacles_locations, self.__obstacles_charges, extent,
+            field_grid.get("resolution", FIELD_GRID_RESOLUTION))
 
     def __add_obstacles(self) -> None:
         """
@@ -122,12 +186,25 @@ class Board2D(Board):
             bool):
         """
         This method checks if a location is in an obstacle on the board.
+        Only the obstacles in the location's grid cell are checked.
         """
-        for obstacle in self._obstacles:
+        for obstacle in self.__obstacles_grid.get_candidates(location):
             if obstacle.is_location_in_obstacle(location):
                 return True
         return False
 
+    def __get_gate_of_location(self, location: np.ndarray) -> \
+            typing.Optional[magical_gates.MagicalGate]:
+        """
+        This method returns the first magical gate (in board order) the
+        location is in, or None.
+        Only the gates in the location's grid cell are checked.
+        """
+        for gate in self.__gates_grid.get_candidates(location):
+            if gate.is_location_in_gate(location):
+                return gate
+        return None
+
     def __min_size_board_shapes(self) -> float:
         """
         This method returns the minimum size of the shapes on the board.
@@ -143,55 +220,363 @@ class Board2D(Board):
         min_size = min(list_sizes)
         return float(min_size)
 
-    def __check_big_steps(self, random_walker: walker.Walker,
-                          optional_location: np.ndarray) -> None:
+    def check_big_steps(self, locations: np.ndarray,
+                        optional_locations: np.ndarray) -> np.ndarray:
+        """
+        This method checks if the vectors from the locations to the optional
+        locations of a group of walkers cross an obstacle or gate, and
+        returns the next steps accordingly.
+        The first shape met along each vector is found exactly: a gate moves
+        the walker to its end point, an obstacle stops the walker just
+        before it. A gate wins a tie with an obstacle.
+        """
+        gates, gates_fractions = self.__gates_grid.get_first_hits(
+            locations, optional_locations, lambda gate, starts, ends:
+            gate.get_segment_intersections(starts, ends))
+        obstacles_hit, obstacles_fractions = \
+            self.__obstacles_grid.get_first_hits(
+                locations, optional_locations, lambda obstacle, starts, ends:
+                obstacle.get_segment_intersections(starts, ends))
+        next_steps = optional_locations.copy()
+        in_gate = (gates >= 0) & (gates_fractions <= obstacles_fractions)
+        if np.any(in_gate):
+            end_points = np.array([gate.get_end_point()
+                                   for gate in self._magical_gates],
+                                  dtype=float)
+            next_steps[in_gate] = end_points[gates[in_gate]]
+        blocked = ~in_gate & (obstacles_hit >= 0)
+        vectors = optional_locations[blocked] - locations[blocked]
+        lengths = np.linalg.norm(vectors, axis=1)
+        stops = np.maximum(obstacles_fractions[blocked] * lengths -
+                           STEP_BACK, 0) / lengths
+        next_steps[blocked] = locations[blocked] + \
+            vectors * stops[:, np.newaxis]
+        return next_steps
+
+    def __check_big_steps(self, location: np.ndarray,
+                          optional_location: np.ndarray) -> np.ndarray:
         """
         This method checks if the vector of optional location is in an
         obstacle or gate,
-        and sets the next step accordingly.
+        and returns the next step accordingly.
         """
+        return self.check_big_steps(
+            np.array(location, dtype=float)[np.newaxis],
+            np.array(optional_location, dtype=float)[np.newaxis])[0]
 
-        vector = optional_location - random_walker.get_location()
-        norm_vector = vector / np.linalg.norm(vector)
-        for i in range(1, int(np.linalg.norm(vector))):
-            optional_location = random_walker.get_location() + i * norm_vector
-            for gate in self._magical_gates:
-                if gate.is_location_in_gate(optional_location):
-                    random_walker.set_next_step(gate.get_end_point())
-                    return
-            if self.__check_if_location_in_obstacle(optional_location):
-                random_walker.set_next_step(optional_location - norm_vector)
-                return
-        random_walker.set_next_step(optional_location)
-
-    def __check_next_step(self, random_walker: walker.Walker,
-                          optional_location: np.ndarray) -> None:
+    def __check_next_step(self, location: np.ndarray,
+                          optional_location: np.ndarray) -> np.ndarray:
         """
         This method checks if the next step is in an obstacle or gate,
-        and sets the next step accordingly.
+        and returns the next step accordingly.
         """
-        for gate in self._magical_gates:
-            if gate.is_location_in_gate(optional_location):
-                random_walker.set_next_step(gate.get_end_point())
-                return
+        gate = self.__get_gate_of_location(optional_location)
+        if gate is not None:
+            return gate.get_end_point()
 
         if self.__check_if_location_in_obstacle(optional_location):
-            optional_location = random_walker.get_location()
-            random_walker.set_next_step(optional_location)
+            return location
+        return optional_location
 
-    def move_walkers(self, walkers: list[walker.Walker]) -> None:
+    def __get_next_step(self, location: np.ndarray,
+                        optional_location: np.ndarray,
+                        distance: float) -> np.ndarray:
+        """
+        This method returns the valid next step of a walker, based on its
+        current location, its optional location and a lower bound of its
+        distance to the nearest shape: a shorter step is not checked.
+        """
+        length = np.linalg.norm(optional_location - location)
+        if length < distance:
+            return optional_location
+        if length > self.__min_size:
+            return self.__check_big_steps(location, optional_location)
+        return self.__check_next_step(location, optional_location)
+
+    def get_gates_of_locations(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method returns, for each of the (N, 2) locations, the index of
+        the first magical gate (in board order) it is in, or -1.
+        """
+        return self.__gates_grid.get_first_shapes(
+            locations, lambda gate, candidates:
+            gate.are_locations_in_gate(candidates))
+
+    def check_if_locations_in_obstacle(self, locations: np.ndarray) \
+            -> np.ndarray:
+        """
+        This method checks which of the (N, 2) locations are in an obstacle
+        on the board, returns a boolean mask.
+        """
+        return self.__obstacles_grid.get_first_shapes(
+            locations, lambda obstacle, candidates:
+            obstacle.are_locations_in_obstacle(candidates)) >= 0
+
+    def check_next_steps(self, locations: np.ndarray,
+                         optional_locations: np.ndarray) -> np.ndarray:
+        """
+        This method checks if the next steps of a group of walkers are in an
+        obstacle or gate, and returns the next steps accordingly, for the
+        whole group at once: a walker in a gate moves to the gate's end
+        point, otherwise a walker in an obstacle stays in place.
+        """
+        next_steps = optional_locations.copy()
+        gates = self.get_gates_of_locations(optional_locations)
+        in_gate = gates >= 0
+        if np.any(in_gate):
+            end_points = np.array([gate.get_end_point()
+                                   for gate in self._magical_gates],
+                                  dtype=float)
+            next_steps[in_gate] = end_points[gates[in_gate]]
+        blocked = ~in_gate
+        blocked[blocked] = self.check_if_locations_in_obstacle(
+            optional_locations[blocked])
+        next_steps[blocked] = locations[blocked]
+        return next_steps
+
+    def __get_lattice_codes(self, points: np.ndarray) -> np.ndarray:
+        """
+        This method returns the lattice map codes of the (N, 2) points:
+        the index of the first gate a point is in, otherwise whether it is
+        in an obstacle.
+        """
+        codes = self.get_gates_of_locations(points)
+        free = codes < 0
+        codes[free] = np.where(
+            self.check_if_locations_in_obstacle(points[free]),
+            spatial_index.LATTICE_OBSTACLE, spatial_index.LATTICE_FREE)
+        return codes
+
+    def __create_lattice_map(self) -> typing.Optional[spatial_index.LatticeMap]:
+        """
+        This method creates the lattice map of the board's shapes, or returns
+        None if the walkers on the lattice can not be checked with it: a
+        shape thinner than a unit step could be stepped over, a gate ends
+        out of the lattice, or the map would be too big.
+        """
+        end_points = np.array([gate.get_end_point()
+                               for gate in self._magical_gates],
+                              dtype=float).reshape(-1, 2)
+        if self.__min_size < 1 or \
+                np.any(end_points != np.round(end_points)):
+            return None
+        if spatial_index.LatticeMap.get_points_num(self.__boxes) > \
+                spatial_index.MAX_LATTICE_POINTS:
+            return None
+        self.__lattice_end_points = end_points.astype(np.int32)
+        return spatial_index.LatticeMap(self.__boxes,
+                                        self.__get_lattice_codes)
+
+    def get_lattice_map(self) -> typing.Optional[spatial_index.LatticeMap]:
+        """
+        This method returns the lattice map of the board's shapes, created
+        on the first call, or None if the board has no shapes or can not be
+        checked on the lattice.
+        """
+        if not self.__lattice_map_created and \
+                (self._obstacles or self._magical_gates):
+            self.__lattice_map = self.__create_lattice_map()
+            self.__lattice_map_created = True
+        return self.__lattice_map
+
+    def can_check_lattice(self) -> bool:
+        """
+        This method returns True if walkers on the lattice can be moved on
+        this board without leaving it.
+        """
+        return not (self._obstacles or self._magical_gates) or \
+            self.get_lattice_map() is not None
+
+    def check_lattice_steps(self, locations: np.ndarray,
+                            optional_locations: np.ndarray) -> np.ndarray:
+        """
+        This method checks the unit steps of a group of walkers on the
+        lattice with one lookup in the lattice map per walker, and returns
+        the next steps like check_next_steps: a walker in a gate moves to the
+        gate's end point, otherwise a walker in an obstacle stays in place.
+        """
+        codes = self.get_lattice_map().get_codes(optional_locations)
+        next_steps = optional_locations.copy()
+        in_gate = codes >= 0
+        next_steps[in_gate] = self.__lattice_end_points[codes[in_gate]]
+        blocked = codes == spatial_index.LATTICE_OBSTACLE
+        next_steps[blocked] = locations[blocked]
+        return next_steps
+
+    def __get_next_steps(self, locations: np.ndarray,
+                         optional_locations: np.ndarray) -> np.ndarray:
+        """
+        This method returns the valid next steps of a group of walkers, based
+        on their current locations and their optional locations.
+        """
+        if not self._obstacles and not self._magical_gates:
+            return optional_locations
+        if np.issubdtype(optional_locations.dtype, np.integer):
+            return self.check_lattice_steps(locations, optional_locations)
+        next_steps = optional_locations.copy()
+        lengths = np.linalg.norm(optional_locations - locations, axis=1)
+        # a step shorter than the distance to every shape can not reach one
+        checked = lengths >= self.__get_checks_distances(locations)
+        small_steps = checked & (lengths <= self.__min_size)
+        big_steps = checked & ~small_steps
+        if np.any(small_steps):
+            next_steps[small_steps] = self.check_next_steps(
+                locations[small_steps], optional_locations[small_steps])
+        if np.any(big_steps):
+            next_steps[big_steps] = self.check_big_steps(
+                locations[big_steps], optional_locations[big_steps])
+        return next_steps
+
+    def __create_distance_field(self) -> spatial_index.DistanceField:
+        """
+        This method creates the distance field of the board's shapes over
+        the given extent, or the shapes with a margin around them. Without a
+        given resolution, the default one is coarsened when the field would
+        have more than about MAX_DISTANCE_FIELD_POINTS nodes.
+        The field keeps the distances up to DISTANCE_FIELD_MARGIN, or less
+        on boards with many shapes, so that about MAX_DISTANCE_FIELD_POINTS
+        shape distances are computed to build it.
+        """
+        resolution = self.__distance_field_options.get(
+            "resolution", DISTANCE_FIELD_RESOLUTION)
+        sizes = np.max(self.__boxes[:, 2:] - self.__boxes[:, :2], axis=1)
+        max_distance = min(DISTANCE_FIELD_MARGIN, max(resolution, (
+            resolution * math.sqrt(spatial_index.MAX_DISTANCE_FIELD_POINTS /
+                                   len(sizes)) - np.max(sizes)) / 2))
+        extent = self.__distance_field_options.get("extent")
+        if extent is None:
+            corner = np.min(self.__boxes[:, :2], axis=0) - max_distance
+            edge = np.max(self.__boxes[:, 2:], axis=0) + max_distance
+            extent = [corner[0], corner[1], edge[0], edge[1]]
+        if "resolution" not in self.__distance_field_options:
+            area = (extent[2] - extent[0]) * (extent[3] - extent[1])
+            resolution = max(resolution, math.sqrt(
+                area / spatial_index.MAX_DISTANCE_FIELD_POINTS))
+        shapes = self._obstacles + self._magical_gates
+        return spatial_index.DistanceField(
+            extent, resolution, self.__boxes, lambda shape, points:
+            shapes[shape].get_signed_distances(points), max_distance)
+
+    def get_signed_distances(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method returns, for each of the (N, 2) locations, a lower bound
+        of its signed distance to the nearest obstacle or gate (negative
+        inside one, inf on an empty board), from the distance field.
+        """
+        if not self._obstacles and not self._magical_gates:
+            return np.full(len(locations), np.inf)
+        if self.__distance_field is None:
+            self.__distance_field = self.__create_distance_field()
+        return self.__distance_field.get_distances(locations)
+
+    def __get_checks_distances(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method returns the distances under which the steps from the
+        locations are not checked: from the distance field if it was
+        configured, otherwise 0, so every step is checked.
+        """
+        if not self.__distance_field_checks:
+            return np.zeros(len(locations))
+        return self.get_distances(locations)
+
+    def get_distances(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method returns, for each of the (N, 2) locations, a lower bound
+        of its distance to the nearest obstacle or gate (0 inside one).
+        """
+        return np.maximum(self.get_signed_distances(locations), 0)
+
+    def get_attractions(self, locations: np.ndarray, charges: np.ndarray,
+                        active: typing.Optional[np.ndarray] = None) \
+            -> np.ndarray:
+        """
+        This method returns the attraction of every walker to all the other
+        charged walkers and obstacles on the board, computed at once.
+        Uncharged walkers get no attraction. If an active mask is given,
+        only the active walkers get an attraction, and the others are still
+        charged sources, in place.
+        """
+        attractions = np.zeros((len(locations), 2))
+        sources = np.flatnonzero(charges)
+        charged = sources if active is None \
+            else np.flatnonzero((charges != 0) & active)
+        if not charged.size:
+            return attractions
+        if self.__static_field is not None:
+            attractions[charged] = self._force_solver.get_attractions(
+                locations[charged], charges[charged], locations[sources],
+                charges[sources])
+            attractions[charged] += self.__static_field.get_attractions(
+                locations[charged], charges[charged])
+            return attractions
+        sources_locations = np.concatenate((locations[sources],
+                                            self.__obstacles_locations))
+        sources_charges = np.concatenate((charges[sources],
+                                          self.__obstacles_charges))
+        attractions[charged] = self._force_solver.get_attractions(
+            locations[charged], charges[charged], sources_locations,
+            sources_charges)
+        return attractions
+
+    def __move_population(self, population: ensemble.Population2D,
+                          active: np.ndarray) -> None:
+        """
+        This method moves the active walkers of a population on the board,
+        one ensemble of walkers at a time. Ensembles without active walkers
+        are skipped, and only the active walkers are checked against the
+        shapes.
+        """
+        attractions = self.get_attractions(population.get_locations(),
+                                           population.get_charges(), active)
+        start = 0
+        for walkers_ensemble in population.get_ensembles():
+            end = start + len(walkers_ensemble)
+            ensemble_active = active[start:end]
+            if np.any(ensemble_active):
+                if walkers_ensemble.is_on_lattice() and \
+                        not self.can_check_lattice():
+                    walkers_ensemble.leave_lattice()
+                locations = walkers_ensemble.get_locations()
+                optional_locations = walkers_ensemble.optional_steps(
+                    attractions[start:end])
+                next_steps = locations.copy()
+                next_steps[ensemble_active] = self.__get_next_steps(
+                    locations[ensemble_active],
+                    optional_locations[ensemble_active])
+                walkers_ensemble.set_next_steps(next_steps)
+                walkers_ensemble.walk()
+            start = end
+
+    def move_walkers(self, walkers: typing.Union[list[walker.Walker],
+                                                 ensemble.Population2D],
+                     active: typing.Optional[np.ndarray] = None) -> None:
         """
         This method moves the walkers on the board, by checking if the next
         step is valid, changing it accordingly, and moving the walker.
+        If an active mask is given, only the active walkers are moved; the
+        others stay in place, and still attract the active ones.
         """
-        for random_walker in walkers:
+        if active is None:
+            active = np.ones(len(walkers), dtype=bool)
+        if isinstance(walkers, ensemble.Population2D):
+            self.__move_population(walkers, active)
+            return
+        moving = np.flatnonzero(active)
+        moving_walkers = [walkers[index] for index in moving]
+        locations = np.array([random_walker.get_location()
+                              for random_walker in walkers],
+                             dtype=float).reshape(-1, 2)
+        attractions = self.get_attractions(
+            locations, np.array([random_walker.get_charge()
+                                 for random_walker in walkers],
+                                dtype=float), active)
+        distances = self.__get_checks_distances(locations[moving])
+        for random_walker, attraction, distance in zip(
+                moving_walkers, attractions[moving], distances):
             optional_location = random_walker.optional_step(walkers,
-                                                            self._obstacles)
-            if (np.linalg.norm(optional_location -
-                               random_walker.get_location())) > self.__min_size:
-                self.__check_big_steps(random_walker, optional_location)
-            else:
-                self.__check_next_step(random_walker, optional_location)
-        for random_walker in walkers:
+                                                            self._obstacles,
+                                                            attraction)
+            random_walker.set_next_step(self.__get_next_step(
+                random_walker.get_location(), optional_location, distance))
+        for random_walker in moving_walkers:
             random_walker.walk()
-
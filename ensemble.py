@@ -0,0 +1,713 @@
+import copy
+import typing
+
+import numpy as np
+
+import walker
+
+# the number of steps whose directions are drawn at once
+CHOICES_BLOCK = 64
+
+
+class Ensemble:
+    """
+    This class represents a group of walkers of the same type, which are
+    stepped together.
+    Most of the methods are not implemented, Do not use this class directly.
+    """
+
+    def __init__(self, walkers: list[walker.Walker],
+                 rng: typing.Optional[np.random.Generator] = None) -> None:
+        self._type = walkers[0].get_type()
+        self._charge = walkers[0].get_charge()
+        self._ids = np.array([r_walker.get_id() for r_walker in walkers],
+                             dtype=np.int64)
+        # the replica of every walker, see Ensemble2D.replicate
+        self._replicas = np.zeros(len(walkers), dtype=np.int32)
+        self._replicated = False
+        self._rng = rng if rng is not None else np.random.default_rng()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def get_type(self) -> str:
+        """
+        This method returns the type of the walkers in the ensemble.
+        """
+        return self._type
+
+    def get_type_code(self) -> int:
+        """
+        This method returns the type code of the walkers in the ensemble.
+        The code is looked up by the type name, since the codes are only
+        known in the process that registered them.
+        """
+        return walker.WALKER_TYPES.get_code(self._type)
+
+    def get_charge(self) -> float:
+        """
+        This method returns the charge of the walkers in the ensemble.
+        """
+        return self._charge
+
+    def get_ids(self) -> np.ndarray:
+        """
+        This method returns the ids of the walkers in the ensemble.
+        """
+        return self._ids
+
+    def get_replicas(self) -> np.ndarray:
+        """
+        This method returns the replica of every walker in the ensemble.
+        """
+        return self._replicas
+
+    def get_uuid(self, index: int) -> str:
+        """
+        This method returns the unique name of a walker in the ensemble,
+        for display, like walker.Walker.get_uuid. The names of replica r
+        end with _r.
+        """
+        uuid = f"{self._type}_{self._ids[index]}"
+        if self._replicated:
+            return f"{uuid}_{self._replicas[index]}"
+        return uuid
+
+    def get_uuids(self) -> list[str]:
+        """
+        This method returns the unique names of the walkers in the
+        ensemble, built on every call.
+        """
+        return [self.get_uuid(index) for index in range(len(self))]
+
+    def set_rng(self, rng: np.random.Generator) -> None:
+        """
+        This method sets the random generator of the ensemble.
+        """
+        self._rng = rng
+
+    def get_locations(self) -> np.ndarray:
+        raise NotImplementedError("This method is not implemented")
+
+    def set_next_steps(self, new_next_steps: np.ndarray) -> None:
+        raise NotImplementedError("This method is not implemented")
+
+    def optional_steps(self, *args) -> np.ndarray:
+        raise NotImplementedError("This method is not implemented")
+
+    def walk(self) -> None:
+        raise NotImplementedError("This method is not implemented")
+
+    def restart(self) -> None:
+        raise NotImplementedError("This method is not implemented")
+
+    def get_state(self) -> typing.Any:
+        raise NotImplementedError("This method is not implemented")
+
+    def set_state(self, state: typing.Any) -> None:
+        raise NotImplementedError("This method is not implemented")
+
+
+"""
+2D Ensemble classes
+"""
+
+
+class Ensemble2D(Ensemble):
+    """
+    This class represents a group of 2D walkers of the same type.
+    The locations of all the walkers are stored in one (N, 2) array.
+    Do not use this class directly.
+    """
+    # True if the locations are stored as int32 lattice points
+    _lattice = False
+
+    def __init__(self, walkers: list[walker.Walker],
+                 rng: typing.Optional[np.random.Generator] = None) -> None:
+        super().__init__(walkers, rng)
+        self._locations = np.array(
+            [r_walker.get_location() for r_walker in walkers],
+            dtype=float).reshape(-1, 2)
+        self._next_steps = self._locations.copy()
+
+    def get_locations(self) -> np.ndarray:
+        """
+        This method returns the current locations of the walkers (int32
+        points for an ensemble on the lattice).
+        """
+        return self._locations
+
+    def set_next_steps(self, new_next_steps: np.ndarray) -> None:
+        """
+        This method sets the next steps of the walkers from the outside,
+        if needed.
+        """
+        self._next_steps = new_next_steps
+
+    def walk(self) -> None:
+        """
+        This method moves the walkers to their next steps after validating
+        them.
+        """
+        self._locations = self._next_steps
+
+    def restart(self) -> None:
+        """
+        This method resets the walkers' locations to the origin.
+        """
+        self._locations = np.zeros((len(self), 2),
+                                   dtype=self._locations.dtype)
+        self._next_steps = self._locations.copy()
+
+    def is_on_lattice(self) -> bool:
+        """
+        This method returns True if the walkers' locations are int32 lattice
+        points.
+        """
+        return self._lattice
+
+    def leave_lattice(self) -> None:
+        """
+        This method stores the walkers' locations as floats from now on,
+        for boards that can not be checked on the lattice.
+        """
+        self._lattice = False
+        self._locations = self._locations.astype(float)
+        self._next_steps = self._locations.copy()
+
+    def can_skip_steps(self) -> bool:
+        """
+        This method returns True if many steps of the walkers can be drawn
+        at once, with skip_steps.
+        """
+        return False
+
+    def skip_steps(self, steps_num: int, mask: np.ndarray) -> None:
+        raise NotImplementedError("This method is not implemented")
+
+    def can_walk_on_spheres(self) -> bool:
+        """
+        This method returns True if the walkers can jump out of a sphere at
+        once, like walker.Walker.can_walk_on_spheres.
+        """
+        return False
+
+    def jump(self, vectors: np.ndarray, mask: np.ndarray) -> None:
+        """
+        This method moves the masked walkers by their vectors at once,
+        without validating them.
+        """
+        self._locations = np.where(mask[:, np.newaxis],
+                                   self._locations + vectors, self._locations)
+        self._next_steps = self._locations
+
+    def get_state(self) -> np.ndarray:
+        """
+        This method returns the state of the ensemble (the walkers'
+        locations), to restore it later with set_state.
+        """
+        return self._locations.copy()
+
+    def set_state(self, state: np.ndarray) -> None:
+        """
+        This method restores a state returned by get_state.
+        """
+        self._locations = state.astype(self._locations.dtype)
+        self._next_steps = self._locations
+
+    def replicate(self, replicas: int) -> "Ensemble2D":
+        """
+        This method returns a copy of the ensemble with every walker
+        repeated replicas times, replica after replica. The unique names
+        of replica r end with _r.
+        """
+        replicated = copy.copy(self)
+        replicated._replicated = True
+        replicated._ids = np.tile(self._ids, replicas)
+        replicated._replicas = np.repeat(
+            np.arange(replicas, dtype=np.int32), len(self))
+        replicated._locations = np.tile(self._locations, (replicas, 1))
+        replicated._next_steps = replicated._locations.copy()
+        return replicated
+
+
+class ContinuousEnsemble2D(Ensemble2D):
+    """
+    This class represents a group of continuous walkers.
+    Do not use this class directly.
+    """
+
+    def _get_directions(self, *args) -> np.ndarray:
+        raise NotImplementedError("This method is not implemented")
+
+    def _get_steps(self) -> typing.Union[float, np.ndarray]:
+        raise NotImplementedError("This method is not implemented")
+
+    def optional_steps(self, *args) -> np.ndarray:
+        """
+        This method returns the next steps of all the walkers, before
+        validating them. All the directions and steps are drawn at once.
+        """
+        directions = self._get_directions(*args)
+        steps = self._get_steps()
+        vectors = np.column_stack((np.cos(directions), np.sin(directions)))
+        self._next_steps = self._locations + vectors * np.reshape(steps,
+                                                                  (-1, 1))
+        return self._next_steps
+
+
+class DiscreteEnsemble2D(Ensemble2D):
+    """
+    This class represents a group of discrete walkers.
+    Walkers that only step along the axes, and start on integer points,
+    are stored on the lattice: their locations are int32 points.
+    Do not use this class directly.
+    """
+
+    def __init__(self, walkers: list[walker.Walker],
+                 rng: typing.Optional[np.random.Generator] = None) -> None:
+        super().__init__(walkers, rng)
+        if self._is_axis_aligned(walkers) and \
+                np.all(self._locations == np.round(self._locations)):
+            self._lattice = True
+            self._locations = self._locations.astype(np.int32)
+            self._next_steps = self._locations.copy()
+
+    def _is_axis_aligned(self, walkers: list[walker.Walker]) -> bool:
+        """
+        This method returns True if the walkers only make unit steps along
+        the axes.
+        """
+        return False
+
+    def _get_lattice_directions(self) \
+            -> typing.Optional[tuple[np.ndarray, np.ndarray]]:
+        """
+        This method returns the directions of the walkers on the lattice
+        and their probabilities, or None if they are not known.
+        """
+        return None
+
+    def can_skip_steps(self) -> bool:
+        return self._lattice and self._get_lattice_directions() is not None
+
+    def skip_steps(self, steps_num: int, mask: np.ndarray) -> None:
+        """
+        This method moves the masked walkers by steps_num steps at once,
+        without any board: the number of steps in every direction is drawn
+        from the multinomial distribution, and only their sum is added.
+        """
+        directions, probabilities = self._get_lattice_directions()
+        counts = self._rng.multinomial(steps_num, probabilities,
+                                       size=np.count_nonzero(mask))
+        locations = self._locations.copy()
+        locations[mask] += (counts @ directions).astype(locations.dtype)
+        self._locations = locations
+        self._next_steps = locations
+
+    def _get_directions(self, *args) -> np.ndarray:
+        raise NotImplementedError("This method is not implemented")
+
+    def optional_steps(self, *args) -> np.ndarray:
+        """
+        This method returns the next steps of all the walkers, before
+        validating them. All the directions are drawn at once.
+        """
+        self._next_steps = self._locations + self._get_directions(
+            *args).astype(self._locations.dtype, copy=False)
+        return self._next_steps
+
+
+class RandomDirectionEnsemble2D(ContinuousEnsemble2D):
+    """
+    This class represents a group of RandomDirectionWalker2D walkers.
+    """
+
+    def _get_directions(self, *args) -> np.ndarray:
+        """
+        This method returns random directions in radians.
+        """
+        return self._rng.uniform(0, 2, len(self)) * np.pi
+
+    def _get_steps(self) -> float:
+        return 1.0
+
+    def can_walk_on_spheres(self) -> bool:
+        return True
+
+
+class RandomDirectionStepEnsemble2D(ContinuousEnsemble2D):
+    """
+    This class represents a group of RandomDirectionStepWalker2D walkers.
+    """
+
+    def _get_directions(self, *args) -> np.ndarray:
+        """
+        This method returns random directions in radians.
+        """
+        return self._rng.uniform(0, 2, len(self)) * np.pi
+
+    def _get_steps(self) -> np.ndarray:
+        """
+        This method returns random step sizes - between 0.5 and 1.5.
+        """
+        return self._rng.uniform(0.5, 1.5, len(self))
+
+
+class RegularDiscreteEnsemble2D(DiscreteEnsemble2D):
+    """
+    This class represents a group of RegularDiscreteWalker2D walkers.
+    """
+    angles = np.array(walker.RegularDiscreteWalker2D.angles, dtype=np.int32)
+
+    def _is_axis_aligned(self, walkers: list[walker.Walker]) -> bool:
+        return True
+
+    def _get_lattice_directions(self) -> tuple[np.ndarray, np.ndarray]:
+        angles = RegularDiscreteEnsemble2D.angles
+        return angles, np.full(len(angles), 1 / len(angles))
+
+    def _get_directions(self, *args) -> np.ndarray:
+        return RegularDiscreteEnsemble2D.angles[
+            self._rng.integers(len(RegularDiscreteEnsemble2D.angles),
+                               size=len(self))]
+
+
+class WeightedDiscreteEnsemble2D(DiscreteEnsemble2D):
+    """
+    This class represents a group of WeightedDiscreteWalker2D walkers,
+    which share the same weighted direction and weight, and so the same
+    cumulative weights table.
+    """
+    angles = walker.WeightedDiscreteWalker2D.angles
+
+    def __init__(self, walkers: list[walker.WeightedDiscreteWalker2D],
+                 rng: typing.Optional[np.random.Generator] = None) -> None:
+        super().__init__(walkers, rng)
+        directions = list(WeightedDiscreteEnsemble2D.angles.keys())
+        self.__angles = np.array(list(WeightedDiscreteEnsemble2D.angles.values()),
+                                 dtype=float)
+        self.__origin_index = directions.index("origin")
+        cumulative_weights = np.array(walkers[0].get_cumulative_weights())
+        self.__cumulative_weights = cumulative_weights / cumulative_weights[-1]
+        # the directions drawn ahead, a row per step, and the next row
+        self.__choices = np.zeros((0, len(self)), dtype=np.int64)
+        self.__next_choice = 0
+
+    def set_rng(self, rng: np.random.Generator) -> None:
+        """
+        This method sets the random generator of the ensemble, and drops the
+        directions drawn by the previous one.
+        """
+        super().set_rng(rng)
+        self.__choices = np.zeros((0, len(self)), dtype=np.int64)
+
+    def _is_axis_aligned(self, walkers: list[walker.Walker]) -> bool:
+        """
+        The walkers only step along the axes if they never step toward the
+        origin.
+        """
+        weights = np.diff(walkers[0].get_cumulative_weights(), prepend=0)
+        origin_index = list(WeightedDiscreteEnsemble2D.angles.keys()).index(
+            "origin")
+        return bool(weights[origin_index] == 0)
+
+    def _get_lattice_directions(self) -> tuple[np.ndarray, np.ndarray]:
+        return self.__angles.astype(np.int32), \
+            np.diff(self.__cumulative_weights, prepend=0)
+
+    def __get_directions_toward_origin(self, indices: np.ndarray) \
+            -> np.ndarray:
+        """
+        This method returns the directions toward the origin of the given
+        walkers, based on their current locations.
+        """
+        locations = self._locations[indices]
+        delta = np.linalg.norm(locations, axis=1, keepdims=True)
+        return np.divide(-locations, delta, out=np.zeros(locations.shape),
+                         where=delta != 0)
+
+    def get_choices(self, shape: typing.Union[int, tuple[int, ...]]) \
+            -> np.ndarray:
+        """
+        This method returns the indices (in the order of angles) of directions
+        drawn for the given shape (e.g. steps x walkers), with one vectorized
+        draw from the cumulative weights.
+        """
+        uniforms = self._rng.random(shape)
+        # the index is the number of cumulative weights up to the uniform,
+        # a few comparisons are faster than a search for so few directions
+        choices = np.zeros(uniforms.shape, dtype=np.intp)
+        for cumulative_weight in self.__cumulative_weights[:-1]:
+            choices += uniforms >= cumulative_weight
+        return choices
+
+    def __get_next_choices(self) -> np.ndarray:
+        """
+        This method returns the direction indices of the walkers for the
+        next step. They are drawn CHOICES_BLOCK steps at a time.
+        """
+        if self.__next_choice >= len(self.__choices) or \
+                self.__choices.shape[1] != len(self):
+            self.__choices = self.get_choices((CHOICES_BLOCK, len(self)))
+            self.__next_choice = 0
+        self.__next_choice += 1
+        return self.__choices[self.__next_choice - 1]
+
+    def _get_directions(self, *args) -> np.ndarray:
+        """
+        This method returns the directions of the walkers.
+        """
+        choices = self.__get_next_choices()
+        directions = np.take(self.__angles, choices, axis=0)
+        toward_origin = np.flatnonzero(choices == self.__origin_index)
+        directions[toward_origin] = self.__get_directions_toward_origin(
+            toward_origin)
+        return directions
+
+
+class IonEnsemble2D(Ensemble2D):
+    """
+    This class represents a group of IonWalker2D walkers with the same charge.
+    """
+    step = 2
+
+    def optional_steps(self, attractions: np.ndarray, *args) -> np.ndarray:
+        """
+        This method returns the next steps of all the walkers, before
+        validating them.
+        The optional steps are based on the attraction to other charged
+        walkers and obstacles, given for the whole ensemble, and random
+        directions.
+        """
+        random_directions = self._rng.uniform(0, 2, len(self)) * np.pi
+        random_vectors = np.column_stack((np.cos(random_directions),
+                                          np.sin(random_directions)))
+        self._next_steps = (self._locations +
+                            attractions * IonEnsemble2D.step + random_vectors)
+        return self._next_steps
+
+
+class EnsembleWalker2D:
+    """
+    This class represents a read-only view of one walker in an ensemble,
+    so the ensemble can be used wherever a list of walkers is expected.
+    """
+
+    def __init__(self, walkers_ensemble: Ensemble2D, index: int) -> None:
+        self.__ensemble = walkers_ensemble
+        self.__index = index
+
+    def get_charge(self) -> float:
+        return self.__ensemble.get_charge()
+
+    def get_type(self) -> str:
+        return self.__ensemble.get_type()
+
+    def get_type_code(self) -> int:
+        return self.__ensemble.get_type_code()
+
+    def get_id(self) -> int:
+        return int(self.__ensemble.get_ids()[self.__index])
+
+    def get_uuid(self) -> str:
+        return self.__ensemble.get_uuid(self.__index)
+
+    def get_location(self) -> np.ndarray:
+        return self.__ensemble.get_locations()[self.__index]
+
+
+ENSEMBLES_DICT = {walker.RandomDirectionWalker2D: RandomDirectionEnsemble2D,
+                  walker.RandomDirectionStepWalker2D:
+                      RandomDirectionStepEnsemble2D,
+                  walker.RegularDiscreteWalker2D: RegularDiscreteEnsemble2D,
+                  walker.WeightedDiscreteWalker2D: WeightedDiscreteEnsemble2D,
+                  walker.IonWalker2D: IonEnsemble2D}
+
+
+class Population2D:
+    """
+    This class represents all the walkers of a simulation, stored as one
+    ensemble per walker type.
+    It can be iterated like a list of walkers.
+    """
+
+    def __init__(self, walkers: list[walker.Walker],
+                 rng: typing.Optional[np.random.Generator] = None) -> None:
+        self._rng = rng if rng is not None else np.random.default_rng()
+        walkers_by_type: dict[str, list[walker.Walker]] = {}
+        for r_walker in walkers:
+            if type(r_walker) not in ENSEMBLES_DICT:
+                raise ValueError(f"{r_walker.get_type()} can not be used "
+                                 f"in an ensemble")
+            walkers_by_type.setdefault(r_walker.get_type(), []).append(
+                r_walker)
+        self._ensembles = [ENSEMBLES_DICT[type(same_walkers[0])](
+            same_walkers, self._rng)
+            for same_walkers in walkers_by_type.values()]
+
+    def __len__(self) -> int:
+        return sum(len(walkers_ensemble)
+                   for walkers_ensemble in self._ensembles)
+
+    def __iter__(self) -> typing.Iterator[EnsembleWalker2D]:
+        for walkers_ensemble in self._ensembles:
+            for index in range(len(walkers_ensemble)):
+                yield EnsembleWalker2D(walkers_ensemble, index)
+
+    def set_rng(self, rng: np.random.Generator) -> None:
+        """
+        This method sets the random generator of all the ensembles.
+        """
+        self._rng = rng
+        for walkers_ensemble in self._ensembles:
+            walkers_ensemble.set_rng(rng)
+
+    def get_rng(self) -> np.random.Generator:
+        """
+        This method returns the random generator of the ensembles.
+        """
+        return self._rng
+
+    def replicate(self, replicas: int) -> "Population2D":
+        """
+        This method returns a copy of the population with every walker
+        repeated replicas times, to run independent replicas of a
+        simulation of non-interacting walkers at once.
+        """
+        replicated = copy.copy(self)
+        replicated._ensembles = [walkers_ensemble.replicate(replicas)
+                                 for walkers_ensemble in self._ensembles]
+        return replicated
+
+    def get_ensembles(self) -> list[Ensemble2D]:
+        """
+        This method returns the ensembles of the population.
+        """
+        return self._ensembles
+
+    def get_locations(self, out: typing.Optional[np.ndarray] = None) \
+            -> np.ndarray:
+        """
+        This method returns the locations of all the walkers, as one
+        (N, 2) float array. If an out array is given, the locations are
+        written into it instead of a new array.
+        """
+        if not self._ensembles:
+            return np.zeros((0, 2)) if out is None else out
+        locations = [walkers_ensemble.get_locations()
+                     for walkers_ensemble in self._ensembles]
+        if out is not None:
+            return np.concatenate(locations, out=out)
+        return np.concatenate(locations, dtype=float)
+
+    def get_ids(self) -> np.ndarray:
+        """
+        This method returns the ids of all the walkers, in the order of
+        get_locations.
+        """
+        return np.concatenate([walkers_ensemble.get_ids()
+                               for walkers_ensemble in self._ensembles] +
+                              [np.zeros(0, dtype=np.int64)])
+
+    def get_type_codes(self) -> np.ndarray:
+        """
+        This method returns the type codes of all the walkers, in the order
+        of get_locations.
+        """
+        return np.concatenate([np.full(len(walkers_ensemble),
+                                       walkers_ensemble.get_type_code(),
+                                       dtype=np.int32)
+                               for walkers_ensemble in self._ensembles] +
+                              [np.zeros(0, dtype=np.int32)])
+
+    def get_replicas(self) -> np.ndarray:
+        """
+        This method returns the replica of every walker, in the order of
+        get_locations.
+        """
+        return np.concatenate([walkers_ensemble.get_replicas()
+                               for walkers_ensemble in self._ensembles] +
+                              [np.zeros(0, dtype=np.int32)])
+
+    def get_skippable(self) -> np.ndarray:
+        """
+        This method returns the mask of the walkers whose steps can be
+        skipped ahead, in the order of get_locations.
+        """
+        return np.concatenate([np.full(len(walkers_ensemble),
+                                       walkers_ensemble.can_skip_steps())
+                               for walkers_ensemble in self._ensembles] +
+                              [np.zeros(0, dtype=bool)])
+
+    def can_walk_on_spheres(self) -> bool:
+        """
+        This method returns True if all the walkers can jump out of a
+        sphere at once.
+        """
+        return all(walkers_ensemble.can_walk_on_spheres()
+                   for walkers_ensemble in self._ensembles)
+
+    def jump(self, vectors: np.ndarray, mask: np.ndarray) -> None:
+        """
+        This method moves the masked walkers by their (N, 2) vectors at
+        once, in the order of get_locations.
+        """
+        start = 0
+        for walkers_ensemble in self._ensembles:
+            end = start + len(walkers_ensemble)
+            if np.any(mask[start:end]):
+                walkers_ensemble.jump(vectors[start:end], mask[start:end])
+            start = end
+
+    def skip_steps(self, steps_num: int, mask: np.ndarray) -> None:
+        """
+        This method moves the masked walkers by steps_num steps at once.
+        All of them must be skippable.
+        """
+        start = 0
+        for walkers_ensemble in self._ensembles:
+            end = start + len(walkers_ensemble)
+            if np.any(mask[start:end]):
+                walkers_ensemble.skip_steps(steps_num, mask[start:end])
+            start = end
+
+    def get_charges(self) -> np.ndarray:
+        """
+        This method returns the charges of all the walkers, in the order of
+        get_locations.
+        """
+        return np.concatenate([np.full(len(walkers_ensemble),
+                                       walkers_ensemble.get_charge(),
+                                       dtype=float)
+                               for walkers_ensemble in self._ensembles] +
+                              [np.zeros(0)])
+
+    def walk(self) -> None:
+        """
+        This method moves all the walkers to their next steps.
+        """
+        for walkers_ensemble in self._ensembles:
+            walkers_ensemble.walk()
+
+    def restart(self) -> None:
+        """
+        This method resets all the walkers' locations to the origin.
+        """
+        for walkers_ensemble in self._ensembles:
+            walkers_ensemble.restart()
+
+    def get_state(self) -> list[np.ndarray]:
+        """
+        This method returns the state of all the ensembles, to restore it
+        later with set_state.
+        """
+        return [walkers_ensemble.get_state()
+                for walkers_ensemble in self._ensembles]
+
+    def set_state(self, state: list[np.ndarray]) -> None:
+        """
+        This method restores a state returned by get_state.
+        """
+        for walkers_ensemble, ensemble_state in zip(self._ensembles, state):
+            walkers_ensemble.set_state(ensemble_state)
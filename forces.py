@@ -0,0 +1,550 @@
+import numpy as np
+
+import math_helper
+import obstacles
+
+# max number of target-source pairs computed at once, to bound the memory
+MAX_PAIRS_CHUNK = 2 ** 22
+
+
+def get_charged_obstacles(board_obstacles: list[obstacles.Obstacle]) \
+        -> tuple[np.ndarray, np.ndarray]:
+    """
+    This function returns the locations and charges of the charged
+    obstacles, as (M, 2) and (M,) arrays.
+    """
+    charged = [obstacle for obstacle in board_obstacles
+               if obstacle.get_charge() != 0]
+    locations = np.array([obstacle.get_location() for obstacle in charged],
+                         dtype=float).reshape(-1, 2)
+    charges = np.array([obstacle.get_charge() for obstacle in charged],
+                       dtype=float)
+    return locations, charges
+
+
+def get_direct_attractions(locations: np.ndarray, charges: np.ndarray,
+                           sources_locations: np.ndarray,
+                           sources_charges: np.ndarray) -> np.ndarray:
+    """
+    This function returns the attraction of every charged location to all
+    the sources, based on Coulomb's law (F = k * q1 * q2 / r^2).
+    Sources closer than 1 are ignored, which also excludes each location
+    from attracting itself.
+    """
+    attractions = np.zeros((len(locations), 2))
+    if not len(locations) or not len(sources_locations):
+        return attractions
+    chunk = max(1, MAX_PAIRS_CHUNK // len(sources_locations))
+    for start in range(0, len(locations), chunk):
+        deltas = (locations[start:start + chunk, np.newaxis, :] -
+                  sources_locations[np.newaxis, :, :])
+        squared_distances = np.einsum("ijk,ijk->ij", deltas, deltas)
+        far = squared_distances > 1
+        coefficients = np.zeros_like(squared_distances)
+        coefficients[far] = 1 / (squared_distances[far] *
+                                 np.sqrt(squared_distances[far]))
+        coefficients *= sources_charges
+        attractions[start:start + chunk] = np.einsum("ij,ijk->ik",
+                                                     coefficients, deltas)
+    return attractions * charges[:, np.newaxis]
+
+
+class ForceSolver:
+    """
+    This class computes the attraction of charged walkers to other charged
+    walkers and obstacles.
+    Most of the methods are not implemented, Do not use this class directly.
+    """
+
+    def get_attractions(self, locations: np.ndarray, charges: np.ndarray,
+                        sources_locations: np.ndarray,
+                        sources_charges: np.ndarray) -> np.ndarray:
+        raise NotImplementedError("get_attractions is not implemented")
+
+
+class DirectForceSolver(ForceSolver):
+    """
+    This class computes the exact attraction, by summing over every pair of
+    a charged location and a source at once.
+    """
+
+    def get_attractions(self, locations: np.ndarray, charges: np.ndarray,
+                        sources_locations: np.ndarray,
+                        sources_charges: np.ndarray) -> np.ndarray:
+        """
+        This method returns the attraction of every charged location to all
+        the sources.
+        """
+        return get_direct_attractions(locations, charges, sources_locations,
+                                      sources_charges)
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """
+    This function spreads the lower 16 bits of the values, so a zero bit is
+    placed between every two bits (used to build Morton codes).
+    """
+    values = values.astype(np.int64) & 0xFFFF
+    values = (values | (values << 8)) & 0x00FF00FF
+    values = (values | (values << 4)) & 0x0F0F0F0F
+    values = (values | (values << 2)) & 0x33333333
+    values = (values | (values << 1)) & 0x55555555
+    return values
+
+
+class QuadTree:
+    """
+    This class represents a quadtree of charged sources, stored level by
+    level in flat arrays.
+    Every node keeps the total positive and the total negative charge of its
+    sources, each one with its own center of charge, so a far node acts as
+    two point charges.
+    """
+
+    def __init__(self, locations: np.ndarray, charges: np.ndarray,
+                 leaf_size: int, max_depth: int) -> None:
+        self.__leaf_size = leaf_size
+        self.__max_depth = max_depth
+        corner = np.min(locations, axis=0)
+        size = float(np.max(np.ptp(locations, axis=0)))
+        size = size * (1 + 1e-9) if size > 0 else 1.0
+        cells = np.minimum(((locations - corner) / size *
+                            2 ** max_depth).astype(np.int64),
+                           2 ** max_depth - 1)
+        codes = _spread_bits(cells[:, 0]) | (_spread_bits(cells[:, 1]) << 1)
+        order = np.argsort(codes, kind="stable")
+        self.__locations = locations[order]
+        self.__charges = charges[order]
+        self.__build(codes[order], cells[order], corner, size)
+
+    def __build(self, codes: np.ndarray, cells: np.ndarray,
+                corner: np.ndarray, size: float) -> None:
+        """
+        This method builds the nodes of the tree, level by level, until every
+        node is a leaf.
+        """
+        positive = np.clip(self.__charges, 0, None)
+        negative = np.clip(-self.__charges, 0, None)
+        levels = []
+        level = 0
+        while True:
+            keys = codes >> (2 * (self.__max_depth - level))
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            ends = np.r_[starts[1:], len(codes)]
+            node_size = size / 2 ** level
+            box_cells = cells[starts] >> (self.__max_depth - level)
+            leaf = ((ends - starts) <= self.__leaf_size) | \
+                   (level == self.__max_depth)
+            levels.append({
+                "starts": starts, "ends": ends, "leaf": leaf,
+                "size": np.full(len(starts), node_size),
+                "center": corner + (box_cells + 0.5) * node_size,
+                "positive": np.add.reduceat(positive, starts),
+                "negative": np.add.reduceat(negative, starts),
+                "positive_center": self.__get_charge_centers(positive,
+                                                             starts),
+                "negative_center": self.__get_charge_centers(negative,
+                                                             starts)})
+            if np.all(leaf):
+                break
+            level += 1
+        offsets = np.cumsum([0] + [len(nodes["starts"]) for nodes in levels])
+        first_child = []
+        last_child = []
+        for index, nodes in enumerate(levels):
+            if index + 1 < len(levels):
+                children_starts = levels[index + 1]["starts"]
+                first_child.append(offsets[index + 1] + np.searchsorted(
+                    children_starts, nodes["starts"]))
+                last_child.append(offsets[index + 1] + np.searchsorted(
+                    children_starts, nodes["ends"]))
+            else:
+                first_child.append(np.full(len(nodes["starts"]),
+                                           offsets[index + 1]))
+                last_child.append(np.full(len(nodes["starts"]),
+                                          offsets[index + 1]))
+        self.__starts = np.concatenate([nodes["starts"] for nodes in levels])
+        self.__ends = np.concatenate([nodes["ends"] for nodes in levels])
+        self.__leaf = np.concatenate([nodes["leaf"] for nodes in levels])
+        self.__size = np.concatenate([nodes["size"] for nodes in levels])
+        self.__center = np.concatenate([nodes["center"] for nodes in levels])
+        self.__positive = np.concatenate([nodes["positive"]
+                                          for nodes in levels])
+        self.__negative = np.concatenate([nodes["negative"]
+                                          for nodes in levels])
+        self.__positive_center = np.concatenate([nodes["positive_center"]
+                                                 for nodes in levels])
+        self.__negative_center = np.concatenate([nodes["negative_center"]
+                                                 for nodes in levels])
+        self.__first_child = np.concatenate(first_child)
+        self.__last_child = np.concatenate(last_child)
+
+    def __get_charge_centers(self, weights: np.ndarray,
+                             starts: np.ndarray) -> np.ndarray:
+        """
+        This method returns the center of the given (non-negative) charges of
+        every node, or the first source location if the node has none.
+        """
+        totals = np.add.reduceat(weights, starts)
+        sums = np.add.reduceat(self.__locations * weights[:, np.newaxis],
+                               starts)
+        centers = self.__locations[starts].copy()
+        has_charge = totals > 0
+        centers[has_charge] = sums[has_charge] / totals[has_charge,
+                                                        np.newaxis]
+        return centers
+
+    def get_attractions(self, locations: np.ndarray, charges: np.ndarray,
+                        theta: float, chunk: int) -> np.ndarray:
+        """
+        This method returns the attraction of every charged location to the
+        sources of the tree.
+        A node is used as a whole if its size divided by its distance is less
+        than theta, otherwise it is opened.
+        """
+        attractions = np.zeros((len(locations), 2))
+        for start in range(0, len(locations), chunk):
+            attractions[start:start + chunk] = self.__get_chunk_attractions(
+                locations[start:start + chunk], theta)
+        return attractions * charges[:, np.newaxis]
+
+    def __get_chunk_attractions(self, locations: np.ndarray,
+                                theta: float) -> np.ndarray:
+        """
+        This method walks the tree for a chunk of locations at once, keeping
+        all the open (location, node) pairs in flat arrays.
+        """
+        targets = np.arange(len(locations))
+        nodes = np.zeros(len(locations), dtype=np.int64)
+        x_sum = np.zeros(len(locations))
+        y_sum = np.zeros(len(locations))
+        while targets.size:
+            deltas = locations[targets] - self.__center[nodes]
+            squared_distances = np.einsum("ij,ij->i", deltas, deltas)
+            sizes = self.__size[nodes]
+            # a far node must also be entirely beyond the r^2 > 1 cutoff
+            far = (sizes ** 2 < theta ** 2 * squared_distances) & \
+                  (squared_distances > (sizes / np.sqrt(2) + 1) ** 2)
+            for charge, center in ((self.__positive, self.__positive_center),
+                                   (-self.__negative, self.__negative_center)):
+                far_targets = targets[far]
+                force = _get_pairs_attractions(locations[far_targets],
+                                               center[nodes[far]],
+                                               charge[nodes[far]])
+                x_sum += np.bincount(far_targets, force[:, 0],
+                                     len(locations))
+                y_sum += np.bincount(far_targets, force[:, 1],
+                                     len(locations))
+            leaf = ~far & self.__leaf[nodes]
+            counts = self.__ends[nodes[leaf]] - self.__starts[nodes[leaf]]
+            leaf_targets = np.repeat(targets[leaf], counts)
+            sources = math_helper.concat_ranges(self.__starts[nodes[leaf]],
+                                                self.__ends[nodes[leaf]])
+            force = _get_pairs_attractions(locations[leaf_targets],
+                                           self.__locations[sources],
+                                           self.__charges[sources])
+            x_sum += np.bincount(leaf_targets, force[:, 0], len(locations))
+            y_sum += np.bincount(leaf_targets, force[:, 1], len(locations))
+            opened = ~far & ~self.__leaf[nodes]
+            counts = self.__last_child[nodes[opened]] - \
+                self.__first_child[nodes[opened]]
+            targets = np.repeat(targets[opened], counts)
+            nodes = math_helper.concat_ranges(
+                self.__first_child[nodes[opened]],
+                self.__last_child[nodes[opened]])
+        return np.column_stack((x_sum, y_sum))
+
+
+def _get_pairs_attractions(locations: np.ndarray,
+                           sources_locations: np.ndarray,
+                           sources_charges: np.ndarray) -> np.ndarray:
+    """
+    This function returns the attraction of every location to the source in
+    the same row, for a unit charge, keeping the r^2 > 1 cutoff.
+    """
+    deltas = locations - sources_locations
+    squared_distances = np.einsum("ij,ij->i", deltas, deltas)
+    coefficients = np.zeros(len(deltas))
+    far = squared_distances > 1
+    coefficients[far] = sources_charges[far] / (
+            squared_distances[far] * np.sqrt(squared_distances[far]))
+    return deltas * coefficients[:, np.newaxis]
+
+
+class BarnesHutForceSolver(ForceSolver):
+    """
+    This class approximates the attraction with a Barnes-Hut quadtree.
+    The tree is rebuilt from the sources every time the attractions are
+    computed (once per step), and each location walks it in O(log N).
+    """
+
+    def __init__(self, theta: float = 0.5, leaf_size: int = 16,
+                 max_depth: int = 16, chunk: int = 4096) -> None:
+        if theta <= 0:
+            raise ValueError("theta must be positive")
+        self.__theta = theta
+        self.__leaf_size = leaf_size
+        self.__max_depth = max_depth
+        self.__chunk = chunk
+
+    def get_theta(self) -> float:
+        return self.__theta
+
+    def get_attractions(self, locations: np.ndarray, charges: np.ndarray,
+                        sources_locations: np.ndarray,
+                        sources_charges: np.ndarray) -> np.ndarray:
+        """
+        This method returns the approximated attraction of every charged
+        location to all the sources.
+        """
+        if not len(locations) or not len(sources_locations):
+            return np.zeros((len(locations), 2))
+        tree = QuadTree(sources_locations, sources_charges,
+                        self.__leaf_size, self.__max_depth)
+        return tree.get_attractions(locations, charges, self.__theta,
+                                    self.__chunk)
+
+
+def _get_long_range_share(distances: np.ndarray,
+                          short_range: float) -> np.ndarray:
+    """
+    This function returns the share of the attraction law solved on the mesh,
+    which grows smoothly from 0 at distance 0 to 1 at the short range.
+    """
+    x = np.clip(distances / short_range, 0, 1)
+    return x ** 3 * (10 - 15 * x + 6 * x ** 2)
+
+
+class ParticleMeshForceSolver(ForceSolver):
+    """
+    This class approximates the attraction on a mesh (particle-particle
+    particle-mesh).
+    The attraction law is split into a smooth long range part and a short
+    range part. The charges of the sources are deposited on the mesh (cloud
+    in cell), the long range field is their convolution with the smooth part,
+    solved with numpy.fft, and is interpolated back to every charged
+    location. The short range part is summed exactly over the close pairs.
+    Each step costs O(N + M log M) for N locations and M mesh cells.
+    """
+
+    def __init__(self, cell_size: float = 1.0, max_mesh_size: int = 512,
+                 short_range_cells: float = 6.0, chunk: int = 4096) -> None:
+        if cell_size <= 0 or max_mesh_size < 4 or short_range_cells <= 0:
+            raise ValueError("cell size and short range must be positive "
+                             "and the mesh size at least 4")
+        self.__cell_size = cell_size
+        self.__max_mesh_size = max_mesh_size
+        self.__short_range_cells = short_range_cells
+        self.__chunk = chunk
+        self.__kernels: dict[tuple[int, int, float], np.ndarray] = {}
+
+    def get_cell_size(self) -> float:
+        return self.__cell_size
+
+    def __get_kernels(self, shape: tuple[int, int], cell_size: float) \
+            -> np.ndarray:
+        """
+        This method returns the fft of the long range attraction sampled on a
+        mesh padded to twice the given shape (so the convolution is not
+        periodic), for the x and y components. It is cached by shape and
+        cell size.
+        """
+        key = (shape[0], shape[1], cell_size)
+        if key not in self.__kernels:
+            padded = (2 * shape[0], 2 * shape[1])
+            x_offsets = np.fft.fftfreq(padded[0], 1 / padded[0]) * cell_size
+            y_offsets = np.fft.fftfreq(padded[1], 1 / padded[1]) * cell_size
+            x_deltas, y_deltas = np.meshgrid(x_offsets, y_offsets,
+                                             indexing="ij")
+            distances = np.sqrt(x_deltas ** 2 + y_deltas ** 2)
+            coefficients = np.zeros(padded)
+            not_zero = distances > 0
+            coefficients[not_zero] = _get_long_range_share(
+                distances[not_zero],
+                self.__short_range_cells * cell_size) / \
+                distances[not_zero] ** 3
+            self.__kernels[key] = np.array(
+                [np.fft.rfft2(x_deltas * coefficients),
+                 np.fft.rfft2(y_deltas * coefficients)])
+        return self.__kernels[key]
+
+    @staticmethod
+    def __get_cloud_in_cell(locations: np.ndarray, corner: np.ndarray,
+                            cell_size: float, shape: tuple[int, int]) \
+            -> tuple[np.ndarray, np.ndarray]:
+        """
+        This method returns the flat indices of the 4 mesh nodes around every
+        location, and their cloud in cell weights, as (N, 4) arrays.
+        """
+        grid = (locations - corner) / cell_size
+        cells = np.floor(grid).astype(np.int64)
+        fractions = grid - cells
+        indices = []
+        weights = []
+        for dx, dy in ((0, 0), (1, 0), (0, 1), (1, 1)):
+            indices.append((cells[:, 0] + dx) * shape[1] + cells[:, 1] + dy)
+            weights.append(np.abs(1 - dx - fractions[:, 0]) *
+                           np.abs(1 - dy - fractions[:, 1]))
+        return np.column_stack(indices), np.column_stack(weights)
+
+    def __get_long_range(self, locations: np.ndarray,
+                         sources_locations: np.ndarray,
+                         sources_charges: np.ndarray, corner: np.ndarray,
+                         cell_size: float, shape: tuple[int, int]) \
+            -> np.ndarray:
+        """
+        This method returns the long range attraction of every location, for
+        a unit charge, solved on the mesh.
+        """
+        indices, weights = self.__get_cloud_in_cell(
+            sources_locations, corner, cell_size, shape)
+        density = np.bincount(
+            indices.ravel(),
+            (weights * sources_charges[:, np.newaxis]).ravel(),
+            shape[0] * shape[1]).reshape(shape)
+        padded = (2 * shape[0], 2 * shape[1])
+        density_fft = np.fft.rfft2(density, padded)
+        kernels = self.__get_kernels(shape, cell_size)
+        indices, weights = self.__get_cloud_in_cell(locations, corner,
+                                                    cell_size, shape)
+        attractions = np.zeros((len(locations), 2))
+        for axis in range(2):
+            field = np.fft.irfft2(density_fft * kernels[axis],
+                                  padded)[:shape[0], :shape[1]]
+            attractions[:, axis] = np.sum(field.ravel()[indices] * weights,
+                                          axis=1)
+        return attractions
+
+    def __get_short_range(self, locations: np.ndarray,
+                          sources_locations: np.ndarray,
+                          sources_charges: np.ndarray, corner: np.ndarray,
+                          short_range: float) -> np.ndarray:
+        """
+        This method returns the short range attraction of every location, for
+        a unit charge, summed exactly over the sources closer than the short
+        range. The sources are sorted into cells of the short range size, so
+        only the 9 cells around each location are visited.
+        """
+        source_cells = np.floor((sources_locations - corner) /
+                                short_range).astype(np.int64)
+        columns = int(np.max(source_cells[:, 1])) + 3
+        source_keys = (source_cells[:, 0] + 1) * columns + \
+            source_cells[:, 1] + 1
+        order = np.argsort(source_keys, kind="stable")
+        sorted_keys = source_keys[order]
+        sources_locations = sources_locations[order]
+        sources_charges = sources_charges[order]
+        cells = np.floor((locations - corner) / short_range).astype(np.int64)
+        attractions = np.zeros((len(locations), 2))
+        for start in range(0, len(locations), self.__chunk):
+            chunk_cells = cells[start:start + self.__chunk]
+            targets = []
+            sources = []
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    keys = (chunk_cells[:, 0] + dx + 1) * columns + \
+                        chunk_cells[:, 1] + dy + 1
+                    first = np.searchsorted(sorted_keys, keys, "left")
+                    last = np.searchsorted(sorted_keys, keys, "right")
+                    targets.append(np.repeat(np.arange(len(chunk_cells)),
+                                             last - first))
+                    sources.append(math_helper.concat_ranges(first, last))
+            targets = np.concatenate(targets)
+            sources = np.concatenate(sources)
+            deltas = locations[start:start + self.__chunk][targets] - \
+                sources_locations[sources]
+            distances = np.sqrt(np.einsum("ij,ij->i", deltas, deltas))
+            close = (distances < short_range) & (distances > 0)
+            targets, deltas, distances = (targets[close], deltas[close],
+                                          distances[close])
+            # exact law (with the r^2 > 1 cutoff) minus its mesh share
+            coefficients = (np.where(distances > 1, 1.0, 0.0) -
+                            _get_long_range_share(distances, short_range)) \
+                / distances ** 3 * sources_charges[sources[close]]
+            for axis in range(2):
+                attractions[start:start + self.__chunk, axis] = np.bincount(
+                    targets, deltas[:, axis] * coefficients,
+                    len(chunk_cells))
+        return attractions
+
+    def get_attractions(self, locations: np.ndarray, charges: np.ndarray,
+                        sources_locations: np.ndarray,
+                        sources_charges: np.ndarray) -> np.ndarray:
+        """
+        This method returns the approximated attraction of every charged
+        location to all the sources.
+        """
+        if not len(locations) or not len(sources_locations):
+            return np.zeros((len(locations), 2))
+        all_locations = np.concatenate((locations, sources_locations))
+        corner = np.min(all_locations, axis=0)
+        extents = np.ptp(all_locations, axis=0)
+        cell_size = max(self.__cell_size,
+                        float(np.max(extents)) / (self.__max_mesh_size - 2))
+        shape = tuple(int(cells) for cells in
+                      np.ceil(extents / cell_size).astype(int) + 2)
+        attractions = self.__get_long_range(
+            locations, sources_locations, sources_charges, corner, cell_size,
+            shape)
+        attractions += self.__get_short_range(
+            locations, sources_locations, sources_charges, corner,
+            self.__short_range_cells * cell_size)
+        return attractions * charges[:, np.newaxis]
+
+
+class StaticFieldGrid:
+    """
+    This class represents the field of static charges (the charged
+    obstacles), computed once on a grid and bilinearly interpolated.
+    Locations outside the grid get the exact field.
+    """
+
+    def __init__(self, sources_locations: np.ndarray,
+                 sources_charges: np.ndarray, extent: list[float],
+                 resolution: float) -> None:
+        x_min, y_min, x_max, y_max = extent
+        if resolution <= 0 or x_max <= x_min or y_max <= y_min:
+            raise ValueError("resolution must be positive and the extent "
+                             "must be [x_min, y_min, x_max, y_max]")
+        self.__sources_locations = sources_locations
+        self.__sources_charges = sources_charges
+        self.__corner = np.array([x_min, y_min], dtype=float)
+        self.__resolution = resolution
+        self.__shape = (int(np.ceil((x_max - x_min) / resolution)) + 1,
+                        int(np.ceil((y_max - y_min) / resolution)) + 1)
+        x_nodes = x_min + np.arange(self.__shape[0]) * resolution
+        y_nodes = y_min + np.arange(self.__shape[1]) * resolution
+        nodes = np.stack(np.meshgrid(x_nodes, y_nodes, indexing="ij"),
+                         axis=-1).reshape(-1, 2)
+        self.__field = get_direct_attractions(
+            nodes, np.ones(len(nodes)), sources_locations,
+            sources_charges).reshape(self.__shape + (2,))
+
+    def get_attractions(self, locations: np.ndarray,
+                        charges: np.ndarray) -> np.ndarray:
+        """
+        This method returns the attraction of every charged location to the
+        static charges.
+        """
+        grid = (locations - self.__corner) / self.__resolution
+        cells = np.floor(grid).astype(np.int64)
+        inside = np.all((cells >= 0) &
+                        (cells < np.array(self.__shape) - 1), axis=1)
+        attractions = np.zeros((len(locations), 2))
+        cells = cells[inside]
+        fractions = (grid[inside] - cells)[:, :, np.newaxis]
+        x_fractions, y_fractions = fractions[:, 0], fractions[:, 1]
+        x_cells, y_cells = cells[:, 0], cells[:, 1]
+        attractions[inside] = (
+            self.__field[x_cells, y_cells] * (1 - x_fractions) *
+            (1 - y_fractions) +
+            self.__field[x_cells + 1, y_cells] * x_fractions *
+            (1 - y_fractions) +
+            self.__field[x_cells, y_cells + 1] * (1 - x_fractions) *
+            y_fractions +
+            self.__field[x_cells + 1, y_cells + 1] * x_fractions *
+            y_fractions)
+        attractions[~inside] = get_direct_attractions(
+            locations[~inside], np.ones(np.count_nonzero(~inside)),
+            self.__sources_locations, self.__sources_charges)
+        return attractions * charges[:, np.newaxis]
@@ -14,12 +14,14 @@ class GraphCreator:
         self._path = ""
         self._plot = None
         self._color_palette = None
+        # the prefix of the saved files' names
+        self._name = "results"
 
     def to_csv(self) -> None:
         """
         This method saves the data frame to a csv file.
         """
-        self._df.to_csv(self._path + r"\results_csv.csv")
+        self._df.to_csv(self._path + "\\" + self._name + "_csv.csv")
 
     def to_plot(self) -> None:
         """
@@ -28,7 +30,8 @@ class GraphCreator:
         sns.set_theme(style="darkgrid")
         self._color_palette = sns.color_palette("Set2", len(self._df['walkers'].unique()))
         self._create_plot()
-        self._plot.savefig(self._path + r"\results_graph.png")
+        self._plot.savefig(self._path + "\\" + self._name + "_graph.png")
+        plt.close("all")
 
     def _create_plot(self) -> None:
         raise NotImplementedError("This method is not implemented")
@@ -39,11 +42,12 @@ class StepsDistanceGraph(GraphCreator):
     This class creates a graph of the steps and distance from the origin.
     """
 
-    def __init__(self, path: str, df: pd.DataFrame):
+    def __init__(self, path: str, df: pd.DataFrame, name: str = "results"):
         super().__init__()
         self._df = df
         self._path = path
         self._plot = None
+        self._name = name
 
     def _create_plot(self) -> None:
         """
@@ -73,11 +77,12 @@ class RadiusGraph(GraphCreator):
     This class creates a graph of the radius and steps.
     """
 
-    def __init__(self, path: str, df: pd.DataFrame):
+    def __init__(self, path: str, df: pd.DataFrame, name: str = "results"):
         super().__init__()
         self._df = df
         self._path = path
         self._plot = None
+        self._name = name
 
     def _create_plot(self) -> None:
         """
@@ -111,11 +116,12 @@ class CrossGraph(GraphCreator):
     This class creates a graph of the cross number and steps.
     """
 
-    def __init__(self, path: str, df: pd.DataFrame):
+    def __init__(self, path: str, df: pd.DataFrame, name: str = "results"):
         super().__init__()
         self._df = df
         self._path = path
         self._plot = None
+        self._name = name
 
     def _create_plot(self) -> None:
         """
@@ -138,11 +144,12 @@ class DistanceToAxisGraph(GraphCreator):
     This class creates a graph of the distance to the axis and steps.
     """
 
-    def __init__(self, path, df):
+    def __init__(self, path, df, name="results"):
         super().__init__()
         self._df = df
         self._path = path
         self._plot = None
+        self._name = name
 
         self.__x_df = self._df.drop(columns="distance_to_axis_y")
         self.__y_df = self._df.drop(columns="distance_to_axis_x")
@@ -6,6 +6,10 @@ import sim_globals
 import json_scheme
 import walker
 import board
+import ensemble
+import forces
+import sampling
+import simulation
 import jsonschema
 
 
@@ -42,14 +46,142 @@ class InfoForSimulation:
         self.__add_walkers()
         if not self.__walkers:
             return False
+        if self._get_simulation_option("ensemble", False):
+            for r_walker in self.__walkers:
+                if type(r_walker) not in ensemble.ENSEMBLES_DICT:
+                    return False
+        if self._get_simulation_option("force_mode", "direct") not in \
+                sim_globals.FORCE_SOLVERS_DICT:
+            return False
+        if self._get_simulation_option("workers", 1) < 1:
+            return False
+        replicas = self._get_simulation_option("replicas", None)
+        if replicas is not None:
+            if replicas.get("max_memory", sim_globals.REPLICAS_MEMORY) <= 0:
+                return False
+            # the replicas of a simulation must not interact
+            for r_walker in self.__walkers:
+                if r_walker.get_charge() != 0:
+                    return False
+        try:
+            self.get_schedule()
+        except ValueError:
+            return False
+        # only the walkers of a population can skip steps ahead
+        if self.get_skip_ahead() and \
+                not self._get_simulation_option("ensemble", False):
+            return False
+        if self.get_walk_on_spheres():
+            for r_walker in self.__walkers:
+                if not r_walker.can_walk_on_spheres():
+                    return False
+            # only the first steps at every radius keep their distribution
+            for operation in self.__get_stats_types():
+                if sim_globals.STATS_DICT.get(operation, [None])[0] is not \
+                        simulation.OriginDistanceSimulator2D:
+                    return False
+        if self._get_simulation_option("theta", 0.5) <= 0:
+            return False
+        if self._get_simulation_option("cell_size", 1) <= 0:
+            return False
+        for grid_option in ("field_grid", "distance_field"):
+            grid = self._get_simulation_option(grid_option, {})
+            if grid.get("resolution", 1) <= 0:
+                return False
+            extent = grid.get("extent", [0, 0, 1, 1])
+            if extent[2] <= extent[0] or extent[3] <= extent[1]:
+                return False
         return True
 
+    def _get_simulation_option(self, option: str,
+                               default: typing.Any) -> typing.Any:
+        """
+        This method returns an optional value from the simulation data,
+        or the default value if it was not given.
+        """
+        return self._data.get("simulation", {}).get(option, default)
+
+    def get_workers(self) -> int:
+        """
+        This method returns the number of processes to run the simulations
+        in.
+        """
+        return self._get_simulation_option("workers", 1)
+
+    def get_replicas_memory(self) -> typing.Optional[float]:
+        """
+        This method returns the memory cap (in MB) of the replicas run at
+        once, or None if the simulations are run one by one.
+        """
+        replicas = self._get_simulation_option("replicas", None)
+        if replicas is None:
+            return None
+        return replicas.get("max_memory", sim_globals.REPLICAS_MEMORY)
 
-    def get_data_for_simulation(self) -> tuple[list[walker.Walker], board.Board]:
+    def get_schedule(self) -> typing.Optional[sampling.SamplingSchedule]:
+        """
+        This method returns the schedule of the sampled steps, or None if
+        every step is sampled.
+        """
+        schedule = self._get_simulation_option("sampling", None)
+        if schedule is None:
+            return None
+        if len(schedule) != 1:
+            raise ValueError("sampling must have exactly one schedule")
+        if "stride" in schedule:
+            return sampling.StrideSchedule(schedule["stride"])
+        if "steps" in schedule:
+            return sampling.StepsListSchedule(schedule["steps"])
+        return sampling.GeometricSchedule(schedule["geometric"])
+
+    def get_skip_ahead(self) -> bool:
+        """
+        This method returns True if the steps between the sampled steps may
+        be made at once.
+        """
+        return self._get_simulation_option("skip_ahead", False)
+
+    def get_walk_on_spheres(self) -> bool:
+        """
+        This method returns True if the walkers may make the steps inside a
+        sphere around them at once, each one making its own steps.
+        """
+        return self._get_simulation_option("walk_on_spheres", False)
+
+    def __get_stats_types(self) -> list[str]:
+        """
+        This method returns the stats types, as a list.
+        """
+        operation = self._data.get("stats", {}).get("type", [])
+        return [operation] if isinstance(operation, str) else operation
+
+    def get_data_for_simulation(self) -> tuple[
+            typing.Union[list[walker.Walker], ensemble.Population2D],
+            board.Board]:
         self.__board = board.Board2D(self._data["board"]["obstacles"],
-                                     self._data["board"]["magical_gates"])
+                                     self._data["board"]["magical_gates"],
+                                     self.__get_force_solver(),
+                                     self._get_simulation_option("field_grid",
+                                                                 None),
+                                     self._get_simulation_option(
+                                         "distance_field", None))
+        if self._get_simulation_option("ensemble", False):
+            return ensemble.Population2D(self.__walkers), self.__board
         return self.__walkers, self.__board
 
+    def __get_force_solver(self) -> forces.ForceSolver:
+        """
+        This method returns the force solver chosen for the charged walkers.
+        """
+        force_mode = self._get_simulation_option("force_mode", "direct")
+        if force_mode == "barnes_hut":
+            return forces.BarnesHutForceSolver(
+                self._get_simulation_option("theta", 0.5))
+        if force_mode == "particle_mesh":
+            return forces.ParticleMeshForceSolver(
+                self._get_simulation_option("cell_size", 1.0))
+        return sim_globals.FORCE_SOLVERS_DICT[force_mode]()
+
     def __add_walkers(self) -> None:
         for r_walker in self._data["board"]["walkers"]:
             if r_walker["values"]["num"] < 1:
@@ -96,7 +228,7 @@ class InfoFromJson(InfoForSimulation):
         # it is okay to use the data
         return True
 
-    def get_data_for_stats(self) -> tuple[str, str, int, int]:
+    def get_data_for_stats(self) -> tuple[list[str], str, int, int]:
         """
         This method returns the data for the stats.
         """
@@ -109,6 +241,8 @@ class InfoFromJson(InfoForSimulation):
         self.__simulation_param = self._data["simulation"]["stop_param"]
         self.__simulation_num = self._data["simulation"]["num_of_simulations"]
         self.__operation = self._data["stats"]["type"]
+        if isinstance(self.__operation, str):
+            self.__operation = [self.__operation]
         self.__path = self._data["stats"]["path"]
         if not (sim_globals.MIN_SIM <= self.__simulation_num <=
                 sim_globals.MAX_SIM):
@@ -116,8 +250,15 @@ class InfoFromJson(InfoForSimulation):
         if not (sim_globals.MIN_PARAM <= self.__simulation_param <=
                 sim_globals.MAX_PARAM):
             return False
-        if self.__operation not in sim_globals.STATS_DICT:
+        if not self.__operation:
             return False
+        for operation in self.__operation:
+            if operation not in sim_globals.STATS_DICT:
+                return False
+            # the stats types of one run share their simulation
+            if sim_globals.STATS_DICT[operation][0] is not \
+                    sim_globals.STATS_DICT[self.__operation[0]][0]:
+                return False
         if not os.path.isdir(self.__path):
             return False
         return True
@@ -265,6 +265,85 @@ data_scheme = \
                     },
                     "num_of_simulations": {
                         "type": "integer"
+                    },
+                    "workers": {
+                        "type": "integer"
+                    },
+                    "sampling": {
+                        "type": "object",
+                        "properties": {
+                            "stride": {
+                                "type": "integer"
+                            },
+                            "steps": {
+                                "type": "array",
+                                "items": {
+                                    "type": "integer"
+                                }
+                            },
+                            "geometric": {
+                                "type": "number"
+                            }
+                        },
+                        "additionalProperties": False
+                    },
+                    "replicas": {
+                        "type": "object",
+                        "properties": {
+                            "max_memory": {
+                                "type": "number"
+                            }
+                        }
+                    },
+                    "ensemble": {
+                        "type": "boolean"
+                    },
+                    "skip_ahead": {
+                        "type": "boolean"
+                    },
+                    "walk_on_spheres": {
+                        "type": "boolean"
+                    },
+                    "force_mode": {
+                        "type": "string"
+                    },
+                    "theta": {
+                        "type": "number"
+                    },
+                    "cell_size": {
+                        "type": "number"
+                    },
+                    "field_grid": {
+                        "type": "object",
+                        "properties": {
+                            "resolution": {
+                                "type": "number"
+                            },
+                            "extent": {
+                                "type": "array",
+                                "items": {
+                                    "type": "number"
+                                },
+                                "minItems": 4,
+                                "maxItems": 4
+                            }
+                        }
+                    },
+                    "distance_field": {
+                        "type": "object",
+                        "properties": {
+                            "resolution": {
+                                "type": "number"
+                            },
+                            "extent": {
+                                "type": "array",
+                                "items": {
+                                    "type": "number"
+                                },
+                                "minItems": 4,
+                                "maxItems": 4
+                            }
+                        }
                     }
                 },
                 "required": [
@@ -276,7 +355,13 @@ data_scheme = \
                 "type": "object",
                 "properties": {
                     "type": {
-                        "type": "string"
+                        "type": [
+                            "string",
+                            "array"
+                        ],
+                        "items": {
+                            "type": "string"
+                        }
                     },
                     "path": {
                         "type": "string"
@@ -1,5 +1,7 @@
 import numpy as np
 
+import math_helper
+
 
 class MagicalGate:
     """
@@ -8,9 +10,23 @@ class MagicalGate:
     def is_location_in_gate(self, location: np.ndarray) -> np.bool_:
         raise NotImplementedError("is_location_in_obstacle not implemented")
 
+    def are_locations_in_gate(self, locations: np.ndarray) -> np.ndarray:
+        raise NotImplementedError("are_locations_in_gate not implemented")
+
     def get_end_point(self) -> np.ndarray:
         raise NotImplementedError("get_end_point not implemented")
 
+    def get_bounding_box(self) -> np.ndarray:
+        raise NotImplementedError("get_bounding_box not implemented")
+
+    def get_segment_intersections(self, starts: np.ndarray,
+                                  ends: np.ndarray) -> np.ndarray:
+        raise NotImplementedError("get_segment_intersections not "
+                                  "implemented")
+
+    def get_signed_distances(self, locations: np.ndarray) -> np.ndarray:
+        raise NotImplementedError("get_signed_distances not implemented")
+
 
 class GateCircle(MagicalGate):
     """
@@ -40,12 +56,46 @@ class GateCircle(MagicalGate):
         return np.all(np.linalg.norm(self.__center - location) <=
                       self.__radius)
 
+    def are_locations_in_gate(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method checks which of the (N, 2) locations are inside the
+        circle magical gate, returns a boolean mask.
+        """
+        return np.linalg.norm(self.__center - locations, axis=1) <= \
+            self.__radius
+
     def get_end_point(self) -> np.ndarray:
         """
         This method returns the end point of the circle magical gate.
         """
         return self.__end_point
 
+    def get_bounding_box(self) -> np.ndarray:
+        """
+        This method returns the bounding box of the circle magical gate,
+        as [x_min, y_min, x_max, y_max].
+        """
+        return np.concatenate((self.__center - self.__radius,
+                               self.__center + self.__radius))
+
+    def get_segment_intersections(self, starts: np.ndarray,
+                                  ends: np.ndarray) -> np.ndarray:
+        """
+        This method returns, for each of the (N, 2) segments, the fraction
+        of the segment at which it first touches the circle magical gate,
+        or inf if it does not.
+        """
+        return math_helper.segment_circle_intersections(
+            starts, ends, self.__center, self.__radius)
+
+    def get_signed_distances(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method returns the signed distance of each of the (N, 2)
+        locations from the circle magical gate, negative inside it.
+        """
+        return math_helper.circle_signed_distances(locations, self.__center,
+                                                   self.__radius)
+
 
 class GateRectangle(MagicalGate):
     """
@@ -73,8 +123,42 @@ class GateRectangle(MagicalGate):
         return np.all(np.logical_and(location <= self.__edge_point,
                                      location >= self.__start_point))
 
+    def are_locations_in_gate(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method checks which of the (N, 2) locations are inside the
+        rectangle magical gate, returns a boolean mask.
+        """
+        return np.all(np.logical_and(locations <= self.__edge_point,
+                                     locations >= self.__start_point), axis=1)
+
     def get_end_point(self) -> np.ndarray:
         """
         This method returns the end point of the rectangle magical gate.
         """
         return self.__end_point
+
+    def get_bounding_box(self) -> np.ndarray:
+        """
+        This method returns the bounding box of the rectangle magical gate,
+        as [x_min, y_min, x_max, y_max].
+        """
+        return np.concatenate((self.__start_point, self.__edge_point))
+
+    def get_segment_intersections(self, starts: np.ndarray,
+                                  ends: np.ndarray) -> np.ndarray:
+        """
+        This method returns, for each of the (N, 2) segments, the fraction
+        of the segment at which it first touches the rectangle magical gate,
+        or inf if it does not.
+        """
+        return math_helper.segment_box_intersections(
+            starts, ends, self.__start_point, self.__edge_point)
+
+    def get_signed_distances(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method returns the signed distance of each of the (N, 2)
+        locations from the rectangle magical gate, negative inside it.
+        """
+        return math_helper.box_signed_distances(
+            locations, self.__start_point, self.__edge_point)
+
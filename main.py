@@ -1,17 +1,33 @@
-import copy
+import concurrent.futures
+import random
 import sys
 import typing
 
+import numpy as np
 import pandas as pd
 
+import aggregator
 import form_gui
 import info_parser
+import sampling
 import argparse
 import sim_globals
 import board
 import walker
+import ensemble
+import simulation
 import tqdm
 
+# the simulation data of a worker process, set once when it starts
+_worker_data: dict[str, typing.Any] = {}
+# the estimated memory of the simulation state of one replicated walker,
+# in bytes: its arrays in the ensemble and the snapshot, and the
+# temporaries of a step. Measured with tracemalloc as the peak of a
+# simulation of 100,000 replicas, per replica: 150 on an empty board and
+# 365 with obstacles and gates (the same for 2 and 40 shapes), and rounded
+# up
+REPLICA_WALKER_BYTES = 512
+
 class Runner:
     def __init__(self):
         self.__run = 0
@@ -34,45 +50,212 @@ class SimulationRunner(Runner):
     This class runs the simulation.
     """
     def __init__(self, walkers: list[walker.Walker], simulation_board: board.Board,
-                 stop_param: int, stats_type: str, path: str):
+                 stop_param: int, stats_types: typing.Union[str, list[str]],
+                 path: str,
+                 workers: int = 1, seed: typing.Optional[int] = None,
+                 replicas_memory: typing.Optional[float] = None,
+                 schedule: typing.Optional[sampling.SamplingSchedule] = None,
+                 skip_ahead: bool = False, walk_on_spheres: bool = False):
         super().__init__()
         self.__board = simulation_board
         self.__walkers = walkers
 
         self.__stop_param = stop_param
-        self.__stats_type = stats_type
+        self.__stats_types = [stats_types] if isinstance(stats_types, str) \
+            else stats_types
         self.__path = path
-        self._df_list: list[pd.DataFrame] = []
+        self.__workers = workers
+        self.__replicas_memory = replicas_memory
+        self.__schedule = schedule
+        self.__skip_ahead = skip_ahead
+        self.__walk_on_spheres = walk_on_spheres
+        self.__seed_sequence = np.random.SeedSequence(seed)
         self.__operations: list[typing.Any] = []
-        self._df = pd.DataFrame()
+        self._aggregators: list[aggregator.OnlineAggregator] = []
+        self._dfs: dict[str, pd.DataFrame] = {}
 
-    def __run_simulation(self) -> None:
+    def __get_replicas(self, simulations_num: int) \
+            -> list[typing.Optional[int]]:
         """
-        This method runs the simulation.
+        This method splits the simulations into jobs. Each job is either a
+        single simulation (None), or, in the replicas mode, a number of
+        replicas run at once, as many as the memory cap allows.
+        A replica costs the state of its walkers, and the memory every
+        stats type reports for them.
         """
-        self.__operations = sim_globals.STATS_DICT[self.__stats_type]
-        loger = self.__operations[1](self.__stop_param)
-        walkers = copy.deepcopy(self.__walkers)
+        if self.__replicas_memory is None:
+            return [None] * simulations_num
+        walker_bytes = REPLICA_WALKER_BYTES + sum(
+            sim_globals.STATS_DICT[stats_type][1].get_walker_bytes(
+                self.__stop_param, self.__schedule)
+            for stats_type in self.__stats_types)
+        replica_bytes = max(len(self.__walkers), 1) * walker_bytes
+        chunk = max(1, min(simulations_num, int(
+            self.__replicas_memory * 2 ** 20 // replica_bytes)))
+        return [chunk] * (simulations_num // chunk) + \
+            [simulations_num % chunk] * (simulations_num % chunk > 0)
 
-        simulator = self.__operations[0](walkers, self.__board,
-                                         self.__stop_param)
-        simulator.run_simulation(loger.get_data)
-        self._df_list.append(loger.get_df())
+    def __run_serial(self, seeds: list[np.random.SeedSequence],
+                     replicas: list[typing.Optional[int]]) -> None:
+        """
+        This method runs the jobs one after another.
+        """
+        for seed, job_replicas in tqdm.tqdm(list(zip(seeds, replicas))):
+            self.__aggregate(_run_simulation(
+                self.__walkers, self.__board, self.__stop_param,
+                self.__stats_types, seed, job_replicas, self.__schedule,
+                self.__skip_ahead, self.__walk_on_spheres))
+
+    def __run_parallel(self, seeds: list[np.random.SeedSequence],
+                       replicas: list[typing.Optional[int]]) -> None:
+        """
+        This method runs the jobs in a pool of worker processes.
+        The walkers and the board are sent once to every worker, and each
+        job only gets its seed and number of replicas. The results are
+        aggregated as they arrive.
+        """
+        chunk_size = max(1, len(seeds) // (self.__workers * 4))
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.__workers, initializer=_init_worker,
+                initargs=(self.__walkers, self.__board, self.__stop_param,
+                          self.__stats_types, self.__schedule,
+                          self.__skip_ahead,
+                          self.__walk_on_spheres)) as executor:
+            for dfs in tqdm.tqdm(executor.map(_run_worker_simulation, seeds,
+                                              replicas, chunksize=chunk_size),
+                                 total=len(seeds)):
+                self.__aggregate(dfs)
+
+    def __aggregate(self, dfs: list[pd.DataFrame]) -> None:
+        """
+        This method merges the stats of a job, one data frame per stats
+        type, into the aggregators.
+        """
+        for stats_aggregator, df in zip(self._aggregators, dfs):
+            stats_aggregator.add(df)
 
     def run_simulations(self, simulations_num: int) -> None:
-        for _ in tqdm.trange(simulations_num):
-            self.__run_simulation()
+        # all the stats types run on the same simulator
+        self.__operations = sim_globals.STATS_DICT[self.__stats_types[0]]
+        self._aggregators = [aggregator.OnlineAggregator(
+            sim_globals.STATS_DICT[stats_type][1].keys)
+            for stats_type in self.__stats_types]
+        replicas = self.__get_replicas(simulations_num)
+        seeds = self.__seed_sequence.spawn(len(replicas))
+        if self.__workers > 1 and len(replicas) > 1:
+            self.__run_parallel(seeds, replicas)
+        else:
+            self.__run_serial(seeds, replicas)
 
+        for stats_type, stats_aggregator in zip(self.__stats_types,
+                                                self._aggregators):
+            self._dfs[stats_type] = stats_aggregator.get_df()
+            # with several stats types, each one gets its own files
+            name = "results" if len(self.__stats_types) == 1 \
+                else f"{stats_type}_results"
+            graph = sim_globals.STATS_DICT[stats_type][2](
+                self.__path, self._dfs[stats_type], name)
+            graph.to_csv()
+            graph.to_plot()
 
-        self._df = pd.concat(self._df_list, ignore_index=True)
 
-        loger = self.__operations[1](self.__stop_param)
-        self._df = loger.mean(self._df)
-        self._df.to_csv("test.csv")
+def _seed_walkers(walkers: typing.Union[list[walker.Walker],
+                                        ensemble.Population2D],
+                  seed: np.random.SeedSequence) -> None:
+    """
+    This function gives the simulation its own random stream, for both the
+    walkers (a random.Random shared by them) and the ensembles (numpy
+    generator), so the random module is left as it is.
+    """
+    if isinstance(walkers, ensemble.Population2D):
+        walkers.set_rng(np.random.default_rng(seed))
+        return
+    rng = random.Random(int(seed.generate_state(1, np.uint64)[0]))
+    for random_walker in walkers:
+        random_walker.set_random(rng)
+
 
-        graph = self.__operations[2](self.__path, self._df)
-        graph.to_csv()
-        graph.to_plot()
+def _run_simulation(walkers: typing.Union[list[walker.Walker],
+                                          ensemble.Population2D],
+                    simulation_board: board.Board, stop_param: int,
+                    stats_types: list[str], seed: np.random.SeedSequence,
+                    replicas: typing.Optional[int] = None,
+                    schedule: typing.Optional[sampling.SamplingSchedule] = None,
+                    skip_ahead: bool = False,
+                    walk_on_spheres: bool = False) -> list[pd.DataFrame]:
+    """
+    This function runs one simulation with its own seed, and returns the
+    data frame of every stats type. Every step of the simulation is given
+    to all the stats types.
+    The walkers are reset to their state when the simulation ends, so the
+    same walkers are reused by all the simulations instead of being copied.
+    If replicas is given, the walkers are repeated replicas times and all
+    the replicas are run at once as one population, with the stats of
+    every replica aggregated on its own.
+    If a schedule is given, only its steps are recorded, and with
+    skip_ahead the steps between them may be made at once.
+    With walk_on_spheres, the walkers of an OriginDistanceSimulator2D make
+    the steps inside a sphere around them at once, each one making its own
+    steps.
+    """
+    logers = [sim_globals.STATS_DICT[stats_type][1](stop_param,
+                                                    schedule=schedule)
+              for stats_type in stats_types]
+    if replicas is None:
+        state = simulation.get_walkers_state(walkers)
+    else:
+        if not isinstance(walkers, ensemble.Population2D):
+            walkers = ensemble.Population2D(walkers)
+        walkers = walkers.replicate(replicas)
+    _seed_walkers(walkers, seed)
+
+    def get_data(snapshot: simulation.Snapshot, steps_num: int) -> None:
+        for loger in logers:
+            loger.get_data(snapshot, steps_num)
+
+    simulator = sim_globals.STATS_DICT[stats_types[0]][0](
+        walkers, simulation_board, stop_param)
+    # the steps out of the schedule are skipped, unless a stats type must
+    # see all of them
+    if schedule is not None and not any(loger.every_step
+                                        for loger in logers):
+        simulator.set_schedule(schedule)
+    simulator.set_skip_ahead(skip_ahead)
+    if walk_on_spheres:
+        simulator.set_walk_on_spheres(walk_on_spheres)
+    try:
+        simulator.run_simulation(get_data, snapshot=True)
+    finally:
+        if replicas is None:
+            simulation.set_walkers_state(walkers, state)
+            if not isinstance(walkers, ensemble.Population2D):
+                for random_walker in walkers:
+                    random_walker.set_random(None)
+    return [loger.get_df() for loger in logers]
+
+
+def _init_worker(walkers: typing.Union[list[walker.Walker],
+                                       ensemble.Population2D],
+                 simulation_board: board.Board, stop_param: int,
+                 stats_types: list[str],
+                 schedule: typing.Optional[sampling.SamplingSchedule],
+                 skip_ahead: bool, walk_on_spheres: bool) -> None:
+    """
+    This function keeps the simulation data in a worker process.
+    """
+    _worker_data.update(walkers=walkers, simulation_board=simulation_board,
+                        stop_param=stop_param, stats_types=stats_types,
+                        schedule=schedule, skip_ahead=skip_ahead,
+                        walk_on_spheres=walk_on_spheres)
+
+
+def _run_worker_simulation(seed: np.random.SeedSequence,
+                           replicas: typing.Optional[int]) \
+        -> list[pd.DataFrame]:
+    """
+    This function runs one job in a worker process.
+    """
+    return _run_simulation(seed=seed, replicas=replicas, **_worker_data)
 
 
 def parse_args() -> argparse.Namespace:
@@ -83,12 +266,16 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument('-d', nargs='?',
                         help="Path to the json configuration")
     parser.add_argument('-g', action='store_true', help="Generate GUI")
+    parser.add_argument('-w', '--workers', type=int,
+                        help="Number of processes to run the simulations in")
     parser.add_argument('-h','--help', action="help",
                         # default=argparse.SUPPRESS,
                         help=("please read the documentation for more "
                               "information - README.md"))
 
     args = parser.parse_args()
+    if args.workers is not None and args.workers < 1:
+        parser.error("the number of workers must be at least 1")
     return args
 
 
@@ -104,10 +291,14 @@ def main() -> None:
         if info.json_parser() and info.check_data_for_simulation() and info.check_data_for_stats():
             walkers, simulation_board = info.get_data_for_simulation()
             operation, path, stop_param, simulations_num = info.get_data_for_stats()
-            simulation_instance = SimulationRunner(walkers,
-                                                   simulation_board,
-                                                   stop_param, operation,
-                                                   path)
+            workers = args.workers if args.workers is not None \
+                else info.get_workers()
+            simulation_instance = SimulationRunner(
+                walkers, simulation_board, stop_param, operation, path,
+                workers, replicas_memory=info.get_replicas_memory(),
+                schedule=info.get_schedule(),
+                skip_ahead=info.get_skip_ahead(),
+                walk_on_spheres=info.get_walk_on_spheres())
             simulation_instance.run_simulations(simulations_num)
         else:
             print("**** Invalid Json File. Please check the documentation! "
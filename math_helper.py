@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def check_float(*args: str) -> bool:
     """
     This function checks if the strings arguments are floats.
@@ -15,4 +18,90 @@ def check_float_positive(*args: str) -> bool:
     for num in args:
         if not num.replace(".", "").isdigit() or float(num) < 0:
             return False
-    return True
\ No newline at end of file
+    return True
+
+
+def concat_ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    This function returns the concatenation of range(start, end) for every
+    pair of start and end, without a python loop.
+    """
+    counts = ends - starts
+    total = int(np.sum(counts))
+    if not total:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return np.arange(total) + offsets
+
+
+def segment_circle_intersections(starts: np.ndarray, ends: np.ndarray,
+                                 center: np.ndarray,
+                                 radius: float) -> np.ndarray:
+    """
+    This function returns, for each of the (N, 2) segments from starts to
+    ends, the fraction of the segment at which it first touches the circle
+    (0 if it starts inside it), or inf if it does not touch it.
+    """
+    vectors = ends - starts
+    offsets = starts - center
+    a = np.einsum("ij,ij->i", vectors, vectors)
+    b = 2 * np.einsum("ij,ij->i", vectors, offsets)
+    c = np.einsum("ij,ij->i", offsets, offsets) - radius ** 2
+    discriminants = b ** 2 - 4 * a * c
+    fractions = np.full(len(starts), np.inf)
+    hit = (discriminants >= 0) & (a > 0)
+    first = np.full(len(starts), np.inf)
+    first[hit] = (-b[hit] - np.sqrt(discriminants[hit])) / (2 * a[hit])
+    enters = hit & (first >= 0) & (first <= 1)
+    fractions[enters] = first[enters]
+    fractions[c <= 0] = 0
+    return fractions
+
+
+def segment_box_intersections(starts: np.ndarray, ends: np.ndarray,
+                              box_start: np.ndarray,
+                              box_end: np.ndarray) -> np.ndarray:
+    """
+    This function returns, for each of the (N, 2) segments from starts to
+    ends, the fraction of the segment at which it first touches the axis
+    aligned box (0 if it starts inside it), or inf if it does not touch it.
+    """
+    vectors = ends - starts
+    entries = np.zeros(len(starts))
+    exits = np.ones(len(starts))
+    for axis in range(2):
+        moving = vectors[:, axis] != 0
+        outside = ~moving & ((starts[:, axis] < box_start[axis]) |
+                             (starts[:, axis] > box_end[axis]))
+        exits[outside] = -np.inf
+        low = np.full(len(starts), -np.inf)
+        high = np.full(len(starts), np.inf)
+        low[moving] = (box_start[axis] - starts[moving, axis]) / \
+            vectors[moving, axis]
+        high[moving] = (box_end[axis] - starts[moving, axis]) / \
+            vectors[moving, axis]
+        entries = np.maximum(entries, np.minimum(low, high))
+        exits = np.minimum(exits, np.maximum(low, high))
+    return np.where(entries <= exits, entries, np.inf)
+
+
+def circle_signed_distances(points: np.ndarray, center: np.ndarray,
+                            radius: float) -> np.ndarray:
+    """
+    This function returns the signed distance of each of the (N, 2) points
+    from the circle: positive outside it, negative inside it.
+    """
+    return np.hypot(points[:, 0] - center[0],
+                    points[:, 1] - center[1]) - radius
+
+
+def box_signed_distances(points: np.ndarray, box_start: np.ndarray,
+                         box_end: np.ndarray) -> np.ndarray:
+    """
+    This function returns the signed distance of each of the (N, 2) points
+    from the axis aligned box: positive outside it, negative inside it.
+    """
+    gaps = np.maximum(box_start - points, points - box_end)
+    outside = np.maximum(gaps, 0)
+    return np.hypot(outside[:, 0], outside[:, 1]) + \
+        np.minimum(np.max(gaps, axis=1), 0)
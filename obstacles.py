@@ -1,5 +1,7 @@
 import numpy as np
 
+import math_helper
+
 
 class Obstacle:
     """
@@ -11,12 +13,26 @@ class Obstacle:
     def is_location_in_obstacle(self, location: np.ndarray) -> np.bool_:
         raise NotImplementedError("is_location_in_obstacle not implemented")
 
+    def are_locations_in_obstacle(self, locations: np.ndarray) -> np.ndarray:
+        raise NotImplementedError("are_locations_in_obstacle not implemented")
+
     def get_charge(self) -> float:
         return self._charge
 
     def get_location(self) -> np.ndarray:
         raise NotImplementedError("get_location not implemented")
 
+    def get_bounding_box(self) -> np.ndarray:
+        raise NotImplementedError("get_bounding_box not implemented")
+
+    def get_segment_intersections(self, starts: np.ndarray,
+                                  ends: np.ndarray) -> np.ndarray:
+        raise NotImplementedError("get_segment_intersections not "
+                                  "implemented")
+
+    def get_signed_distances(self, locations: np.ndarray) -> np.ndarray:
+        raise NotImplementedError("get_signed_distances not implemented")
+
 
 class ObstacleCircle(Obstacle):
     """
@@ -41,9 +57,43 @@ class ObstacleCircle(Obstacle):
         location = np.array(location)
         return np.linalg.norm(self.__center - location) <= self.__radius
 
+    def are_locations_in_obstacle(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method checks which of the (N, 2) locations are inside the
+        circle obstacle, returns a boolean mask.
+        """
+        return np.linalg.norm(self.__center - locations, axis=1) <= \
+            self.__radius
+
     def get_location(self) -> np.ndarray:
         return self.__center
 
+    def get_bounding_box(self) -> np.ndarray:
+        """
+        This method returns the bounding box of the circle obstacle,
+        as [x_min, y_min, x_max, y_max].
+        """
+        return np.concatenate((self.__center - self.__radius,
+                               self.__center + self.__radius))
+
+    def get_segment_intersections(self, starts: np.ndarray,
+                                  ends: np.ndarray) -> np.ndarray:
+        """
+        This method returns, for each of the (N, 2) segments, the fraction
+        of the segment at which it first touches the circle obstacle,
+        or inf if it does not.
+        """
+        return math_helper.segment_circle_intersections(
+            starts, ends, self.__center, self.__radius)
+
+    def get_signed_distances(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method returns the signed distance of each of the (N, 2)
+        locations from the circle obstacle, negative inside it.
+        """
+        return math_helper.circle_signed_distances(locations, self.__center,
+                                                   self.__radius)
+
 
 class ObstacleRectangle(Obstacle):
     """
@@ -66,6 +116,39 @@ class ObstacleRectangle(Obstacle):
         return np.all(np.logical_and(location <= self.__end_point,
                                      location >= self.__start_point))
 
+    def are_locations_in_obstacle(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method checks which of the (N, 2) locations are inside the
+        rectangle obstacle, returns a boolean mask.
+        """
+        return np.all(np.logical_and(locations <= self.__end_point,
+                                     locations >= self.__start_point), axis=1)
+
     def get_location(self) -> np.ndarray:
         return (self.__start_point + self.__end_point) / 2
 
+    def get_bounding_box(self) -> np.ndarray:
+        """
+        This method returns the bounding box of the rectangle obstacle,
+        as [x_min, y_min, x_max, y_max].
+        """
+        return np.concatenate((self.__start_point, self.__end_point))
+
+    def get_segment_intersections(self, starts: np.ndarray,
+                                  ends: np.ndarray) -> np.ndarray:
+        """
+        This method returns, for each of the (N, 2) segments, the fraction
+        of the segment at which it first touches the rectangle obstacle,
+        or inf if it does not.
+        """
+        return math_helper.segment_box_intersections(
+            starts, ends, self.__start_point, self.__end_point)
+
+    def get_signed_distances(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method returns the signed distance of each of the (N, 2)
+        locations from the rectangle obstacle, negative inside it.
+        """
+        return math_helper.box_signed_distances(
+            locations, self.__start_point, self.__end_point)
+
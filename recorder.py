@@ -0,0 +1,75 @@
+import typing
+
+import numpy as np
+import pandas as pd
+
+# the number of records a recorder makes room for when it is not known
+INITIAL_RECORDS = 64
+
+
+class Recorder:
+    """
+    This class records columns of values, one record (a row per walker)
+    at a time, into preallocated numpy buffers.
+    The buffers are sized records x rows when the number of records is
+    known, and grow geometrically when it is not, so recording is
+    amortized O(1) per row. A data frame is only built once, by get_df.
+    """
+
+    def __init__(self, columns: dict[str, typing.Any],
+                 records: typing.Optional[int] = None) -> None:
+        """
+        columns maps every column name to its dtype, and records is the
+        expected number of records, if it is known.
+        """
+        self.__dtypes = columns
+        self.__records = records if records is not None else INITIAL_RECORDS
+        self.__buffers: dict[str, np.ndarray] = {
+            name: np.empty(0, dtype=dtype) for name, dtype in columns.items()}
+        self.__size = 0
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __reserve(self, rows: int) -> None:
+        """
+        This method makes sure there is room for rows more rows.
+        The first record sizes the buffers for all the expected records,
+        and afterwards the buffers double whenever they are full.
+        """
+        capacity = len(next(iter(self.__buffers.values()), []))
+        if self.__size + rows <= capacity:
+            return
+        if capacity == 0:
+            capacity = rows * self.__records
+        capacity = max(capacity * 2 if self.__size else capacity,
+                       self.__size + rows)
+        for name, buffer in self.__buffers.items():
+            new_buffer = np.empty(capacity, dtype=buffer.dtype)
+            new_buffer[:self.__size] = buffer[:self.__size]
+            self.__buffers[name] = new_buffer
+
+    def record(self, **values: typing.Any) -> None:
+        """
+        This method adds one record. Every column gets either an array of
+        the record's rows, or one value for all of them.
+        """
+        rows = max((np.size(value) for value in values.values()
+                    if np.ndim(value) > 0), default=1)
+        self.__reserve(rows)
+        for name, value in values.items():
+            self.__buffers[name][self.__size:self.__size + rows] = value
+        self.__size += rows
+
+    def get_column(self, name: str) -> np.ndarray:
+        """
+        This method returns the recorded values of a column.
+        """
+        return self.__buffers[name][:self.__size]
+
+    def get_df(self) -> pd.DataFrame:
+        """
+        This method returns the recorded values as a data frame.
+        """
+        return pd.DataFrame({name: self.get_column(name)
+                             for name in self.__dtypes})
@@ -0,0 +1,108 @@
+import bisect
+import math
+import typing
+
+
+class SamplingSchedule:
+    """
+    This class represents the steps at which the stats of a simulation are
+    sampled. This schedule samples every step.
+    """
+
+    def is_sampled(self, step: int) -> bool:
+        """
+        This method returns True if the step is sampled.
+        """
+        return True
+
+    def get_samples_num(self, last_step: int) -> int:
+        """
+        This method returns the number of sampled steps from 0 to last_step.
+        """
+        return last_step + 1
+
+    def get_next_step(self, step: int) -> typing.Optional[int]:
+        """
+        This method returns the first sampled step after the given step, or
+        None if there is none.
+        """
+        return step + 1
+
+
+class StrideSchedule(SamplingSchedule):
+    """
+    This class samples every k-th step (0, k, 2k, ...).
+    """
+
+    def __init__(self, stride: int) -> None:
+        if stride < 1:
+            raise ValueError("stride must be at least 1")
+        self.__stride = stride
+
+    def is_sampled(self, step: int) -> bool:
+        return step % self.__stride == 0
+
+    def get_samples_num(self, last_step: int) -> int:
+        return last_step // self.__stride + 1
+
+    def get_next_step(self, step: int) -> typing.Optional[int]:
+        return (step // self.__stride + 1) * self.__stride
+
+
+class StepsListSchedule(SamplingSchedule):
+    """
+    This class samples an explicit list of steps.
+    """
+
+    def __init__(self, steps: list[int]) -> None:
+        if any(step < 0 for step in steps):
+            raise ValueError("steps must not be negative")
+        self.__steps = set(steps)
+        self.__sorted_steps = sorted(self.__steps)
+
+    def is_sampled(self, step: int) -> bool:
+        return step in self.__steps
+
+    def get_samples_num(self, last_step: int) -> int:
+        return sum(1 for step in self.__steps if step <= last_step)
+
+    def get_next_step(self, step: int) -> typing.Optional[int]:
+        index = bisect.bisect_right(self.__sorted_steps, step)
+        if index == len(self.__sorted_steps):
+            return None
+        return self.__sorted_steps[index]
+
+
+class GeometricSchedule(SamplingSchedule):
+    """
+    This class samples geometrically spaced steps: 0 and the distinct
+    values of floor(factor^k), for diffusion plots on a log scale.
+    """
+
+    def __init__(self, factor: float) -> None:
+        if factor <= 1:
+            raise ValueError("factor must be greater than 1")
+        self.__factor = factor
+        self.__steps = {0, 1}
+        self.__last_power = 1.0
+
+    def __extend(self, step: int) -> None:
+        """
+        This method adds the sampled steps up to the given step.
+        """
+        while self.__last_power <= step:
+            self.__last_power *= self.__factor
+            self.__steps.add(math.floor(self.__last_power))
+
+    def is_sampled(self, step: int) -> bool:
+        self.__extend(step)
+        return step in self.__steps
+
+    def get_samples_num(self, last_step: int) -> int:
+        self.__extend(last_step)
+        return sum(1 for step in self.__steps if step <= last_step)
+
+    def get_next_step(self, step: int) -> typing.Optional[int]:
+        # after the extension, the last power is past the step
+        self.__extend(step + 1)
+        return min(sampled for sampled in self.__steps if sampled > step)
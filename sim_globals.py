@@ -3,6 +3,7 @@ import walker
 import obstacles
 import magical_gates
 import simulation
+import forces
 import stats
 import numpy as np
 import typing
@@ -13,12 +14,19 @@ MAX_SIM = 2 ** 63 - 1
 MIN_PARAM = 1
 MAX_PARAM = 2 ** 63 - 1
 
+# the default memory cap of the replicas run at once, in MB
+REPLICAS_MEMORY = 256
+
 OBSTACLES_DICT = {"circle": obstacles.ObstacleCircle,
                   "rectangle": obstacles.ObstacleRectangle}
 
 MAGICAL_GATES_DICT = {"circle": magical_gates.GateCircle,
                       "rectangle": magical_gates.GateRectangle}
 
+FORCE_SOLVERS_DICT = {"direct": forces.DirectForceSolver,
+                      "barnes_hut": forces.BarnesHutForceSolver,
+                      "particle_mesh": forces.ParticleMeshForceSolver}
+
 SIMULATION_DICT = {"StepsNumSimulator2D": simulation.StepsNumSimulator2D,
                    "OriginDistanceSimulator2D":
                        simulation.OriginDistanceSimulator2D}
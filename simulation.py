@@ -1,7 +1,137 @@
+import random
+import typing
+
 import numpy as np
 from walker import Walker
 import board
-import copy
+import ensemble
+import sampling
+
+Walkers = typing.Union[list[Walker], ensemble.Population2D]
+# the fewest steps a walker makes at once in the walk on spheres
+JUMP_MIN_STEPS = 2
+
+
+def get_walkers_state(walkers: Walkers) -> typing.Any:
+    """
+    This function returns the state of the walkers, to reset them to it
+    later with set_walkers_state, instead of copying them.
+    """
+    if isinstance(walkers, ensemble.Population2D):
+        return walkers.get_state()
+    return [r_walker.get_state() for r_walker in walkers]
+
+
+def set_walkers_state(walkers: Walkers, state: typing.Any) -> None:
+    """
+    This function resets the walkers to a state returned by
+    get_walkers_state.
+    """
+    if isinstance(walkers, ensemble.Population2D):
+        walkers.set_state(state)
+        return
+    for r_walker, walker_state in zip(walkers, state):
+        r_walker.set_state(walker_state)
+
+
+class Snapshot:
+    """
+    This class represents the walkers of a simulation as arrays: their
+    positions, integer ids, type codes (see walker.WALKER_TYPES) and
+    replicas.
+    The arrays are read-only views, which are refreshed in place every
+    step, so consumers can keep them and work on all the walkers at once.
+    If the walkers do not all make the same number of steps, the snapshot
+    also has the steps of every walker.
+    """
+    def __init__(self, walkers: Walkers) -> None:
+        self.__walkers = walkers
+        self.__uuids: typing.Optional[list[str]] = None
+        if isinstance(walkers, ensemble.Population2D):
+            ids = walkers.get_ids()
+            types = walkers.get_type_codes()
+            replicas = walkers.get_replicas()
+        else:
+            ids = np.array([r_walker.get_id() for r_walker in walkers],
+                           dtype=np.int64)
+            types = np.array([r_walker.get_type_code()
+                              for r_walker in walkers], dtype=np.int32)
+            replicas = np.zeros(len(walkers), dtype=np.int32)
+        self.__positions = np.zeros((len(ids), 2))
+        self.__steps: typing.Optional[np.ndarray] = None
+        self.__steps_view: typing.Optional[np.ndarray] = None
+        self.__ids = self.__read_only(ids)
+        self.__types = self.__read_only(types)
+        self.__replicas = self.__read_only(replicas)
+        self.__positions_view = self.__read_only(self.__positions.view())
+        self.refresh(walkers)
+
+    @staticmethod
+    def __read_only(array: np.ndarray) -> np.ndarray:
+        array.flags.writeable = False
+        return array
+
+    def __len__(self) -> int:
+        return len(self.__ids)
+
+    def refresh(self, walkers: Walkers,
+                steps: typing.Optional[np.ndarray] = None) -> None:
+        """
+        This method copies the current locations of the walkers into the
+        positions array, with no intermediate array for a population, and
+        the steps of every walker if they are given.
+        """
+        if steps is not None:
+            if self.__steps is None:
+                self.__steps = np.zeros(len(self), dtype=np.int64)
+                self.__steps_view = self.__read_only(self.__steps.view())
+            self.__steps[:] = steps
+        if isinstance(walkers, ensemble.Population2D):
+            walkers.get_locations(out=self.__positions)
+            return
+        for index, r_walker in enumerate(walkers):
+            self.__positions[index] = r_walker.get_location()
+
+    def get_positions(self) -> np.ndarray:
+        """
+        This method returns the (N, 2) positions of the walkers.
+        """
+        return self.__positions_view
+
+    def get_ids(self) -> np.ndarray:
+        """
+        This method returns the ids of the walkers.
+        """
+        return self.__ids
+
+    def get_types(self) -> np.ndarray:
+        """
+        This method returns the type code of every walker.
+        """
+        return self.__types
+
+    def get_replicas(self) -> np.ndarray:
+        """
+        This method returns the replica of every walker (0 unless the
+        walkers were replicated).
+        """
+        return self.__replicas
+
+    def get_steps(self) -> typing.Optional[np.ndarray]:
+        """
+        This method returns the steps every walker made, or None if all
+        the walkers made the steps of the simulation.
+        """
+        return self.__steps_view
+
+    def get_uuids(self) -> list[str]:
+        """
+        This method returns the uuids of the walkers, for display.
+        """
+        if self.__uuids is None:
+            self.__uuids = [r_walker.get_uuid()
+                            for r_walker in self.__walkers]
+        return self.__uuids
 
 
 class Simulator:
@@ -19,42 +149,159 @@ class Simulator2D(Simulator):
     """
     def __init__(self) -> None:
         super().__init__()
-        self._walkers: list[Walker] = []
+        self._walkers: Walkers = []
         self._board = board.Board()
         self._steps = 0
         self._num_simulations = 0
+        self._schedule = sampling.SamplingSchedule()
+        self._snapshot: typing.Optional[Snapshot] = None
+        self._skip_ahead = False
         self.__stop = False  # flag to stop simulation
 
+    def _get_active(self) -> typing.Optional[np.ndarray]:
+        """
+        This method returns the mask of the walkers that are still moved,
+        or None if all of them are.
+        """
+        return None
+
+    def _get_walkers_steps(self) -> typing.Optional[np.ndarray]:
+        """
+        This method returns the steps every walker made, or None if all
+        the walkers made the steps of the simulation.
+        """
+        return None
+
+    def get_snapshot(self) -> Snapshot:
+        """
+        This method returns the snapshot of the walkers. It is refreshed
+        before every callback once it was requested.
+        """
+        if self._snapshot is None:
+            self._snapshot = Snapshot(self._walkers)
+        return self._snapshot
+
+    def _get_steps_to_stop(self) -> typing.Optional[int]:
+        """
+        This method returns the number of steps left until the simulation
+        stops, or None if it is not known ahead.
+        """
+        return None
+
+    def set_schedule(self, schedule: sampling.SamplingSchedule) -> None:
+        """
+        This method sets the steps at which the callback is called.
+        """
+        self._schedule = schedule
+
+    def set_skip_ahead(self, skip_ahead: bool) -> None:
+        """
+        This method sets the skip-ahead mode: the steps between two steps of
+        the schedule are drawn at once for the walkers that are far enough
+        from every shape. It only applies to populations of walkers on the
+        lattice, and to simulations whose last step is known ahead.
+        """
+        self._skip_ahead = skip_ahead
+
     def stop_simulation(self) -> None:
         self.__stop = True  # change flag to stop simulation
 
     def continue_simulation(self) -> None:
         self.__stop = False  # change flag to continue simulation
 
-    def run_simulation(self, callback_func) -> None:
+    def __get_callback_data(self, snapshot: bool) -> typing.Union[Walkers,
+                                                                  Snapshot]:
+        """
+        This method returns the data for the callback: the walkers, or
+        their refreshed snapshot.
+        """
+        if snapshot:
+            self.get_snapshot()
+        if self._snapshot is not None:
+            self._snapshot.refresh(self._walkers, self._get_walkers_steps())
+        return self._snapshot if snapshot else self._walkers
+
+    def __get_skipped_steps(self) -> int:
+        """
+        This method returns the number of steps to make at once, up to the
+        next step of the schedule or the last step.
+        """
+        if not self._skip_ahead or \
+                not isinstance(self._walkers, ensemble.Population2D):
+            return 1
+        steps_to_stop = self._get_steps_to_stop()
+        if steps_to_stop is None:
+            return 1
+        next_step = self._schedule.get_next_step(self._steps)
+        if next_step is None:
+            return steps_to_stop
+        return min(next_step - self._steps, steps_to_stop)
+
+    def __skip_steps(self, steps_num: int) -> None:
+        """
+        This method makes steps_num steps at once. A walker on the lattice
+        moves at most steps_num from its location, so the walkers farther
+        than that from every shape, by the board's distance field (a lower
+        bound of the distance, see Board2D.get_distances), jump there in
+        one draw, and the others are moved one step at a time.
+        """
+        jumping = self._walkers.get_skippable()
+        jumping[jumping] = self._board.get_distances(
+            self._walkers.get_locations()[jumping]) > steps_num
+        self._walkers.skip_steps(steps_num, jumping)
+        active = ~jumping
+        if self._get_active() is not None:
+            active &= self._get_active()
+        if np.any(active):
+            for _ in range(steps_num):
+                self._board.move_walkers(self._walkers, active)
+
+    def _move_walkers(self) -> int:
+        """
+        This method moves the walkers, and returns the number of steps they
+        made.
+        """
+        steps_num = self.__get_skipped_steps()
+        if steps_num > 1:
+            self.__skip_steps(steps_num)
+        else:
+            self._board.move_walkers(self._walkers, self._get_active())
+        return steps_num
+
+    def run_simulation(self, callback_func, snapshot: bool = False) -> None:
         """
         This method runs the simulation while the stop_simulation is False,
-        and calls the callback_func at each step (stats or gui).
+        and calls the callback_func (stats or gui) at each step of the
+        schedule, and at the last step.
+        The callback_func gets the walkers, or their snapshot if snapshot is
+        True.
+        In the skip-ahead mode, the steps between the callbacks may be made
+        at once.
         """
         self._steps = 0
         while not self._stop_simulation() and not self.__stop:
-            callback_func(self._walkers, self._steps)
-            self._board.move_walkers(self._walkers)
-            self._steps += 1
-        callback_func(self._walkers, self._steps)
+            if self._schedule.is_sampled(self._steps):
+                callback_func(self.__get_callback_data(snapshot), self._steps)
+            self._steps += self._move_walkers()
+        callback_func(self.__get_callback_data(snapshot), self._steps)
 
 
 class StepsNumSimulator2D(Simulator2D):
     """
     This class represents a simulator that stops after a certain number of steps.
+    The walkers are moved in place, use get_walkers_state and
+    set_walkers_state to run them again from the same state.
     """
-    def __init__(self, walkers: list[Walker], simulation_board: board.Board,
+    def __init__(self, walkers: Walkers, simulation_board: board.Board,
                  num_steps: int):
         super().__init__()
         self.__num_steps = num_steps
-        self._walkers = copy.deepcopy(walkers)
+        self._walkers = walkers
         self._board = simulation_board
 
+    def _get_steps_to_stop(self) -> int:
+        return self.__num_steps - self._steps
+
     def _stop_simulation(self):
         """
         This method stops the simulation after a certain number of steps.
@@ -67,31 +314,160 @@ class StepsNumSimulator2D(Simulator2D):
 class OriginDistanceSimulator2D(Simulator2D):
     """
     This class represents a simulator that stops after a certain distance from the origin.
+    In the walk-on-spheres mode, every walker makes its own steps. A walker
+    whose sphere around it is clear of the shapes, and inside the next
+    integer radius (and the distance), makes as many steps as it can
+    without leaving the sphere, at once: a walker can not get out of a
+    sphere of radius n in less than n unit steps. The others make one step.
+    Every step is drawn, so the walks keep their distribution, and no
+    first step at a radius is missed.
+    The steps of the simulation are then the most steps a walker made, and
+    every walker's own steps are in the snapshot (Snapshot.get_steps).
     """
-    def __init__(self, walkers: list[Walker], simulation_board: board.Board,
+    def __init__(self, walkers: Walkers, simulation_board: board.Board,
                  distance: float):
         super().__init__()
         self._walkers = walkers
         self._board = simulation_board
         self.__distance = distance
-        self.__relevant_walkers: list[str] = []
-        self.__init_walkers()
+        # the walkers that did not get to the distance yet
+        self.__active = np.ones(len(self._walkers), dtype=bool)
+        self.__walk_on_spheres = False
+        # the largest integer radius every walker got to, and the steps
+        # every walker made
+        self.__radii = np.zeros(len(self._walkers), dtype=np.int64)
+        self.__clocks = np.zeros(len(self._walkers), dtype=np.int64)
+        self.__locations = np.zeros((len(self._walkers), 2))
+        self.__distances = np.zeros(len(self._walkers))
+        self.__rng: typing.Optional[np.random.Generator] = None
+
+    def set_walk_on_spheres(self, walk_on_spheres: bool) -> None:
+        """
+        This method sets the walk-on-spheres mode. All the walkers must be
+        able to walk on spheres, and the callback gets the snapshot of the
+        walkers with the steps every walker made.
+        """
+        if walk_on_spheres and not self.__can_walk_on_spheres():
+            raise ValueError("the walkers can't walk on spheres")
+        self.__walk_on_spheres = walk_on_spheres
+
+    def __can_walk_on_spheres(self) -> bool:
+        """
+        This method returns True if all the walkers can walk on spheres.
+        """
+        if isinstance(self._walkers, ensemble.Population2D):
+            return self._walkers.can_walk_on_spheres()
+        return all(r_walker.can_walk_on_spheres()
+                   for r_walker in self._walkers)
+
+    def _get_active(self) -> np.ndarray:
+        """
+        This method returns the mask of the walkers that did not get to the
+        distance yet. The others are retired: they are not moved anymore,
+        and the charged ones still attract the others from where they are.
+        """
+        return self.__active
+
+    def _get_walkers_steps(self) -> typing.Optional[np.ndarray]:
+        return self.__clocks if self.__walk_on_spheres else None
+
+    def __get_locations(self) -> np.ndarray:
+        """
+        This method returns the locations of the walkers, as one (N, 2) array.
+        """
+        if isinstance(self._walkers, ensemble.Population2D):
+            return self._walkers.get_locations()
+        return np.array([r_walker.get_location()
+                         for r_walker in self._walkers],
+                        dtype=float).reshape(-1, 2)
+
+    def __get_rng(self) -> np.random.Generator:
+        """
+        This method returns the random generator of the run: the one of the
+        population, or one seeded from the generator of the walkers.
+        """
+        if self.__rng is None:
+            if isinstance(self._walkers, ensemble.Population2D):
+                self.__rng = self._walkers.get_rng()
+            else:
+                generator = self._walkers[0].get_random() if self._walkers \
+                    else random
+                self.__rng = np.random.default_rng(generator.getrandbits(64))
+        return self.__rng
+
+    def __get_jumps(self, steps: np.ndarray) -> np.ndarray:
+        """
+        This method draws the unit steps of every jump, and returns the
+        (N, 2) vector every walker gets to.
+        """
+        directions = self.__get_rng().uniform(0, 2, int(np.sum(steps))) * \
+            np.pi
+        starts = np.cumsum(steps) - steps
+        return np.column_stack((np.add.reduceat(np.cos(directions), starts),
+                                np.add.reduceat(np.sin(directions), starts)))
+
+    def __move_on_spheres(self) -> int:
+        """
+        This method moves every active walker once: the walkers with a
+        sphere of JUMP_MIN_STEPS or more around them make all the steps in
+        it at once, and the others make one step.
+        It returns the number of steps the simulation got ahead.
+        """
+        bounds = np.minimum(self.__radii + 1, self.__distance) - \
+            self.__distances
+        jumping = np.flatnonzero(self.__active & (bounds > JUMP_MIN_STEPS))
+        # the walker must stay less than the sphere's radius from its center
+        steps = np.ceil(np.minimum(bounds[jumping], self._board.get_distances(
+            self.__locations[jumping]))).astype(np.int64) - 1
+        jumping, steps = jumping[steps >= JUMP_MIN_STEPS], \
+            steps[steps >= JUMP_MIN_STEPS]
+        moving = self.__active.copy()
+        moving[jumping] = False
+        if np.any(moving):
+            self._board.move_walkers(self._walkers, moving)
+            self.__clocks[moving] += 1
+        if len(jumping):
+            vectors = self.__get_jumps(steps)
+            if isinstance(self._walkers, ensemble.Population2D):
+                all_vectors = np.zeros((len(self._walkers), 2))
+                all_vectors[jumping] = vectors
+                self._walkers.jump(all_vectors, self.__active & ~moving)
+            else:
+                for index, vector in zip(jumping, vectors):
+                    self._walkers[index].jump(vector)
+            self.__clocks[jumping] += steps
+        return int(np.max(self.__clocks)) - self._steps
+
+    def _move_walkers(self) -> int:
+        """
+        This method moves the walkers, and returns the number of steps they
+        made. In the walk-on-spheres mode, the simulation gets to the most
+        steps a walker made.
+        """
+        if not self.__walk_on_spheres:
+            return super()._move_walkers()
+        return self.__move_on_spheres()
 
-    def __init_walkers(self):
+    def run_simulation(self, callback_func, snapshot: bool = False) -> None:
         """
-        This method initializes the valid walkers for the simulation.
+        This method runs the simulation, like Simulator2D.run_simulation.
+        In the walk-on-spheres mode, the walkers make their own steps, so
+        the callback must get the snapshot, which has the steps of every
+        walker.
         """
-        for walker in self._walkers:
-            self.__relevant_walkers.append(walker.get_uuid())
+        if self.__walk_on_spheres and not snapshot:
+            raise ValueError("the walk on spheres requires the snapshot")
+        super().run_simulation(callback_func, snapshot)
 
     def _stop_simulation(self):
         """
-        This method stops the simulation after a certain distance from the origin.
+        This method stops the simulation after a certain distance from the
+        origin, and retires every walker that got to it.
         """
-        for walker in self._walkers:
-            if walker.get_uuid() in self.__relevant_walkers:
-                if np.linalg.norm(walker.get_location()) < self.__distance:
-                    return False
-                else:
-                    self.__relevant_walkers.remove(walker.get_uuid())
-        return True
+        # kept for the walk on spheres, which comes before the next move
+        self.__locations = self.__get_locations()
+        self.__distances = np.linalg.norm(self.__locations, axis=1)
+        self.__radii = np.maximum(self.__radii,
+                                  self.__distances.astype(np.int64))
+        self.__active &= self.__distances < self.__distance
+        return not np.any(self.__active)
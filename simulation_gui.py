@@ -1,4 +1,6 @@
 import tkinter as tk
+import typing
+
 import pandas as pd
 
 import board
@@ -31,6 +33,7 @@ class SimulationWindow(tk.Tk):
         # data for simulation
         self._board = board.Board()
         self._walkers: list[walker.Walker] = []
+        self._snapshot: typing.Optional[simulation.Snapshot] = None
         self._num_steps = num_steps
         self.__walkers_points: dict[str, int] = {}
         self.sim_thread = None
@@ -145,33 +148,34 @@ class SimulationWindow(tk.Tk):
         """
         This method moves the points, painting the points without their route.
         """
-        for r_walker in self._walkers:
-            name = r_walker.get_uuid()
-            point = r_walker.get_location()
-            x_next, y_next = self.__calculate_next_location(point)
+        next_locations = self.__calculate_next_locations(
+            self._snapshot.get_positions())
+        for name, (x_next, y_next) in zip(self._snapshot.get_uuids(),
+                                          next_locations.tolist()):
             self._canvas.moveto(self.__walkers_points[name], x_next, y_next)
         self.__update_stats()
         self._canvas.grid()
 
-    def __calculate_next_location(self, point: np.ndarray) -> tuple[float, float]:
+    def __calculate_next_locations(self, points: np.ndarray) -> np.ndarray:
         """
-        This method calculates the next location of the walker,
-        according to the point, canvas middle and radius length.
+        This method calculates the next locations of the walkers,
+        according to the points, canvas middle and radius length.
         """
-        x_next = self._canvas_middle[0] + point[0] - self.__radius_length
-        y_next = self._canvas_middle[1] - point[1] - self.__radius_length
-        return float(x_next), float(y_next)
+        return np.column_stack(
+            (self._canvas_middle[0] + points[:, 0] - self.__radius_length,
+             self._canvas_middle[1] - points[:, 1] - self.__radius_length))
 
     def __move_points_with_route(self) -> None:
         """
         This method moves the points, painting the points and their route.
         """
-        for r_walker in self._walkers:
-            name = r_walker.get_uuid()
-            point = r_walker.get_location()
-            walker_type = r_walker.get_type()
+        next_locations = self.__calculate_next_locations(
+            self._snapshot.get_positions())
+        for name, type_code, (x_next, y_next) in zip(
+                self._snapshot.get_uuids(), self._snapshot.get_types(),
+                next_locations.tolist()):
+            walker_type = walker.WALKER_TYPES.get_name(type_code)
 
-            x_next, y_next = self.__calculate_next_location(point)
             location = self._canvas.coords(self.__walkers_points[name])
             x_current = location[0] + self.__radius_length
             y_current = location[1] + self.__radius_length
@@ -260,6 +264,7 @@ class SimulationWindow(tk.Tk):
         self.__step_counter_label.config(text=f"Step: {self._step_counter}")
         for walker in self._walkers:
             walker.restart()
+        self._snapshot = simulation.Snapshot(self._walkers)
         self.__move_points()
         self._canvas.delete("line_tag")
 
@@ -285,8 +290,7 @@ class SimulationWindow(tk.Tk):
         This method parses the data from the GUI.
         """
         data = {"board": {"walkers": self._walkers_list, "obstacles":
-            self._obstacles, "magical_gates": self._magical_gates}, "simulation": {
-            "num_of"}}
+            self._obstacles, "magical_gates": self._magical_gates}, "simulation": {}}
         parser = info_parser.InfoFromGui(data)
         parser.check_data_for_simulation()
         self._walkers, self._board = parser.get_data_for_simulation()
@@ -305,6 +309,7 @@ class SimulationWindow(tk.Tk):
         This method is called from the simulation class.
         """
         self._walkers = walkers
+        self._snapshot = self._simulator.get_snapshot()
         self._step_counter += 1
         self.__step_counter_label.config(text=f"Step: {self._step_counter}",
                                          bg="black", fg="white")
@@ -334,15 +339,13 @@ class SimulationWindow(tk.Tk):
         """
         This method updates the stats data frame.
         """
-        self._df = pd.DataFrame({"walkers": [], "distance": [],
-                                 "distance_x": [], "distance_y": []})
-        for random_walker in self._walkers:
-            distance = np.linalg.norm(random_walker.get_location())
-            distance_x = abs(random_walker.get_location()[1])
-            distance_y = abs(random_walker.get_location()[0])
-            self._df.loc[len(self._df.index)] = [random_walker.get_uuid(),
-                                                 distance, distance_x, distance_y]
-        self._df["walkers"] = self._df["walkers"].apply(lambda a: a.split("_")[0])
+        positions = self._snapshot.get_positions()
+        self._df = pd.DataFrame({
+            "walkers": walker.WALKER_TYPES.get_names(
+                self._snapshot.get_types()),
+            "distance": np.linalg.norm(positions, axis=1),
+            "distance_x": np.abs(positions[:, 1]),
+            "distance_y": np.abs(positions[:, 0])})
         self._df = self._df.groupby(["walkers"], as_index=False).mean()
 
     def __define_colors(self) -> None:
@@ -0,0 +1,352 @@
+import math
+import typing
+
+import numpy as np
+
+import math_helper
+
+# the max number of cells a single shape may cover along one axis
+MAX_CELLS_PER_SHAPE = 64
+# shifts the cell coordinates to non-negative values, to pack them in a key
+CELL_OFFSET = 2 ** 31
+# the max number of points a lattice map may have
+MAX_LATTICE_POINTS = 2 ** 22
+# the codes of the lattice points which are not in a magical gate
+LATTICE_FREE = -1
+LATTICE_OBSTACLE = -2
+# the max number of nodes a distance field may have by default, and about
+# the max number of shape distances computed to build it
+MAX_DISTANCE_FIELD_POINTS = 2 ** 22
+
+
+class UniformGrid:
+    """
+    This class represents a uniform grid over the board, which maps every
+    cell to the shapes (obstacles or magical gates) whose bounding box
+    touches it.
+    A location is then only checked against the shapes of its own cell.
+    """
+
+    def __init__(self, shapes: list[typing.Any],
+                 cell_size: typing.Optional[float] = None) -> None:
+        self.__shapes = shapes
+        self.__cells: dict[tuple[int, int], list[typing.Any]] = {}
+        self.__keys = np.zeros(0, dtype=np.int64)
+        self.__starts = np.zeros(0, dtype=np.int64)
+        self.__ends = np.zeros(0, dtype=np.int64)
+        self.__indices = np.zeros(0, dtype=np.int64)
+        if not shapes:
+            self.__cell_size = 1.0
+            return
+        boxes = np.array([shape.get_bounding_box() for shape in shapes],
+                         dtype=float)
+        self.__cell_size = cell_size if cell_size is not None \
+            else self.__default_cell_size(boxes)
+        first_cells = np.floor(boxes[:, :2] / self.__cell_size).astype(int)
+        last_cells = np.floor(boxes[:, 2:] / self.__cell_size).astype(int)
+        # shapes are added in their board order, so every cell keeps it
+        for shape, first, last in zip(shapes, first_cells, last_cells):
+            for x in range(first[0], last[0] + 1):
+                for y in range(first[1], last[1] + 1):
+                    self.__cells.setdefault((x, y), []).append(shape)
+        self.__build_arrays()
+
+    @staticmethod
+    def __get_key(cells: np.ndarray) -> np.ndarray:
+        """
+        This method packs (N, 2) cell coordinates into one int64 key each.
+        """
+        cells = cells.astype(np.int64) + CELL_OFFSET
+        return (cells[:, 0] << 32) | cells[:, 1]
+
+    def __build_arrays(self) -> None:
+        """
+        This method stores the cells as sorted keys, each one with a range
+        in one flat array of shape indices, for batched queries.
+        """
+        shapes_indices = {id(shape): index
+                          for index, shape in enumerate(self.__shapes)}
+        cells = list(self.__cells.values())
+        keys = self.__get_key(np.array(list(self.__cells.keys())))
+        order = np.argsort(keys)
+        self.__keys = keys[order]
+        counts = np.array([len(cells[cell]) for cell in order])
+        self.__ends = np.cumsum(counts)
+        self.__starts = self.__ends - counts
+        self.__indices = np.array([shapes_indices[id(shape)]
+                                   for cell in order
+                                   for shape in cells[cell]], dtype=np.int64)
+
+    @staticmethod
+    def __default_cell_size(boxes: np.ndarray) -> float:
+        """
+        This method returns a cell size close to the typical shape size,
+        large enough that no shape covers too many cells.
+        """
+        sizes = np.max(boxes[:, 2:] - boxes[:, :2], axis=1)
+        return float(max(np.median(sizes),
+                         np.max(sizes) / MAX_CELLS_PER_SHAPE, 1e-9))
+
+    def get_cell_size(self) -> float:
+        return self.__cell_size
+
+    def get_shapes(self) -> list[typing.Any]:
+        return self.__shapes
+
+    def get_candidates(self, location: np.ndarray) -> list[typing.Any]:
+        """
+        This method returns the shapes that may contain the location,
+        in their board order.
+        """
+        key = (math.floor(location[0] / self.__cell_size),
+               math.floor(location[1] / self.__cell_size))
+        return self.__cells.get(key, [])
+
+    def __get_pairs(self, first_cells: np.ndarray,
+                    last_cells: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        This method returns the (query, shape) candidate pairs of queries
+        that cover boxes of cells, from first_cells to last_cells, as two
+        arrays sorted by shape. A query that covers more cells than the grid
+        has is paired with every shape.
+        """
+        sizes = last_cells - first_cells + 1
+        counts = sizes[:, 0] * sizes[:, 1]
+        wide = counts > len(self.__keys)
+        narrow = np.flatnonzero(~wide)
+        queries = np.repeat(narrow, counts[narrow])
+        local = math_helper.concat_ranges(
+            np.zeros(len(narrow), dtype=np.int64), counts[narrow])
+        cells = first_cells[queries] + np.column_stack(
+            (local // sizes[queries, 1], local % sizes[queries, 1]))
+        keys = self.__get_key(cells)
+        found = np.minimum(np.searchsorted(self.__keys, keys),
+                           len(self.__keys) - 1)
+        exists = self.__keys[found] == keys
+        queries, found = queries[exists], found[exists]
+        counts = self.__ends[found] - self.__starts[found]
+        pairs_queries = np.repeat(queries, counts)
+        pairs_shapes = self.__indices[math_helper.concat_ranges(
+            self.__starts[found], self.__ends[found])]
+        wide = np.flatnonzero(wide)
+        pairs_queries = np.concatenate(
+            (pairs_queries, np.repeat(wide, len(self.__shapes))))
+        pairs_shapes = np.concatenate(
+            (pairs_shapes, np.tile(np.arange(len(self.__shapes)), len(wide))))
+        # a box of cells may meet the same shape in several cells
+        pairs = np.unique(pairs_shapes * (len(first_cells) + 1) +
+                          pairs_queries)
+        return pairs % (len(first_cells) + 1), pairs // (len(first_cells) + 1)
+
+    def __group_by_shape(self, first_cells: np.ndarray,
+                         last_cells: np.ndarray) \
+            -> typing.Iterator[tuple[int, np.ndarray]]:
+        """
+        This method yields every candidate shape index with the queries it
+        should be checked against, in board order.
+        """
+        if not len(self.__keys) or not len(first_cells):
+            return
+        pairs_queries, pairs_shapes = self.__get_pairs(first_cells,
+                                                       last_cells)
+        shapes, starts = np.unique(pairs_shapes, return_index=True)
+        ends = np.r_[starts[1:], len(pairs_shapes)]
+        for shape, start, end in zip(shapes, starts, ends):
+            yield int(shape), pairs_queries[start:end]
+
+    def get_first_shapes(self, locations: np.ndarray,
+                         contains: typing.Callable[[typing.Any, np.ndarray],
+                                                   np.ndarray]) -> np.ndarray:
+        """
+        This method returns, for each of the (N, 2) locations, the index of
+        the first shape (in board order) that contains it, or -1.
+        Only the shapes of each location's cell are checked, with one
+        batched contains(shape, locations) call per candidate shape.
+        """
+        first_shapes = np.full(len(locations), -1)
+        cells = np.floor(locations / self.__cell_size).astype(np.int64)
+        for shape, candidates in self.__group_by_shape(cells, cells):
+            inside = candidates[contains(self.__shapes[shape],
+                                         locations[candidates])]
+            # shapes come in board order, so the first one is kept
+            inside = inside[first_shapes[inside] < 0]
+            first_shapes[inside] = shape
+        return first_shapes
+
+    def get_first_hits(self, starts: np.ndarray, ends: np.ndarray,
+                       intersect: typing.Callable[
+                           [typing.Any, np.ndarray, np.ndarray], np.ndarray]) \
+            -> tuple[np.ndarray, np.ndarray]:
+        """
+        This method returns, for each of the (N, 2) segments from starts to
+        ends, the index of the first shape it touches (the earliest along
+        the segment, and the first in board order on a tie) or -1, and the
+        fraction of the segment at which it touches it (or inf).
+        Only the shapes of the cells around each segment are checked, with
+        one batched intersect(shape, starts, ends) call per candidate shape.
+        """
+        first_shapes = np.full(len(starts), -1)
+        fractions = np.full(len(starts), np.inf)
+        first_cells = np.floor(np.minimum(starts, ends) /
+                               self.__cell_size).astype(np.int64)
+        last_cells = np.floor(np.maximum(starts, ends) /
+                              self.__cell_size).astype(np.int64)
+        for shape, candidates in self.__group_by_shape(first_cells,
+                                                       last_cells):
+            shape_fractions = intersect(self.__shapes[shape],
+                                        starts[candidates], ends[candidates])
+            earlier = shape_fractions < fractions[candidates]
+            fractions[candidates[earlier]] = shape_fractions[earlier]
+            first_shapes[candidates[earlier]] = shape
+        return first_shapes, fractions
+
+
+class LatticeMap:
+    """
+    This class represents the integer points of the board around its shapes,
+    as one array of codes: every point is free (LATTICE_FREE), in an
+    obstacle (LATTICE_OBSTACLE) or in a magical gate (the gate's index).
+    A walker on the lattice is then checked with a single lookup.
+    The points out of the map are not in any shape, so they are free.
+    """
+
+    def __init__(self, boxes: np.ndarray,
+                 get_codes: typing.Callable[[np.ndarray], np.ndarray]) \
+            -> None:
+        """
+        boxes are the (N, 4) bounding boxes of the shapes, and get_codes
+        returns the codes of (N, 2) points, computed once for every point
+        of the map.
+        """
+        self.__first_point, last_point = self.__get_corners(boxes)
+        points = np.stack(np.meshgrid(
+            np.arange(self.__first_point[0], last_point[0] + 1),
+            np.arange(self.__first_point[1], last_point[1] + 1),
+            indexing="ij"), axis=-1)
+        self.__codes = get_codes(points.reshape(-1, 2)).astype(
+            np.int32).reshape(points.shape[:2])
+
+    @staticmethod
+    def __get_corners(boxes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        This method returns the first and last lattice points of the box
+        around the bounding boxes.
+        """
+        return np.floor(np.min(boxes[:, :2], axis=0)).astype(np.int64), \
+            np.ceil(np.max(boxes[:, 2:], axis=0)).astype(np.int64)
+
+    @staticmethod
+    def get_points_num(boxes: np.ndarray) -> float:
+        """
+        This method returns the number of points a map of the bounding
+        boxes would have.
+        """
+        first_point, last_point = LatticeMap.__get_corners(boxes)
+        return float(np.prod((last_point - first_point + 1).astype(float)))
+
+    def get_codes(self, points: np.ndarray) -> np.ndarray:
+        """
+        This method returns the codes of the (N, 2) integer points.
+        """
+        indices = points - self.__first_point
+        inside = np.all((indices >= 0) & (indices < self.__codes.shape),
+                        axis=1)
+        codes = np.full(len(points), LATTICE_FREE, dtype=np.int32)
+        codes[inside] = self.__codes[indices[inside, 0], indices[inside, 1]]
+        return codes
+
+
+class DistanceField:
+    """
+    This class represents the signed distance from the board's shapes
+    (negative inside them), computed once on the nodes of a grid over an
+    extent. The nodes keep the distance up to max_distance, so only the
+    nodes around every shape are computed.
+    A location in the extent gets a lower bound of its distance with one
+    lookup: the distance of its nearest node less the gap between them,
+    since the distance changes no faster than the location. The locations
+    out of the extent get the exact distance.
+    """
+
+    def __init__(self, extent: list[float], resolution: float,
+                 boxes: np.ndarray,
+                 get_shape_distances: typing.Callable[[int, np.ndarray],
+                                                      np.ndarray],
+                 max_distance: float) -> None:
+        """
+        boxes are the (N, 4) bounding boxes of the shapes, and
+        get_shape_distances(shape, points) returns the signed distances of
+        (N, 2) points from a shape, by its index.
+        """
+        x_min, y_min, x_max, y_max = extent
+        if resolution <= 0 or x_max <= x_min or y_max <= y_min:
+            raise ValueError("resolution must be positive and the extent "
+                             "must be [x_min, y_min, x_max, y_max]")
+        self.__corner = np.array([x_min, y_min], dtype=float)
+        self.__resolution = resolution
+        self.__shape = np.array([int(np.ceil((x_max - x_min) / resolution)),
+                                 int(np.ceil((y_max - y_min) / resolution))]) \
+            + 1
+        self.__boxes = boxes
+        self.__get_shape_distances = get_shape_distances
+        self.__max_distance = max_distance
+        self.__field = np.full(self.__shape, float(max_distance))
+        for shape, box in enumerate(boxes):
+            self.__add_shape(shape, box)
+
+    def __add_shape(self, shape: int, box: np.ndarray) -> None:
+        """
+        This method lowers the distances of the nodes which are less than
+        max_distance away from the shape's bounding box to their distances
+        from the shape.
+        """
+        first_node = np.maximum(np.floor(
+            (box[:2] - self.__max_distance - self.__corner) /
+            self.__resolution), 0).astype(np.int64)
+        last_node = np.minimum(np.ceil(
+            (box[2:] + self.__max_distance - self.__corner) /
+            self.__resolution), self.__shape - 1).astype(np.int64)
+        if np.any(last_node < first_node):
+            return
+        nodes = np.stack(np.meshgrid(
+            np.arange(first_node[0], last_node[0] + 1),
+            np.arange(first_node[1], last_node[1] + 1),
+            indexing="ij"), axis=-1)
+        window = self.__field[first_node[0]:last_node[0] + 1,
+                              first_node[1]:last_node[1] + 1]
+        distances = self.__get_shape_distances(
+            shape, self.__corner + nodes.reshape(-1, 2) * self.__resolution)
+        np.minimum(window, distances.reshape(window.shape), out=window)
+
+    def __get_exact_distances(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method returns the exact signed distances of the locations,
+        checked against every shape. The locations which are max_distance
+        away from the box around all the shapes get their distance from
+        the box, a lower bound at least as good as the field's.
+        """
+        distances = math_helper.box_signed_distances(
+            locations, np.min(self.__boxes[:, :2], axis=0),
+            np.max(self.__boxes[:, 2:], axis=0))
+        near = np.flatnonzero(distances < self.__max_distance)
+        if near.size:
+            distances[near] = np.min([
+                self.__get_shape_distances(shape, locations[near])
+                for shape in range(len(self.__boxes))], axis=0)
+        return distances
+
+    def get_distances(self, locations: np.ndarray) -> np.ndarray:
+        """
+        This method returns a lower bound of the signed distance of each of
+        the (N, 2) locations from the shapes, up to max_distance in the
+        extent, and exact (or beyond max_distance) out of it.
+        """
+        grid = (locations - self.__corner) / self.__resolution
+        nodes = np.rint(grid).astype(np.int64)
+        inside = np.all((nodes >= 0) & (nodes < self.__shape), axis=1)
+        distances = np.empty(len(locations))
+        nodes, gaps = nodes[inside], grid[inside] - nodes[inside]
+        distances[inside] = self.__field[nodes[:, 0], nodes[:, 1]] - \
+            np.hypot(gaps[:, 0], gaps[:, 1]) * self.__resolution
+        distances[~inside] = self.__get_exact_distances(locations[~inside])
+        return distances
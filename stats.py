@@ -1,18 +1,44 @@
+import typing
+
 import numpy as np
 
+import ensemble
+import recorder
+import sampling
+import simulation
 import walker
-from walker import Walker
 import pandas as pd
 
+# the memory of the recorded rows up to the aggregated data frame, in row
+# sizes: the recorder, the data frame, and the codes, indexers and sorted
+# copies of its grouping. Measured with tracemalloc as the peak of a
+# simulation and get_df, per row (pandas 3.0): 5.7 for DistanceAxisStats
+# up to 7.3 for CrossStats, and rounded up
+RECORD_COPIES = 8
+
 
 class Stats:
     """
     This class is responsible for calculating statistics about the simulations.
     """
 
-    def __init__(self):
+    # the columns the stats of a simulation are aggregated by
+    keys = ["walkers", "steps"]
+    # True if the stats must see every step, even if only some are sampled
+    every_step = False
+    # the recorded columns and their dtypes
+    columns: dict[str, typing.Any] = {}
+
+    def __init__(self,
+                 schedule: typing.Optional[sampling.SamplingSchedule] = None):
+        self._schedule = schedule if schedule is not None \
+            else sampling.SamplingSchedule()
         self._walkers = []
         self._steps_num = 0
+        # the type code and replica of every walker, by its index
+        self._types: typing.Optional[np.ndarray] = None
+        self._replicas: typing.Optional[np.ndarray] = None
+        self._recorder: typing.Optional[recorder.Recorder] = None
         self._df = pd.DataFrame()
         self._df_aggregated = pd.DataFrame()
 
@@ -23,15 +49,93 @@ class Stats:
         self._aggregate_df()
         return self._df_aggregated
 
-    def get_data(self, walkers: list[Walker], steps_num: int) -> None:
+    @classmethod
+    def _get_row_bytes(cls) -> int:
+        """
+        This method returns the size of one recorded row, in bytes.
+        """
+        return sum(np.dtype(dtype).itemsize for dtype in cls.columns.values())
+
+    @classmethod
+    def get_walker_bytes(cls, stop_param: int,
+                         schedule: typing.Optional[
+                             sampling.SamplingSchedule] = None) -> int:
+        """
+        This method returns the estimated memory of the stats of one walker
+        in a simulation of stop_param steps, in bytes: a row is recorded
+        for every sampled step.
+        """
+        records = schedule.get_samples_num(stop_param) \
+            if schedule is not None else stop_param + 1
+        return records * cls._get_row_bytes() * RECORD_COPIES
+
+    def get_data(self, walkers: typing.Union[simulation.Walkers,
+                                             simulation.Snapshot],
+                 steps_num: int) -> None:
         """
-        This method gets the data from the simulation.
+        This method gets the data from the simulation, the walkers or their
+        snapshot.
         This method is called from the simulation class.
+        Steps that are not in the schedule are skipped, unless the stats
+        must see every step.
         """
         self._walkers = walkers
         self._steps_num = steps_num
+        if not (self.every_step or self._schedule.is_sampled(steps_num)):
+            return
+        if self._types is None:
+            snapshot = walkers if isinstance(walkers, simulation.Snapshot) \
+                else simulation.Snapshot(walkers)
+            self._types = snapshot.get_types()
+            self._replicas = snapshot.get_replicas()
         self._calculate_df()
 
+    def _get_records_num(self, *args) -> typing.Optional[int]:
+        """
+        This method returns the number of sampled steps of a simulation of
+        args[0] steps, or None if it is not known.
+        """
+        return self._schedule.get_samples_num(args[0]) if args else None
+
+    def _get_locations(self) -> np.ndarray:
+        """
+        This method returns the current locations of the walkers, as one
+        (N, 2) array.
+        """
+        if isinstance(self._walkers, simulation.Snapshot):
+            return self._walkers.get_positions()
+        if isinstance(self._walkers, ensemble.Population2D):
+            return self._walkers.get_locations()
+        return np.array([r_walker.get_location()
+                         for r_walker in self._walkers],
+                        dtype=float).reshape(-1, 2)
+
+    def _get_steps(self) -> typing.Union[int, np.ndarray]:
+        """
+        This method returns the steps every walker made, or the step of the
+        simulation if all the walkers made it.
+        """
+        if isinstance(self._walkers, simulation.Snapshot) and \
+                self._walkers.get_steps() is not None:
+            return self._walkers.get_steps()
+        return self._steps_num
+
+    def _aggregate_replicas(self) -> None:
+        """
+        This method aggregates the data frame, whose walkers column holds
+        the walkers' indices, by the walkers' types and the keys.
+        Every replica is aggregated on its own, like a separate simulation.
+        The types are kept as integer codes and named only at the end.
+        """
+        indices = self._df["walkers"].to_numpy()
+        self._df["walkers"] = self._types[indices]
+        self._df["replica"] = self._replicas[indices]
+        self._df_aggregated = self._df.groupby(
+            ["walkers", "replica"] + self.keys[1:], as_index=False).mean(
+            ).drop(columns="replica")
+        self._df_aggregated["walkers"] = walker.WALKER_TYPES.get_names(
+            self._df_aggregated["walkers"].to_numpy())
+
     def _calculate_df(self) -> None:
         raise NotImplementedError("This method is not implemented")
 
@@ -39,76 +143,99 @@ class Stats:
         raise NotImplementedError("This method is not implemented")
 
     def mean(self, df: pd.DataFrame) -> pd.DataFrame:
-        raise NotImplementedError("This method is not implemented")
+        return df.groupby(self.keys, as_index=False).mean()
 
 class RadiusStats(Stats):
     """
     This class calculates the distance between walkers to the origin,
     and aggregates the data by the radius.
+    Only the first step at which every walker is at every integer radius
+    (up to the given one) is kept, in one walkers x radius array, so every
+    step is checked and the schedule is not used. If the walkers make their
+    own steps (see OriginDistanceSimulator2D), the step of every walker is
+    its own.
     """
-    def __init__(self, *args):
-        super().__init__()
-        self._df = pd.DataFrame({"walkers": [], "radius": [], "steps": []})
-        self._param = args[0]
+    keys = ["walkers", "radius"]
+    every_step = True
+    columns = {"walkers": np.int32, "radius": np.int32, "steps": np.int64}
 
-    def mean(self, df):
-        return df.groupby(["walkers", "radius"], as_index=False).mean()
+    def __init__(self, *args,
+                 schedule: typing.Optional[sampling.SamplingSchedule] = None):
+        super().__init__(schedule)
+        self._param = args[0]
+        # the first step of every walker at every radius (-1 if never)
+        self.__first_steps = np.zeros((0, int(self._param) + 1),
+                                      dtype=np.int64)
 
     def _calculate_df(self) -> None:
         """
-        This method calculates the distance between walkers to the origin
-        and saves the data in the data frame.
+        This method calculates the distance between walkers to the origin,
+        and keeps the step for the walkers that are at a radius for the
+        first time.
         """
-        for random_walker in self._walkers:
-            distance = np.linalg.norm(random_walker.get_location())
-            self._df.loc[len(self._df.index)] = [random_walker.get_uuid(),
-                                                 int(distance),
-                                                 self._steps_num]
+        radii = np.linalg.norm(self._get_locations(), axis=1).astype(np.int64)
+        if not len(self.__first_steps):
+            self.__first_steps = np.full(
+                (len(radii), self.__first_steps.shape[1]), -1, dtype=np.int64)
+        walkers = np.flatnonzero(radii <= self._param)
+        first_steps = self.__first_steps[walkers, radii[walkers]]
+        steps = np.broadcast_to(self._get_steps(), radii.shape)[walkers]
+        self.__first_steps[walkers, radii[walkers]] = np.where(
+            first_steps < 0, steps, first_steps)
 
     def _aggregate_df(self) -> None:
         """
         This method aggregates the data frame by the radius.
         """
-        self._df.to_csv(r"C:\Users\HP\Desktop\huji\year1\semesterA\CS\EX\new\RandomWalker\graphs\radius.csv")
-        self._df = self._df.groupby(["walkers", "radius"],
-                                    as_index=False).min()
-
-        self._df["walkers"] = self._df["walkers"].apply(lambda a: a.split("_")[0])
-        self._df = self._df[self._df["radius"] <= self._param]
-        self._df_aggregated = self._df.groupby(["walkers", "radius"],
-                                            as_index=False).mean()
+        walkers, radii = np.nonzero(self.__first_steps >= 0)
+        self._df = pd.DataFrame({"walkers": walkers.astype(np.int32),
+                                 "radius": radii.astype(np.int32),
+                                 "steps": self.__first_steps[walkers, radii]})
+        self._aggregate_replicas()
+
+    @classmethod
+    def get_walker_bytes(cls, stop_param: int,
+                         schedule: typing.Optional[
+                             sampling.SamplingSchedule] = None) -> int:
+        """
+        This method returns the estimated memory of the stats of one walker
+        up to the radius stop_param, in bytes: its first step at every
+        radius, and a row for every radius it got to.
+        """
+        radii = int(stop_param) + 1
+        return radii * np.dtype(np.int64).itemsize + \
+            radii * cls._get_row_bytes() * RECORD_COPIES
 
 
 class DistanceAxisStats(Stats):
     """
     This class calculates the distance between walkers to the x and y axes.
     """
-    def __init__(self, *args):
-        super().__init__()
-        self._df = pd.DataFrame({"walkers": [], "steps": [],
-                                 "distance_to_axis_x": [],
-                                 "distance_to_axis_y": []})
+    columns = {"walkers": np.int32, "steps": np.int64,
+               "distance_to_axis_x": float, "distance_to_axis_y": float}
 
-    def mean(self, df):
-        return df.groupby(["walkers", "steps"], as_index=False).mean()
+    def __init__(self, *args,
+                 schedule: typing.Optional[sampling.SamplingSchedule] = None):
+        super().__init__(schedule)
+        self._recorder = recorder.Recorder(self.columns,
+                                           self._get_records_num(*args))
 
     def _aggregate_df(self) -> None:
         """
         This method aggregates the data frame by the number of steps.
         """
-        self._df["walkers"] = self._df["walkers"].apply(
-            lambda a: a.split("_")[0])
-        self._df_aggregated = self._df.groupby(["walkers", "steps"],
-                                              as_index=False).mean()
+        self._df = self._recorder.get_df()
+        self._aggregate_replicas()
 
     def _calculate_df(self) -> None:
         """
         This method calculates the distance between walkers to the x and y axes.
         """
-        for random_walker in self._walkers:
-            distance_x = abs(random_walker.get_location()[1])
-            distance_y = abs(random_walker.get_location()[0])
-            self._df.loc[len(self._df.index)] = [random_walker.get_uuid(), self._steps_num, distance_x, distance_y]
+        locations = self._get_locations()
+        self._recorder.record(walkers=np.arange(len(locations)),
+                              steps=self._steps_num,
+                              distance_to_axis_x=np.abs(locations[:, 1]),
+                              distance_to_axis_y=np.abs(locations[:, 0]))
 
 
 class DistanceStats(Stats):
@@ -116,53 +243,67 @@ class DistanceStats(Stats):
     This class calculates the distance between walkers to the origin.
 
     """
-    def __init__(self, *args):
-        super().__init__()
-        self._df = pd.DataFrame({"walkers": [], "steps": [], "distance": []})
+    columns = {"walkers": np.int32, "steps": np.int64, "distance": float}
 
-    def mean(self, df):
-        return df.groupby(["walkers", "steps"], as_index=False).mean()
+    def __init__(self, *args,
+                 schedule: typing.Optional[sampling.SamplingSchedule] = None):
+        super().__init__(schedule)
+        self._recorder = recorder.Recorder(self.columns,
+                                           self._get_records_num(*args))
 
     def _aggregate_df(self) -> None:
         """
         This method aggregates the data frame by the number of steps.
         """
-        self._df["walkers"] = self._df["walkers"].apply(
-            lambda a: a.split("_")[0])
-        self._df_aggregated = self._df.groupby(["walkers", "steps"],
-                                              as_index=False).mean()
+        self._df = self._recorder.get_df()
+        self._aggregate_replicas()
 
     def _calculate_df(self) -> None:
         """
         This method calculates the distance between walkers to the origin.
         """
-        for random_walker in self._walkers:
-            distance = np.linalg.norm(random_walker.get_location())
-            self._df.loc[len(self._df.index)] = [random_walker.get_uuid(), self._steps_num, distance]
+        locations = self._get_locations()
+        self._recorder.record(walkers=np.arange(len(locations)),
+                              steps=self._steps_num,
+                              distance=np.linalg.norm(locations, axis=1))
 
 
 class CrossStats(Stats):
     """
     This class calculates the number of times the walker crossed the y-axis.
+    The crossings are counted on every step, and recorded on the steps of
+    the schedule.
     """
-    def __init__(self, *args):
-        super().__init__()
-        self.__previous_step_walkers = {}
-        self._draft_df = pd.DataFrame(
-            {"walkers": [], "steps": [], "cross_num": []})
-        self._df = pd.DataFrame({"walkers": [], "steps": [], "cross_num": []})
-
-    def mean(self, df):
-        return df.groupby(["walkers", "steps"], as_index=False).mean()
+    every_step = True
+    columns = {"walkers": np.int32, "steps": np.int64, "cross_num": np.int32}
+
+    def __init__(self, *args,
+                 schedule: typing.Optional[sampling.SamplingSchedule] = None):
+        super().__init__(schedule)
+        # the sign of the last non-zero y of every walker (0 if none yet)
+        self.__previous_signs = np.zeros(0)
+        # the crossings of every walker since the last recorded step
+        self.__crossings = np.zeros(0, dtype=np.int32)
+        self._recorder = recorder.Recorder(self.columns,
+                                           self._get_records_num(*args))
 
     def _aggregate_df(self) -> None:
         """
         This method aggregates the data frame by the number of steps.
         """
-        self._df["walkers"] = self._df["walkers"].apply(
-            lambda a: a.split("_")[0])
-        self._df_aggregated = self._df.groupby(["walkers", "steps"],
-                                              as_index=False).mean()
+        self._aggregate_replicas()
+
+    @classmethod
+    def get_walker_bytes(cls, stop_param: int,
+                         schedule: typing.Optional[
+                             sampling.SamplingSchedule] = None) -> int:
+        """
+        This method returns the estimated memory of the stats of one walker
+        in a simulation of stop_param steps, in bytes: its last sign and
+        crossings, and a row for every sampled step.
+        """
+        return np.dtype(float).itemsize + np.dtype(np.int32).itemsize + \
+            super().get_walker_bytes(stop_param, schedule)
 
     def get_df(self) -> pd.DataFrame:
         """
@@ -174,50 +315,37 @@ class CrossStats(Stats):
 
     def __arrange_df(self) -> None:
         """
-        This method arranges the data frame.
+        This method arranges the data frame, with the number of crossings
+        of every walker up to every recorded step (not including the last
+        step).
         """
-        for random_walker in self._walkers:
-            for num in range(self._steps_num):
-                filtered_df = self._draft_df.loc[
-                    (self._draft_df['walkers'] == random_walker.get_uuid())
-                    & (self._draft_df["steps"] <= num)]
-                cross_sum = filtered_df["cross_num"].sum()
-                self._df.loc[len(self._df.index)] = [random_walker.get_uuid(),
-                                                     num, cross_sum]
+        walkers_num = len(self._types)
+        steps = self._recorder.get_column("steps").reshape(-1, walkers_num)
+        crossings = np.cumsum(self._recorder.get_column("cross_num").reshape(
+            -1, walkers_num), axis=0)
+        recorded = steps[:, 0] < self._steps_num
+        self._df = pd.DataFrame({
+            "walkers": np.tile(np.arange(walkers_num, dtype=np.int32),
+                               int(np.sum(recorded))),
+            "steps": steps[recorded].ravel(),
+            "cross_num": crossings[recorded].ravel()})
 
     def _calculate_df(self) -> None:
         """
         This method calculates the number of times the walker crossed the
         y-axis after steps_num steps.
+        A walker crosses the axis when its y has the opposite sign of its
+        last non-zero y, so steps on the axis are skipped.
         """
-        for random_walker in self._walkers:
-            index = self._draft_df.loc[
-                (self._draft_df['walkers'] == random_walker.get_uuid())
-                & (self._draft_df["steps"] == self._steps_num)].index
-            if index.empty:
-                self._draft_df.loc[len(self._draft_df.index)] = [random_walker.get_uuid(), self._steps_num, 0]
-                index = self._draft_df.loc[(self._draft_df['walkers'] == random_walker.get_uuid())
-                                           & (self._draft_df["steps"] == self._steps_num)].index
-            if self.__check_if_crossed(random_walker):
-                self._draft_df.at[index[0], "cross_num"] += 1
-        self.__update_previous_steps_walkers()
-
-    def __check_if_crossed(self, random_walker: walker.Walker) -> bool:
-        """
-        This method checks if the walker crossed the y-axis.
-        """
-        if random_walker.get_uuid() in self.__previous_step_walkers.keys():
-            prev = self.__previous_step_walkers[random_walker.get_uuid()]
-            current = random_walker.get_location()[1]
-            if prev < 0 < current or prev > 0 > current:
-                return True
-        return False
-
-    def __update_previous_steps_walkers(self) -> None:
-        """
-        This method updates the previous steps of the walkers if needed.
-        """
-        for random_walker in self._walkers:
-            if random_walker.get_location()[1] != 0:
-                self.__previous_step_walkers[random_walker.get_uuid()] = (
-                    random_walker.get_location())[1]
+        signs = np.sign(self._get_locations()[:, 1])
+        if len(self.__previous_signs) != len(signs):
+            self.__previous_signs = np.zeros(len(signs))
+            self.__crossings = np.zeros(len(signs), dtype=np.int32)
+        self.__crossings += self.__previous_signs * signs < 0
+        if self._schedule.is_sampled(self._steps_num):
+            self._recorder.record(walkers=np.arange(len(signs)),
+                                  steps=self._steps_num,
+                                  cross_num=self.__crossings)
+            self.__crossings[:] = 0
+        self.__previous_signs = np.where(signs != 0, signs,
+                                         self.__previous_signs)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+import aggregator
+
+"""
+Testing the aggregator module
+"""
+
+
+def test_aggregator_matches_groupby() -> None:
+    rng = np.random.default_rng(0)
+    online = aggregator.OnlineAggregator(["walkers", "radius"])
+    dfs = []
+    for simulation in range(20):
+        # some radii are not reached in every simulation
+        radii = np.arange(rng.integers(3, 6))
+        df = pd.DataFrame({"walkers": "RandomDirectionWalker2D",
+                           "radius": np.repeat(radii, 2),
+                           "steps": rng.uniform(0, 100, 2 * len(radii))})
+        online.add(df)
+        dfs.append(df)
+    expected = pd.concat(dfs).groupby(["walkers", "radius"])["steps"]
+    result = online.get_df()
+    assert list(result.columns) == ["walkers", "radius", "steps",
+                                    "steps_var", "steps_sem", "count"]
+    assert list(result["count"]) == list(expected.size())
+    assert np.allclose(result["steps"], expected.mean())
+    assert np.allclose(result["steps_var"], expected.var())
+    assert np.allclose(result["steps_sem"], expected.sem())
+
+
+def test_aggregator_single_simulation() -> None:
+    online = aggregator.OnlineAggregator(["walkers", "steps"])
+    online.add(pd.DataFrame({"walkers": ["a", "a"], "steps": [0, 1],
+                             "distance": [0.0, 1.0]}))
+    result = online.get_df()
+    assert list(result["distance"]) == [0, 1]
+    assert list(result["count"]) == [1, 1]
+    assert result["distance_var"].isna().all()
@@ -0,0 +1,377 @@
+import numpy as np
+import pytest
+
+import board
+import ensemble
+import sampling
+import simulation
+import stats
+import walker
+
+ERROR_CONSTANT = 10 ** -12
+
+
+def test_population_groups_walkers_by_type() -> None:
+    walkers = [walker.RandomDirectionWalker2D() for _ in range(3)] + \
+              [walker.RegularDiscreteWalker2D() for _ in range(2)]
+    population = ensemble.Population2D(walkers)
+    assert len(population) == 5
+    assert len(population.get_ensembles()) == 2
+    assert population.get_locations().shape == (5, 2)
+    assert {r_walker.get_uuid() for r_walker in population} == \
+           {r_walker.get_uuid() for r_walker in walkers}
+
+
+def test_ion_ensemble_attraction() -> None:
+    population = ensemble.Population2D(
+        [walker.IonWalker2D({"charge": 1}) for _ in range(2)] +
+        [walker.IonWalker2D({"charge": -1}) for _ in range(2)])
+    assert list(population.get_charges()) == [1, 1, -1, -1]
+    simulation_board = board.Board2D([], [])
+    population.get_ensembles()[1].set_next_steps(np.array([[-10.0, -10.0],
+                                                           [-10.0, -10.0]]))
+    population.walk()
+    attractions = simulation_board.get_attractions(
+        population.get_locations(), population.get_charges())
+    assert np.all(attractions[0] < 0)
+    assert np.all(attractions[2] > 0)
+    simulation_board.move_walkers(population)
+    assert np.all(np.isfinite(population.get_locations()))
+
+
+def test_random_direction_ensemble_step() -> None:
+    population = ensemble.Population2D(
+        [walker.RandomDirectionWalker2D() for _ in range(100)])
+    walkers_ensemble = population.get_ensembles()[0]
+    walkers_ensemble.optional_steps()
+    walkers_ensemble.walk()
+    radius = np.linalg.norm(walkers_ensemble.get_locations(), axis=1)
+    assert np.all(np.abs(radius - 1) < ERROR_CONSTANT)
+
+
+def test_random_direction_step_ensemble_step() -> None:
+    population = ensemble.Population2D(
+        [walker.RandomDirectionStepWalker2D() for _ in range(100)])
+    walkers_ensemble = population.get_ensembles()[0]
+    walkers_ensemble.optional_steps()
+    walkers_ensemble.walk()
+    radius = np.linalg.norm(walkers_ensemble.get_locations(), axis=1)
+    assert np.all((0.5 <= radius) & (radius <= 1.5))
+
+
+def test_discrete_ensembles_step() -> None:
+    population = ensemble.Population2D(
+        [walker.RegularDiscreteWalker2D() for _ in range(100)] +
+        [walker.WeightedDiscreteWalker2D({"direction": "up", "weight": 0.7})
+         for _ in range(100)])
+    for walkers_ensemble in population.get_ensembles():
+        start_locations = walkers_ensemble.get_locations()
+        walkers_ensemble.optional_steps()
+        walkers_ensemble.walk()
+        vectors = walkers_ensemble.get_locations() - start_locations
+        assert np.all(np.sum(np.abs(vectors), axis=1) <= 1 + ERROR_CONSTANT)
+
+
+def test_weighted_ensemble_direction() -> None:
+    population = ensemble.Population2D(
+        [walker.WeightedDiscreteWalker2D({"direction": "up", "weight": 0.7})
+         for _ in range(1000)])
+    for _ in range(20):
+        population.get_ensembles()[0].optional_steps()
+        population.walk()
+    assert np.mean(population.get_locations()[:, 1]) > 0
+
+
+def test_weighted_choices_follow_weights() -> None:
+    weighted = [walker.WeightedDiscreteWalker2D({"direction": "left",
+                                                 "weight": 0.6})
+                for _ in range(10)]
+    # the walkers of a type share one cumulative weights table
+    assert weighted[0].get_cumulative_weights() is \
+        weighted[1].get_cumulative_weights()
+    walkers_ensemble = ensemble.Population2D(weighted).get_ensembles()[0]
+    choices = walkers_ensemble.get_choices((10000, 10))
+    assert choices.shape == (10000, 10)
+    frequencies = np.bincount(choices.ravel(), minlength=5) / choices.size
+    directions = list(ensemble.WeightedDiscreteEnsemble2D.angles.keys())
+    expected = [0.6 if direction == "left" else 0.1
+                for direction in directions]
+    assert np.allclose(frequencies, expected, atol=0.01)
+
+
+def test_discrete_ensembles_on_lattice() -> None:
+    population = ensemble.Population2D(
+        [walker.RegularDiscreteWalker2D() for _ in range(10)] +
+        [walker.WeightedDiscreteWalker2D({"direction": "up", "weight": 1})
+         for _ in range(10)] +
+        [walker.WeightedDiscreteWalker2D({"direction": "up", "weight": 0.5})
+         for _ in range(10)])
+    regular, up, weighted = population.get_ensembles()
+    assert regular.is_on_lattice() and up.is_on_lattice()
+    # a walker stepping toward the origin leaves the lattice
+    assert not weighted.is_on_lattice()
+    simulation.StepsNumSimulator2D(
+        population, board.Board2D([{"type": "circle", "radius": 2,
+                                    "center": [0, 5], "charge": 0}], []),
+        20).run_simulation(lambda walkers, steps_num: None)
+    assert regular.get_locations().dtype == np.int32
+    assert np.all(up.get_locations() == [0, 2])
+    assert population.get_locations().dtype == float
+
+    thin_board = board.Board2D([{"type": "rectangle", "width": 0.5,
+                                 "height": 10, "start_point": [2.2, -5],
+                                 "charge": 0}], [])
+    simulation.StepsNumSimulator2D(population, thin_board, 1).run_simulation(
+        lambda walkers, steps_num: None)
+    assert not regular.is_on_lattice()
+    assert regular.get_locations().dtype == float
+
+
+def test_ensemble_respects_obstacles() -> None:
+    simulation_board = board.Board2D(
+        [{"type": "rectangle", "width": 100, "height": 100,
+          "start_point": [-50, 2], "charge": 0}], [])
+    population = ensemble.Population2D(
+        [walker.RegularDiscreteWalker2D() for _ in range(100)])
+    simulator = simulation.StepsNumSimulator2D(population, simulation_board,
+                                               50)
+    simulator.run_simulation(lambda walkers, steps: None)
+    for r_walker in simulator._walkers:
+        assert not np.all((r_walker.get_location() >= [-50, 2]) &
+                          (r_walker.get_location() <= [50, 102]))
+
+
+def test_ensemble_matches_walkers_statistics() -> None:
+    steps = 100
+    population = ensemble.Population2D(
+        [walker.RandomDirectionWalker2D() for _ in range(5000)])
+    simulator = simulation.StepsNumSimulator2D(population,
+                                               board.Board2D([], []), steps)
+    simulator.run_simulation(lambda walkers, steps_num: None)
+    squared_distance = np.sum(simulator._walkers.get_locations() ** 2,
+                              axis=1)
+    # the mean squared distance of a unit step random walk is the steps num
+    assert abs(np.mean(squared_distance) - steps) < 0.1 * steps
+
+
+def test_origin_distance_simulator_with_population() -> None:
+    population = ensemble.Population2D(
+        [walker.RandomDirectionWalker2D() for _ in range(10)])
+    loger = stats.RadiusStats(3)
+    simulator = simulation.OriginDistanceSimulator2D(population,
+                                                     board.Board2D([], []), 3)
+    simulator.run_simulation(loger.get_data)
+    assert np.all(np.linalg.norm(population.get_locations(), axis=1) >= 0)
+    assert set(loger.get_df()["radius"]) <= {0, 1, 2, 3}
+
+
+@pytest.mark.parametrize("use_ensemble", [False, True])
+def test_origin_distance_simulator_retires_walkers(use_ensemble: bool) -> None:
+    walkers = [walker.RandomDirectionWalker2D() for _ in range(10)]
+    if use_ensemble:
+        walkers = ensemble.Population2D(walkers)
+    simulator = simulation.OriginDistanceSimulator2D(walkers,
+                                                     board.Board2D([], []), 3)
+    retired = {}
+
+    def callback(snapshot: simulation.Snapshot, steps_num: int) -> None:
+        distances = np.linalg.norm(snapshot.get_positions(), axis=1)
+        for index, position in retired.items():
+            # a walker that got to the distance is not moved anymore
+            assert np.all(snapshot.get_positions()[index] == position)
+        for index in np.flatnonzero(distances >= 3):
+            retired.setdefault(index, snapshot.get_positions()[index].copy())
+
+    simulator.run_simulation(callback, snapshot=True)
+    assert len(retired) == 10
+
+
+@pytest.mark.parametrize("use_ensemble", [False, True])
+def test_board_retired_walkers_still_attract(use_ensemble: bool) -> None:
+    walkers = [walker.IonWalker2D({"charge": 1}),
+               walker.IonWalker2D({"charge": -100})]
+    walkers[1].set_state(np.array([10.0, 0.0]))
+    if use_ensemble:
+        walkers = ensemble.Population2D(walkers)
+    simulation_board = board.Board2D([], [])
+    active = np.array([True, False])
+    locations = np.array([[0.0, 0.0], [10.0, 0.0]])
+    charges = np.array([1.0, -100.0])
+    attractions = simulation_board.get_attractions(locations, charges,
+                                                   active)
+    assert np.all(attractions[0] ==
+                  simulation_board.get_attractions(locations, charges)[0])
+    assert np.all(attractions[1] == 0)
+    simulation_board.move_walkers(walkers, active)
+    if use_ensemble:
+        walkers = list(walkers)
+    # the retired walker pulls the active one by 2, more than its random
+    # unit step
+    assert walkers[0].get_location()[0] > 1
+    assert np.all(walkers[1].get_location() == [10, 0])
+
+
+def test_board_static_field() -> None:
+    charged_obstacles = [{"type": "circle", "radius": 1, "center": [x, 20],
+                          "charge": 5} for x in range(-10, 11, 5)]
+    exact_board = board.Board2D(charged_obstacles, [])
+    grid_board = board.Board2D(charged_obstacles, [],
+                               field_grid={"resolution": 0.1})
+    locations = np.array([[0.0, 0.0], [3.0, -4.0], [7.5, 1.0]])
+    charges = np.array([1.0, -1.0, 2.0])
+    expected = exact_board.get_attractions(locations, charges)
+    attractions = grid_board.get_attractions(locations, charges)
+    assert np.all(np.abs(attractions - expected) <=
+                  0.01 * np.abs(expected) + ERROR_CONSTANT)
+
+
+def test_population_replicate() -> None:
+    walkers = [walker.RandomDirectionWalker2D(),
+               walker.RegularDiscreteWalker2D()]
+    population = ensemble.Population2D(walkers)
+    replicated = population.replicate(3)
+    assert len(replicated) == 6
+    assert len(population) == 2
+    uuids = [r_walker.get_uuid() for r_walker in replicated]
+    assert uuids[:3] == [f"{walkers[0].get_uuid()}_{replica}"
+                         for replica in range(3)]
+    assert len(set(uuids)) == 6
+    assert list(replicated.get_ids()) == [walkers[0].get_id()] * 3 + \
+        [walkers[1].get_id()] * 3
+    replicated.get_ensembles()[0].set_next_steps(np.ones((3, 2)))
+    replicated.walk()
+    assert np.all(population.get_locations() == 0)
+
+
+def test_replicas_stats_per_replica() -> None:
+    population = ensemble.Population2D(
+        [walker.RegularDiscreteWalker2D() for _ in range(50)]).replicate(2)
+    loger = stats.DistanceStats()
+    simulation.StepsNumSimulator2D(population, board.Board2D([], []),
+                                   10).run_simulation(loger.get_data)
+    df = loger.get_df()
+    assert list(df.columns) == ["walkers", "steps", "distance"]
+    # one row per replica and step
+    assert len(df) == 2 * 11
+
+
+def test_skip_ahead_matches_step_by_step() -> None:
+    steps = 400
+    simulation_board = board.Board2D(
+        [{"type": "rectangle", "width": 100, "height": 100,
+          "start_point": [-50, 5], "charge": 0}], [])
+    squared_distances = {}
+    for skip_ahead in (False, True):
+        population = ensemble.Population2D(
+            [walker.RegularDiscreteWalker2D() for _ in range(4000)])
+        population.set_rng(np.random.default_rng(2))
+        simulator = simulation.StepsNumSimulator2D(population,
+                                                   simulation_board, steps)
+        simulator.set_schedule(sampling.StrideSchedule(100))
+        simulator.set_skip_ahead(skip_ahead)
+        calls = []
+
+        def callback(walkers, steps_num):
+            calls.append(steps_num)
+            locations = walkers.get_locations()
+            # no walker ever gets into the obstacle
+            assert not np.any(simulation_board.check_if_locations_in_obstacle(
+                locations))
+
+        simulator.run_simulation(callback)
+        assert calls == [0, 100, 200, 300, 400]
+        squared_distances[skip_ahead] = np.mean(
+            np.sum(population.get_locations() ** 2, axis=1))
+    assert abs(squared_distances[True] - squared_distances[False]) < \
+        0.1 * squared_distances[False]
+
+
+def test_walk_on_spheres_matches_step_by_step() -> None:
+    simulation_board = board.Board2D(
+        [{"type": "circle", "radius": 2, "center": [6, 0], "charge": 0}], [])
+    radii = np.array([6, 12])
+    first_steps = {}
+    for walk_on_spheres in (False, True):
+        population = ensemble.Population2D(
+            [walker.RandomDirectionWalker2D() for _ in range(3000)])
+        population.set_rng(np.random.default_rng(4))
+        simulator = simulation.OriginDistanceSimulator2D(population,
+                                                         simulation_board, 12)
+        simulator.set_walk_on_spheres(walk_on_spheres)
+        radius_stats = stats.RadiusStats(12)
+        steps = np.full((3000, len(radii)), -1)
+
+        def callback(snapshot, steps_num):
+            locations = snapshot.get_positions()
+            assert not np.any(
+                simulation_board.check_if_locations_in_obstacle(locations))
+            walkers_steps = snapshot.get_steps()
+            assert (walkers_steps is not None) == walk_on_spheres
+            if walkers_steps is None:
+                walkers_steps = np.full(len(snapshot), steps_num)
+            # the steps of the simulation are the most steps a walker made
+            assert steps_num == np.max(walkers_steps)
+            reached = (np.linalg.norm(locations, axis=1)[:, None] >= radii) \
+                & (steps < 0)
+            steps[reached] = np.broadcast_to(walkers_steps[:, None],
+                                             steps.shape)[reached]
+            radius_stats.get_data(snapshot, steps_num)
+
+        simulator.run_simulation(callback, snapshot=True)
+        assert np.all(steps >= 0)
+        # a walker is at a radius for the first time when it gets to it
+        df = radius_stats.get_df().set_index("radius")
+        assert np.allclose(df.loc[radii, "steps"], np.mean(steps, axis=0))
+        first_steps[walk_on_spheres] = np.sort(steps, axis=0)
+    for brute_force, on_spheres in zip(first_steps[False].T,
+                                       first_steps[True].T):
+        # the two sample Kolmogorov-Smirnov statistic of the first steps
+        steps = np.union1d(brute_force, on_spheres)
+        statistic = np.max(np.abs(
+            np.searchsorted(brute_force, steps, side="right") -
+            np.searchsorted(on_spheres, steps, side="right"))) / 3000
+        assert statistic < 0.05
+        assert abs(np.mean(on_spheres) / np.mean(brute_force) - 1) < 0.05
+
+
+def test_walk_on_spheres_matches_step_by_step_over_runs() -> None:
+    means = {False: [], True: []}
+    for walk_on_spheres in (False, True):
+        for seed in range(12):
+            population = ensemble.Population2D(
+                [walker.RandomDirectionWalker2D() for _ in range(400)])
+            population.set_rng(np.random.default_rng(seed))
+            simulator = simulation.OriginDistanceSimulator2D(
+                population, board.Board2D([], []), 10)
+            simulator.set_walk_on_spheres(walk_on_spheres)
+            radius_stats = stats.RadiusStats(10)
+            simulator.run_simulation(radius_stats.get_data, snapshot=True)
+            df = radius_stats.get_df().set_index("radius")
+            means[walk_on_spheres].append(df.loc[10, "steps"])
+    brute_force, on_spheres = np.array(means[False]), np.array(means[True])
+    error = np.hypot(np.std(brute_force), np.std(on_spheres)) / \
+        np.sqrt(len(brute_force))
+    assert abs(np.mean(on_spheres) - np.mean(brute_force)) < 3 * error
+    # randomness shared by the walkers of a run would spread the means more
+    assert np.std(on_spheres) < 2 * np.std(brute_force)
+
+
+def test_walk_on_spheres_walkers() -> None:
+    walkers = [walker.RandomDirectionWalker2D() for _ in range(20)]
+    simulator = simulation.OriginDistanceSimulator2D(
+        walkers, board.Board2D([], []), 8)
+    simulator.set_walk_on_spheres(True)
+    with pytest.raises(ValueError):
+        simulator.run_simulation(lambda walkers, steps_num: None)
+    simulator.run_simulation(lambda snapshot, steps_num: None, snapshot=True)
+    assert all(np.linalg.norm(r_walker.get_location()) >= 8
+               for r_walker in walkers)
+    # the walks of the other walkers are not isotropic with unit steps
+    for unsupported in ([walker.RandomDirectionStepWalker2D()],
+                        ensemble.Population2D(
+                            [walker.RandomDirectionWalker2D(),
+                             walker.RegularDiscreteWalker2D()])):
+        simulator = simulation.OriginDistanceSimulator2D(
+            unsupported, board.Board2D([], []), 8)
+        with pytest.raises(ValueError):
+            simulator.set_walk_on_spheres(True)
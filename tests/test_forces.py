@@ -0,0 +1,165 @@
+import numpy as np
+
+import forces
+import obstacles
+import walker
+
+ERROR_CONSTANT = 10 ** -9
+
+
+def loop_attraction(location, charge, sources_locations, sources_charges):
+    direction = np.zeros(2)
+    for source_location, source_charge in zip(sources_locations,
+                                              sources_charges):
+        delta = location - source_location
+        if np.dot(delta, delta) > 1:
+            direction += (delta / np.linalg.norm(delta) *
+                          source_charge * charge / np.dot(delta, delta))
+    return direction
+
+
+def test_direct_attractions_match_loop() -> None:
+    rng = np.random.default_rng(1)
+    locations = rng.uniform(-20, 20, (50, 2))
+    charges = rng.choice([-2.0, 1.0, 3.0], 50)
+    attractions = forces.DirectForceSolver().get_attractions(
+        locations, charges, locations, charges)
+    for i in range(len(locations)):
+        expected = loop_attraction(locations[i], charges[i], locations,
+                                   charges)
+        assert np.all(np.abs(attractions[i] - expected) < ERROR_CONSTANT)
+
+
+def test_direct_attractions_chunks() -> None:
+    rng = np.random.default_rng(2)
+    locations = rng.uniform(-20, 20, (300, 2))
+    charges = rng.choice([-1.0, 1.0], 300)
+    expected = forces.get_direct_attractions(locations, charges, locations,
+                                             charges)
+    max_pairs_chunk = forces.MAX_PAIRS_CHUNK
+    forces.MAX_PAIRS_CHUNK = 1000
+    try:
+        chunked = forces.get_direct_attractions(locations, charges,
+                                                locations, charges)
+    finally:
+        forces.MAX_PAIRS_CHUNK = max_pairs_chunk
+    assert np.all(np.abs(chunked - expected) < ERROR_CONSTANT)
+
+
+def test_direct_attractions_cutoff() -> None:
+    attractions = forces.get_direct_attractions(
+        np.array([[0.0, 0.0]]), np.array([1.0]), np.array([[0.5, 0.5]]),
+        np.array([1.0]))
+    assert np.all(attractions == 0)
+
+
+def test_charged_obstacles() -> None:
+    locations, charges = forces.get_charged_obstacles(
+        [obstacles.ObstacleCircle(1, [3, 4], 2),
+         obstacles.ObstacleRectangle(2, 2, [0, 0], 0)])
+    assert locations.shape == (1, 2)
+    assert list(charges) == [2]
+
+
+def test_ion_walker_direction() -> None:
+    ion_pos = walker.IonWalker2D({"charge": 1})
+    ion_neg = walker.IonWalker2D({"charge": -1})
+    ion_neg.set_next_step(np.array([3.0, 4.0]))
+    ion_neg.walk()
+    obstacle = obstacles.ObstacleCircle(1, [-3, 0], 2)
+    direction = ion_pos._get_direction([ion_pos, ion_neg], [obstacle])
+    expected = loop_attraction(np.zeros(2), 1, [np.array([3.0, 4.0]),
+                                                np.array([-3.0, 0.0])],
+                               [-1, 2])
+    assert np.all(np.abs(direction - expected) < ERROR_CONSTANT)
+
+
+def test_barnes_hut_matches_direct() -> None:
+    rng = np.random.default_rng(3)
+    locations = rng.normal(0, 30, (3000, 2))
+    charges = rng.choice([-1.0, 1.0], 3000)
+    expected = forces.get_direct_attractions(locations, charges, locations,
+                                             charges)
+    approximated = forces.BarnesHutForceSolver(0.5).get_attractions(
+        locations, charges, locations, charges)
+    # relative RMS error of the approximation with theta = 0.5
+    error = np.linalg.norm(approximated - expected) / np.linalg.norm(expected)
+    assert error < 0.02
+
+
+def test_barnes_hut_small_theta_is_exact() -> None:
+    rng = np.random.default_rng(4)
+    locations = rng.uniform(-5, 5, (500, 2))
+    charges = rng.choice([-2.0, 1.0], 500)
+    expected = forces.get_direct_attractions(locations, charges, locations,
+                                             charges)
+    approximated = forces.BarnesHutForceSolver(10 ** -6).get_attractions(
+        locations, charges, locations, charges)
+    assert np.all(np.abs(approximated - expected) < ERROR_CONSTANT)
+
+
+def test_barnes_hut_invalid_theta() -> None:
+    try:
+        forces.BarnesHutForceSolver(0)
+        assert False
+    except ValueError:
+        assert True
+
+
+def test_particle_mesh_matches_direct() -> None:
+    rng = np.random.default_rng(5)
+    locations = rng.uniform(-30, 30, (3000, 2))
+    charges = rng.choice([-1.0, 1.0], 3000)
+    obstacles_locations = np.array([[0.0, 0.0], [20.0, -10.0]])
+    obstacles_charges = np.array([30.0, -20.0])
+    sources_locations = np.concatenate((locations, obstacles_locations))
+    sources_charges = np.concatenate((charges, obstacles_charges))
+    expected = forces.get_direct_attractions(locations, charges,
+                                             sources_locations,
+                                             sources_charges)
+    approximated = forces.ParticleMeshForceSolver().get_attractions(
+        locations, charges, sources_locations, sources_charges)
+    # relative RMS error of the approximation with the default mesh
+    error = np.linalg.norm(approximated - expected) / np.linalg.norm(expected)
+    assert error < 0.03
+
+
+def test_particle_mesh_large_extent() -> None:
+    locations = np.array([[0.0, 0.0], [10000.0, 0.0]])
+    charges = np.array([1.0, 1.0])
+    expected = forces.get_direct_attractions(locations, charges, locations,
+                                             charges)
+    approximated = forces.ParticleMeshForceSolver(
+        max_mesh_size=64).get_attractions(locations, charges, locations,
+                                          charges)
+    error = np.linalg.norm(approximated - expected) / np.linalg.norm(expected)
+    assert error < 0.05
+
+
+def test_static_field_grid() -> None:
+    rng = np.random.default_rng(6)
+    sources_locations = rng.uniform(-20, 20, (100, 2))
+    sources_charges = rng.choice([-3.0, 2.0], 100)
+    field = forces.StaticFieldGrid(sources_locations, sources_charges,
+                                   [-50, -50, 50, 50], 0.25)
+    # far enough from the sources for the field to be smooth
+    locations = np.array([[40.0, 40.0], [-45.5, 3.3], [30.2, -44.1],
+                          [200.0, 0.0]])
+    charges = np.array([1.0, -2.0, 0.5, 1.0])
+    expected = forces.get_direct_attractions(locations, charges,
+                                             sources_locations,
+                                             sources_charges)
+    interpolated = field.get_attractions(locations, charges)
+    assert np.all(np.abs(interpolated - expected) <=
+                  0.01 * np.abs(expected) + ERROR_CONSTANT)
+    # outside the grid the field is exact
+    assert np.all(np.abs(interpolated[3] - expected[3]) < ERROR_CONSTANT)
+
+
+def test_static_field_grid_invalid_extent() -> None:
+    try:
+        forces.StaticFieldGrid(np.zeros((1, 2)), np.ones(1), [0, 0, -1, 1],
+                               0.5)
+        assert False
+    except ValueError:
+        assert True
@@ -1,3 +1,4 @@
+import numpy as np
 import math_helper
 
 
@@ -12,3 +13,47 @@ def test_math_helper_check_float_positive() -> None:
     assert math_helper.check_float_positive("1", "2") == True
     assert math_helper.check_float_positive("1.0", "2.78") == True
     assert math_helper.check_float_positive("-1.0", "2.78") == False
+
+
+def test_math_helper_concat_ranges() -> None:
+    ranges = math_helper.concat_ranges(np.array([0, 5, 2]),
+                                       np.array([2, 5, 5]))
+    assert list(ranges) == [0, 1, 2, 3, 4]
+    assert len(math_helper.concat_ranges(np.array([3]), np.array([3]))) == 0
+
+
+def test_math_helper_segment_circle_intersections() -> None:
+    starts = np.array([[0.0, 0.0], [0.0, 0.0], [5.0, 0.5], [0.0, 5.0]])
+    ends = np.array([[10.0, 0.0], [0.0, 10.0], [9.0, 0.5], [10.0, 5.0]])
+    fractions = math_helper.segment_circle_intersections(
+        starts, ends, np.array([5.0, 0.0]), 1)
+    assert abs(fractions[0] - 0.4) < 10 ** -12
+    assert fractions[1] == np.inf
+    assert fractions[2] == 0
+    assert fractions[3] == np.inf
+
+
+def test_math_helper_segment_box_intersections() -> None:
+    starts = np.array([[0.0, 0.0], [0.0, 0.0], [5.0, 0.5], [0.0, 5.0],
+                       [4.05, -3.0]])
+    ends = np.array([[10.0, 0.0], [0.0, 10.0], [9.0, 0.5], [10.0, 5.0],
+                     [4.05, 3.0]])
+    fractions = math_helper.segment_box_intersections(
+        starts, ends, np.array([4.0, -1.0]), np.array([4.1, 1.0]))
+    assert abs(fractions[0] - 0.4) < 10 ** -12
+    assert fractions[1] == np.inf
+    assert fractions[2] == np.inf
+    assert fractions[3] == np.inf
+    assert abs(fractions[4] - 1 / 3) < 10 ** -12
+
+
+def test_math_helper_signed_distances() -> None:
+    points = np.array([[0.0, 0.0], [3.0, 4.0], [1.0, 0.5], [5.0, 2.0],
+                       [-3.0, -3.0]])
+    circle_distances = math_helper.circle_signed_distances(
+        points, np.array([0.0, 0.0]), 2)
+    assert list(circle_distances[:2]) == [-2, 3]
+    box_distances = math_helper.box_signed_distances(
+        points, np.array([0.0, 0.0]), np.array([2.0, 1.0]))
+    expected = [0, np.sqrt(10), -0.5, np.sqrt(10), np.sqrt(18)]
+    assert np.all(np.abs(box_distances - expected) < 10 ** -12)
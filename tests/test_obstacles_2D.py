@@ -32,3 +32,23 @@ def test_rectangle_obstacle():
     assert not rectangle_obstacle.is_location_in_obstacle(np.array([9, 11.2]))
 
 
+
+
+def test_batched_obstacles_and_gates():
+    rng = np.random.default_rng(0)
+    locations = rng.uniform(-5, 15, (200, 2))
+    shapes = [(obstacles.ObstacleCircle(4.22, [5.5, 6], 7),
+               lambda shape, location: shape.is_location_in_obstacle(location),
+               lambda shape, batch: shape.are_locations_in_obstacle(batch)),
+              (obstacles.ObstacleRectangle(4, 5, [5, 6], 4),
+               lambda shape, location: shape.is_location_in_obstacle(location),
+               lambda shape, batch: shape.are_locations_in_obstacle(batch)),
+              (magical_gates.GateCircle(4, np.array([1, 2]), np.array([0, 0])),
+               lambda shape, location: shape.is_location_in_gate(location),
+               lambda shape, batch: shape.are_locations_in_gate(batch)),
+              (magical_gates.GateRectangle(4, 5, [5, 6], [0, 0]),
+               lambda shape, location: shape.is_location_in_gate(location),
+               lambda shape, batch: shape.are_locations_in_gate(batch))]
+    for shape, is_in, are_in in shapes:
+        expected = [bool(is_in(shape, location)) for location in locations]
+        assert list(are_in(shape, locations)) == expected
@@ -1,4 +1,5 @@
 import info_parser
+import ensemble
 
 
 def test_parser() -> None:
@@ -31,4 +32,56 @@ def test_data_for_stats_2():
         r"jsons_for_tests/info_bad_stats_data.json")
     info.json_parser()
     assert info.check_data_for_simulation() == True
-    assert info.check_data_for_stats() == False
\ No newline at end of file
+    assert info.check_data_for_stats() == False
+
+def test_parser_ensemble() -> None:
+    data = {"board": {"walkers": [{"type": "RandomDirectionWalker2D",
+                                   "values": {"num": 3}}],
+                      "obstacles": [], "magical_gates": []},
+            "simulation": {"ensemble": True}}
+    info = info_parser.InfoFromGui(data)
+    assert info.check_data_for_simulation()
+    walkers, board_1 = info.get_data_for_simulation()
+    assert isinstance(walkers, ensemble.Population2D)
+    assert len(walkers) == 3
+
+
+def test_parser_force_mode() -> None:
+    data = {"board": {"walkers": [{"type": "IonWalker2D",
+                                   "values": {"num": 3, "charge": 1}}],
+                      "obstacles": [], "magical_gates": []},
+            "simulation": {"force_mode": "barnes_hut", "theta": 0.7}}
+    info = info_parser.InfoFromGui(data)
+    assert info.check_data_for_simulation()
+    walkers, board_1 = info.get_data_for_simulation()
+    assert board_1._force_solver.get_theta() == 0.7
+
+    data["simulation"]["force_mode"] = "magic"
+    assert not info_parser.InfoFromGui(data).check_data_for_simulation()
+
+
+def test_parser_walk_on_spheres() -> None:
+    data = {"board": {"walkers": [{"type": "RandomDirectionWalker2D",
+                                   "values": {"num": 3}}],
+                      "obstacles": [], "magical_gates": []},
+            "simulation": {"walk_on_spheres": True},
+            "stats": {"type": "RadiusStats"}}
+    info = info_parser.InfoFromGui(data)
+    assert info.check_data_for_simulation()
+    assert info.get_walk_on_spheres()
+
+    data["stats"]["type"] = "DistanceStats"
+    assert not info_parser.InfoFromGui(data).check_data_for_simulation()
+    data["stats"]["type"] = "RadiusStats"
+    data["board"]["walkers"][0]["type"] = "RandomDirectionStepWalker2D"
+    assert not info_parser.InfoFromGui(data).check_data_for_simulation()
+
+
+def test_parser_skip_ahead_requires_ensemble() -> None:
+    data = {"board": {"walkers": [{"type": "RegularDiscreteWalker2D",
+                                   "values": {"num": 3}}],
+                      "obstacles": [], "magical_gates": []},
+            "simulation": {"skip_ahead": True}}
+    assert not info_parser.InfoFromGui(data).check_data_for_simulation()
+    data["simulation"]["ensemble"] = True
+    assert info_parser.InfoFromGui(data).check_data_for_simulation()
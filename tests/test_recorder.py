@@ -0,0 +1,29 @@
+import numpy as np
+
+import recorder
+
+"""
+Testing the recorder module
+"""
+
+
+def test_recorder_known_records() -> None:
+    records = recorder.Recorder({"walkers": np.int64, "distance": float}, 3)
+    for step in range(3):
+        records.record(walkers=np.arange(4), distance=np.full(4, step))
+    assert len(records) == 12
+    df = records.get_df()
+    assert list(df.columns) == ["walkers", "distance"]
+    assert list(df["walkers"]) == [0, 1, 2, 3] * 3
+    assert list(df["distance"]) == [0] * 4 + [1] * 4 + [2] * 4
+
+
+def test_recorder_grows() -> None:
+    records = recorder.Recorder({"walkers": np.int64, "steps": np.int64})
+    for step in range(1000):
+        records.record(walkers=np.arange(5), steps=step)
+    assert len(records) == 5000
+    assert np.all(records.get_column("steps") == np.repeat(np.arange(1000),
+                                                           5))
+    assert np.all(records.get_column("walkers") == np.tile(np.arange(5),
+                                                           1000))
@@ -0,0 +1,150 @@
+import concurrent.futures
+import functools
+import multiprocessing
+import random
+import sys
+
+import numpy as np
+import pytest
+
+import main
+import stats
+import board
+import ensemble
+import walker
+
+"""
+Testing the simulations runner
+"""
+
+
+def run_simulations(tmp_path, workers: int, seed: int):
+    walkers = [walker.RandomDirectionWalker2D() for _ in range(3)] + \
+        [walker.RegularDiscreteWalker2D() for _ in range(2)]
+    runner = main.SimulationRunner(walkers, board.Board2D([], []), 20,
+                                   "DistanceStats", str(tmp_path) + "/",
+                                   workers, seed)
+    runner.run_simulations(6)
+    return runner._dfs["DistanceStats"]
+
+
+def test_runner_parallel_matches_serial(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    serial_df = run_simulations(tmp_path, 1, 7)
+    parallel_df = run_simulations(tmp_path, 3, 7)
+    assert len(serial_df) == 2 * 21
+    assert serial_df.equals(parallel_df)
+
+
+def test_runner_parallel_population_spawn(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    # the workers start without the type codes registered in this process
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor",
+                        functools.partial(
+                            concurrent.futures.ProcessPoolExecutor,
+                            mp_context=multiprocessing.get_context("spawn")))
+    walkers = [walker.RandomDirectionWalker2D() for _ in range(3)] + \
+        [walker.RegularDiscreteWalker2D() for _ in range(2)]
+    runner = main.SimulationRunner(ensemble.Population2D(walkers),
+                                   board.Board2D([], []), 20,
+                                   "DistanceStats", str(tmp_path) + "/", 2, 7)
+    runner.run_simulations(4)
+    df = runner._dfs["DistanceStats"]
+    assert set(df["walkers"]) == {"RandomDirectionWalker2D",
+                                  "RegularDiscreteWalker2D"}
+    assert len(df) == 2 * 21
+
+
+def test_runner_independent_seeds(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    first_df = run_simulations(tmp_path, 1, 7)
+    second_df = run_simulations(tmp_path, 1, 8)
+    assert not first_df.equals(second_df)
+
+
+def test_runner_replicas(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    walkers = [walker.RandomDirectionWalker2D() for _ in range(5)]
+    runner = main.SimulationRunner(walkers, board.Board2D([], []), 20,
+                                   "DistanceStats", str(tmp_path) + "/",
+                                   seed=3, replicas_memory=0.05)
+    runner.run_simulations(100)
+    replicas_df = runner._dfs["DistanceStats"]
+    serial_df = run_simulations(tmp_path, 1, 3)
+    assert list(replicas_df.columns) == list(serial_df.columns)
+    assert len(replicas_df) == 21
+    # the mean distance after n unit steps is about sqrt(pi * n) / 2
+    assert abs(replicas_df["distance"].iloc[-1] - (3.14 * 20) ** 0.5 / 2) \
+        < 0.3
+
+
+def test_runner_replicas_chunks() -> None:
+    walkers = [walker.RandomDirectionWalker2D() for _ in range(5)]
+    walker_bytes = main.REPLICA_WALKER_BYTES + \
+        stats.DistanceStats.get_walker_bytes(20)
+    # the memory cap fits 3 replicas and a half
+    runner = main.SimulationRunner(walkers, board.Board2D([], []), 20,
+                                   "DistanceStats", "",
+                                   replicas_memory=3.5 * 5 * walker_bytes /
+                                   2 ** 20)
+    assert runner._SimulationRunner__get_replicas(10) == [3, 3, 3, 1]
+
+
+def test_runner_several_stats(tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    walkers = [walker.RegularDiscreteWalker2D() for _ in range(4)]
+    stats_types = ["DistanceStats", "DistanceAxisStats", "CrossStats"]
+    runner = main.SimulationRunner(walkers, board.Board2D([], []), 10,
+                                   stats_types, str(tmp_path) + "/", seed=1)
+    runner.run_simulations(3)
+    assert list(runner._dfs) == stats_types
+    assert "distance" in runner._dfs["DistanceStats"]
+    assert "distance_to_axis_x" in runner._dfs["DistanceAxisStats"]
+    assert "cross_num" in runner._dfs["CrossStats"]
+    for stats_type in stats_types:
+        assert (tmp_path / f"\\{stats_type}_results_csv.csv").exists()
+    # the same walks are given to every stats type
+    single = main.SimulationRunner(walkers, board.Board2D([], []), 10,
+                                   "DistanceStats", str(tmp_path) + "/",
+                                   seed=1)
+    single.run_simulations(3)
+    assert single._dfs["DistanceStats"].equals(runner._dfs["DistanceStats"])
+
+
+def test_run_simulation_resets_walkers() -> None:
+    walkers = [walker.RandomDirectionWalker2D() for _ in range(3)]
+    population = ensemble.Population2D(
+        [walker.RegularDiscreteWalker2D() for _ in range(3)])
+    for walkers_group in (walkers, population):
+        first_df, = main._run_simulation(walkers_group, board.Board2D([], []),
+                                         10, ["DistanceStats"],
+                                         np.random.SeedSequence(5))
+        assert all(np.all(r_walker.get_location() == 0)
+                   for r_walker in walkers_group)
+        # the reset walkers run the same simulation again
+        second_df, = main._run_simulation(walkers_group,
+                                          board.Board2D([], []), 10,
+                                          ["DistanceStats"],
+                                          np.random.SeedSequence(5))
+        assert first_df.equals(second_df)
+        assert first_df["distance"].iloc[-1] > 0
+
+
+def test_run_simulation_keeps_random_module() -> None:
+    walkers = [walker.RandomDirectionWalker2D() for _ in range(3)]
+    random.seed(11)
+    state = random.getstate()
+    main._run_simulation(walkers, board.Board2D([], []), 10,
+                         ["DistanceStats"], np.random.SeedSequence(5))
+    assert random.getstate() == state
+    assert all(r_walker.get_random() is random for r_walker in walkers)
+
+
+def test_parse_args_rejects_no_workers(monkeypatch) -> None:
+    monkeypatch.setattr(sys, "argv", ["main.py", "-d", "config.json",
+                                      "-w", "0"])
+    with pytest.raises(SystemExit):
+        main.parse_args()
+    monkeypatch.setattr(sys, "argv", ["main.py", "-d", "config.json",
+                                      "-w", "2"])
+    assert main.parse_args().workers == 2
@@ -0,0 +1,73 @@
+import numpy as np
+
+import board
+import sampling
+import simulation
+import stats
+import walker
+
+"""
+Testing the sampling module
+"""
+
+
+def test_schedules() -> None:
+    stride = sampling.StrideSchedule(10)
+    assert [step for step in range(35) if stride.is_sampled(step)] == \
+        [0, 10, 20, 30]
+    assert stride.get_samples_num(34) == 4
+    steps = sampling.StepsListSchedule([3, 7, 100])
+    assert [step for step in range(10) if steps.is_sampled(step)] == [3, 7]
+    assert steps.get_samples_num(50) == 2
+    geometric = sampling.GeometricSchedule(2)
+    assert [step for step in range(40) if geometric.is_sampled(step)] == \
+        [0, 1, 2, 4, 8, 16, 32]
+    assert geometric.get_samples_num(1000) == 11
+
+
+def test_simulator_skips_steps() -> None:
+    walkers = [walker.RandomDirectionWalker2D() for _ in range(3)]
+    loger = stats.DistanceStats(100, schedule=sampling.StrideSchedule(25))
+    calls = []
+
+    def callback(walkers_data, steps_num):
+        calls.append(steps_num)
+        loger.get_data(walkers_data, steps_num)
+
+    simulator = simulation.StepsNumSimulator2D(walkers, board.Board2D([], []),
+                                               100)
+    simulator.set_schedule(sampling.StrideSchedule(25))
+    simulator.run_simulation(callback)
+    assert calls == [0, 25, 50, 75, 100]
+    assert list(loger.get_df()["steps"]) == [0, 25, 50, 75, 100]
+
+
+def test_cross_stats_sampled_counts() -> None:
+    walkers = [walker.RegularDiscreteWalker2D() for _ in range(20)]
+    full = stats.CrossStats(200)
+    sampled = stats.CrossStats(200, schedule=sampling.GeometricSchedule(1.5))
+
+    def callback(walkers_data, steps_num):
+        full.get_data(walkers_data, steps_num)
+        sampled.get_data(walkers_data, steps_num)
+
+    simulation.StepsNumSimulator2D(walkers, board.Board2D([], []),
+                                   200).run_simulation(callback)
+    full_df = full.get_df().set_index("steps")
+    sampled_df = sampled.get_df().set_index("steps")
+    assert len(sampled_df) < len(full_df)
+    assert np.allclose(sampled_df["cross_num"],
+                       full_df.loc[sampled_df.index, "cross_num"])
+
+
+def test_schedules_next_step() -> None:
+    schedules = [sampling.SamplingSchedule(), sampling.StrideSchedule(7),
+                 sampling.StepsListSchedule([3, 40, 41, 90]),
+                 sampling.GeometricSchedule(1.3)]
+    for schedule in schedules:
+        sampled = [step for step in range(200) if schedule.is_sampled(step)]
+        for step in range(95):
+            following = [sampled_step for sampled_step in sampled
+                         if sampled_step > step]
+            assert schedule.get_next_step(step) == \
+                (following[0] if following else None)
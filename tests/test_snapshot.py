@@ -0,0 +1,60 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import board
+import ensemble
+import simulation
+import walker
+
+"""
+Testing the snapshot of the simulation
+"""
+
+
+@pytest.mark.parametrize("use_ensemble", [False, True])
+def test_snapshot_refreshed_in_place(use_ensemble: bool) -> None:
+    walkers = [walker.RandomDirectionWalker2D() for _ in range(3)] + \
+        [walker.RegularDiscreteWalker2D() for _ in range(2)]
+    if use_ensemble:
+        walkers = ensemble.Population2D(walkers)
+    simulator = simulation.StepsNumSimulator2D(walkers, board.Board2D([], []),
+                                               5)
+    positions = []
+
+    def callback(snapshot: simulation.Snapshot, steps_num: int) -> None:
+        positions.append(snapshot.get_positions())
+        assert not snapshot.get_positions().flags.writeable
+        expected = np.array([r_walker.get_location()
+                             for r_walker in simulator._walkers])
+        assert np.all(snapshot.get_positions() == expected)
+
+    simulator.run_simulation(callback, snapshot=True)
+    snapshot = simulator.get_snapshot()
+    # the same array is refreshed on every step
+    assert all(position is positions[0] for position in positions)
+    assert len(positions) == 6
+    assert list(snapshot.get_ids()) == [r_walker.get_id()
+                                        for r_walker in simulator._walkers]
+    assert len(set(snapshot.get_ids())) == 5
+    assert list(walker.WALKER_TYPES.get_names(snapshot.get_types())) == \
+        ["RandomDirectionWalker2D"] * 3 + ["RegularDiscreteWalker2D"] * 2
+    assert list(snapshot.get_replicas()) == [0] * 5
+    assert snapshot.get_uuids() == [r_walker.get_uuid()
+                                    for r_walker in simulator._walkers]
+
+
+def test_snapshot_refresh_does_not_copy_population() -> None:
+    population = ensemble.Population2D(
+        [walker.RandomDirectionWalker2D() for _ in range(20000)] +
+        [walker.RegularDiscreteWalker2D() for _ in range(20000)])
+    snapshot = simulation.Snapshot(population)
+    board.Board2D([], []).move_walkers(population)
+    tracemalloc.start()
+    snapshot.refresh(population)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # the locations are written into the positions, with no (N, 2) copy
+    assert peak < len(population) * 8
+    assert np.all(snapshot.get_positions() == population.get_locations())
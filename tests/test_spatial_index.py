@@ -0,0 +1,220 @@
+import numpy as np
+
+import board
+import ensemble
+import magical_gates
+import obstacles
+import spatial_index
+import walker
+
+
+def test_bounding_boxes() -> None:
+    assert list(obstacles.ObstacleCircle(2, [1, 1], 0).get_bounding_box()) \
+           == [-1, -1, 3, 3]
+    assert list(obstacles.ObstacleRectangle(
+        3, 4, [1, 1], 0).get_bounding_box()) == [1, 1, 4, 5]
+    assert list(magical_gates.GateCircle(
+        1, [0, 0], [5, 5]).get_bounding_box()) == [-1, -1, 1, 1]
+    assert list(magical_gates.GateRectangle(
+        2, 2, [0, 0], [5, 5]).get_bounding_box()) == [0, 0, 2, 2]
+
+
+def test_uniform_grid_candidates() -> None:
+    shapes = [obstacles.ObstacleCircle(1, [x, y], 0)
+              for x in range(0, 100, 5) for y in range(0, 100, 5)]
+    grid = spatial_index.UniformGrid(shapes)
+    rng = np.random.default_rng(0)
+    for location in rng.uniform(-5, 105, (500, 2)):
+        candidates = grid.get_candidates(location)
+        assert len(candidates) <= 4
+        expected = [shape for shape in shapes
+                    if shape.is_location_in_obstacle(location)]
+        found = [shape for shape in candidates
+                 if shape.is_location_in_obstacle(location)]
+        assert found == expected
+
+
+def test_uniform_grid_keeps_order() -> None:
+    shapes = [magical_gates.GateRectangle(10, 10, [0, 0], [i, i])
+              for i in range(3)]
+    grid = spatial_index.UniformGrid(shapes, cell_size=1)
+    assert grid.get_candidates(np.array([5, 5])) == shapes
+    assert grid.get_candidates(np.array([50, 5])) == []
+
+
+def test_uniform_grid_large_shape() -> None:
+    shapes = [obstacles.ObstacleCircle(10000, [0, 0], 0),
+              obstacles.ObstacleCircle(1, [0, 0], 0)]
+    grid = spatial_index.UniformGrid(shapes)
+    assert grid.get_cell_size() >= 20000 / spatial_index.MAX_CELLS_PER_SHAPE
+    assert shapes[0] in grid.get_candidates(np.array([9000, 0]))
+
+
+def test_uniform_grid_first_shapes() -> None:
+    rng = np.random.default_rng(1)
+    shapes = [magical_gates.GateCircle(r, c, [0, 0]) for r, c in
+              zip(rng.uniform(0.5, 5, 40), rng.uniform(-20, 20, (40, 2)))]
+    grid = spatial_index.UniformGrid(shapes)
+    locations = rng.uniform(-25, 25, (1000, 2))
+    first_shapes = grid.get_first_shapes(
+        locations, lambda shape, batch: shape.are_locations_in_gate(batch))
+    for location, first_shape in zip(locations, first_shapes):
+        expected = [index for index, shape in enumerate(shapes)
+                    if shape.is_location_in_gate(location)]
+        assert first_shape == (expected[0] if expected else -1)
+
+
+def test_board_check_next_steps() -> None:
+    simulation_board = board.Board2D(
+        [{"type": "circle", "radius": 3, "center": [0, 10], "charge": 0},
+         {"type": "rectangle", "width": 4, "height": 4,
+          "start_point": [10, 0], "charge": 0}],
+        [{"type": "circle", "radius": 2, "center": [0, 10],
+          "end_point": [-5, -5]},
+         {"type": "rectangle", "width": 2, "height": 2,
+          "start_point": [20, 20], "end_point": [1, 1]}])
+    locations = np.zeros((4, 2))
+    optional_locations = np.array([[0.0, 10.0], [0.0, 12.5], [11.0, 1.0],
+                                   [21.0, 21.0]])
+    next_steps = simulation_board.check_next_steps(locations,
+                                                   optional_locations)
+    # gate first, then obstacle
+    assert list(next_steps[0]) == [-5, -5]
+    assert list(next_steps[1]) == [0, 0]
+    assert list(next_steps[2]) == [0, 0]
+    assert list(next_steps[3]) == [1, 1]
+
+
+def test_board_big_steps_do_not_tunnel() -> None:
+    simulation_board = board.Board2D(
+        [{"type": "rectangle", "width": 0.1, "height": 20,
+          "start_point": [5, -10], "charge": 0}],
+        [{"type": "circle", "radius": 0.2, "center": [0, 8],
+          "end_point": [-5, -5]}])
+    locations = np.zeros((3, 2))
+    optional_locations = np.array([[10.0, 0.0], [0.0, 10.0], [-10.0, 0.0]])
+    next_steps = simulation_board.check_big_steps(locations,
+                                                  optional_locations)
+    # stopped just before the thin obstacle
+    assert 4.99 < next_steps[0][0] < 5
+    # teleported by the small gate on the way
+    assert list(next_steps[1]) == [-5, -5]
+    # nothing on the way
+    assert list(next_steps[2]) == [-10, 0]
+
+
+def test_board_big_steps_first_hit() -> None:
+    simulation_board = board.Board2D(
+        [{"type": "circle", "radius": 1, "center": [6, 0], "charge": 0}],
+        [{"type": "circle", "radius": 1, "center": [3, 0],
+          "end_point": [-5, -5]},
+         {"type": "rectangle", "width": 1, "height": 1,
+          "start_point": [8, 0], "end_point": [7, 7]}])
+    next_steps = simulation_board.check_big_steps(
+        np.array([[0.0, 0.0], [10.0, 0.5]]),
+        np.array([[10.0, 0.0], [0.0, 0.5]]))
+    assert list(next_steps[0]) == [-5, -5]
+    assert list(next_steps[1]) == [7, 7]
+
+
+def test_lattice_steps_match_float_steps() -> None:
+    simulation_board = board.Board2D(
+        [{"type": "circle", "radius": 3, "center": [4, 0], "charge": 0},
+         {"type": "rectangle", "width": 20, "height": 2,
+          "start_point": [-10, 3], "charge": 0}],
+        [{"type": "rectangle", "width": 2, "height": 2,
+          "start_point": [-3, -3], "end_point": [10, 10]}])
+    assert simulation_board.get_lattice_map() is not None
+    rng = np.random.default_rng(1)
+    locations = rng.integers(-12, 12, (2000, 2)).astype(np.int32)
+    optional_locations = locations + np.array(
+        [[1, 0], [-1, 0], [0, 1], [0, -1]], dtype=np.int32)[
+        rng.integers(4, size=2000)]
+    lattice_steps = simulation_board.check_lattice_steps(locations,
+                                                         optional_locations)
+    float_steps = simulation_board.check_next_steps(
+        locations.astype(float), optional_locations.astype(float))
+    assert lattice_steps.dtype == np.int32
+    assert np.all(lattice_steps == float_steps)
+
+
+def test_lattice_map_needs_lattice_board() -> None:
+    thin_board = board.Board2D([{"type": "rectangle", "width": 0.5,
+                                 "height": 10, "start_point": [2.2, -5],
+                                 "charge": 0}], [])
+    off_lattice_board = board.Board2D([], [{"type": "circle", "radius": 2,
+                                            "center": [5, 5],
+                                            "end_point": [0.5, 0]}])
+    assert thin_board.get_lattice_map() is None
+    assert off_lattice_board.get_lattice_map() is None
+    assert board.Board2D([], []).can_check_lattice()
+
+
+def test_distance_field_lower_bound() -> None:
+    shapes = [obstacles.ObstacleCircle(2, [0, 0], 0),
+              obstacles.ObstacleRectangle(3, 1, [5, -4], 0),
+              magical_gates.GateCircle(1, [-6, 3], [0, 10])]
+    boxes = np.array([shape.get_bounding_box() for shape in shapes])
+
+    def get_exact_distances(points):
+        return np.min([shape.get_signed_distances(points)
+                       for shape in shapes], axis=0)
+
+    field = spatial_index.DistanceField(
+        [-10, -10, 10, 10], 0.5, boxes, lambda shape, points:
+        shapes[shape].get_signed_distances(points), 4)
+    points = np.random.default_rng(1).uniform(-20, 20, (5000, 2))
+    distances = field.get_distances(points)
+    exact_distances = get_exact_distances(points)
+    inside = np.all(np.abs(points) <= 10, axis=1)
+    assert np.all(distances <= exact_distances + 10 ** -12)
+    # in the extent, the error is at most a cell diagonal
+    close = inside & (exact_distances < 3)
+    assert np.all(exact_distances[close] - distances[close] <=
+                  0.5 * np.sqrt(2) + 10 ** -12)
+    assert np.all(distances[inside & ~close] >= 3 - 0.5 * np.sqrt(2))
+    # out of the extent, the distance is exact, or beyond max_distance
+    outside = np.any(np.abs(points) > 10.5, axis=1) & (distances < 4)
+    assert np.all(np.abs(distances[outside] - exact_distances[outside]) <
+                  10 ** -12)
+
+
+def test_board_skips_far_walkers_checks() -> None:
+    simulation_board = board.Board2D(
+        [{"type": "circle", "radius": 2, "center": [3, 0], "charge": 0},
+         {"type": "rectangle", "width": 4, "height": 2,
+          "start_point": [-6, -5], "charge": 0}],
+        [{"type": "circle", "radius": 1.5, "center": [-4, 4],
+          "end_point": [8, 8]}], distance_field={})
+    rng = np.random.default_rng(2)
+    locations = rng.uniform(-10, 10, (3000, 2))
+    locations = locations[~simulation_board.check_if_locations_in_obstacle(
+        locations) & (simulation_board.get_gates_of_locations(locations) < 0)]
+    populations = []
+    for _ in range(2):
+        walkers = [walker.RandomDirectionWalker2D() for _ in locations]
+        for random_walker, location in zip(walkers, locations):
+            random_walker.set_state(location)
+        populations.append(ensemble.Population2D(walkers))
+        populations[-1].set_rng(np.random.default_rng(3))
+    simulation_board.move_walkers(populations[0])
+    optional_locations = populations[1].get_ensembles()[0].optional_steps(
+        np.zeros((len(locations), 2)))
+    assert np.all(populations[0].get_locations() ==
+                  simulation_board.check_next_steps(locations,
+                                                    optional_locations))
+    assert np.any(simulation_board.get_distances(locations) > 1)
+
+
+def test_board_without_distance_field_checks_every_step() -> None:
+    simulation_board = board.Board2D(
+        [{"type": "circle", "radius": 2, "center": [3, 0], "charge": 0}], [])
+    walkers = [walker.RandomDirectionWalker2D() for _ in range(20)]
+    for index, random_walker in enumerate(walkers):
+        random_walker.set_state([-10, index])
+    simulation_board.move_walkers(walkers)
+    simulation_board.move_walkers(ensemble.Population2D(
+        [walker.RandomDirectionWalker2D() for _ in range(20)]))
+    assert simulation_board._Board2D__distance_field is None
+    assert np.all(simulation_board.get_distances(np.array([[-10, 0]])) > 1)
+    assert simulation_board._Board2D__distance_field is not None
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import sampling
+import stats
+import walker
+
+"""
+Testing the stats module
+"""
+
+
+def test_cross_stats_skips_zero_y() -> None:
+    r_walker = walker.RegularDiscreteWalker2D()
+    loger = stats.CrossStats(6)
+    for step, y in enumerate([1, 0, -1, 0, -2, 3, -1]):
+        r_walker.set_next_step(np.array([0, y]))
+        r_walker.walk()
+        loger.get_data([r_walker], step)
+    df = loger.get_df()
+    # the crossing at the last step is not counted
+    assert list(df["steps"]) == [0, 1, 2, 3, 4, 5]
+    assert list(df["cross_num"]) == [0, 0, 1, 1, 1, 2]
+
+
+def test_radius_stats_first_steps() -> None:
+    r_walker = walker.RandomDirectionWalker2D()
+    loger = stats.RadiusStats(4)
+    for step, x in enumerate([0, 1.5, 3.2, 2.9, 1.1, 5]):
+        r_walker.set_next_step(np.array([x, 0]))
+        r_walker.walk()
+        loger.get_data([r_walker], step)
+    df = loger.get_df()
+    assert list(df["radius"]) == [0, 1, 2, 3]
+    assert list(df["steps"]) == [0, 1, 3, 2]
+
+
+@pytest.mark.parametrize("stats_type, row_bytes", [
+    (stats.DistanceStats, 4 + 8 + 8),
+    (stats.DistanceAxisStats, 4 + 8 + 8 + 8),
+    (stats.CrossStats, 4 + 8 + 4),
+    (stats.RadiusStats, 4 + 4 + 8)])
+def test_stats_walker_bytes(stats_type, row_bytes) -> None:
+    copies = stats.RECORD_COPIES
+    assert stats_type._get_row_bytes() == row_bytes
+    walker_bytes = stats_type.get_walker_bytes(100)
+    if stats_type is stats.RadiusStats:
+        # the first steps up to the radius, and a row for each radius
+        assert walker_bytes == 101 * 8 + 101 * row_bytes * copies
+        return
+    extra_bytes = 8 + 4 if stats_type is stats.CrossStats else 0
+    assert walker_bytes == extra_bytes + 101 * row_bytes * copies
+    # only the sampled steps are recorded
+    assert stats_type.get_walker_bytes(
+        100, sampling.StrideSchedule(10)) == \
+        extra_bytes + 11 * row_bytes * copies
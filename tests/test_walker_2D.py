@@ -98,3 +98,26 @@ def test_charged_walker_given_location():
     coordinates_1, coordinates_2 = random_walker_pos.get_location(), random_walker_neg.get_location()
     assert np.linalg.norm(coordinates_1 - coordinates_2) < start_distance
 
+
+
+def test_walker_ids_and_type_codes() -> None:
+    first = walker.RandomDirectionWalker2D()
+    second = walker.RandomDirectionWalker2D()
+    weighted = walker.WeightedDiscreteWalker2D({"direction": "up",
+                                                "weight": 0.5})
+    assert first.get_id() != second.get_id()
+    assert first.get_type_code() == second.get_type_code()
+    assert weighted.get_type_code() != first.get_type_code()
+    assert walker.WALKER_TYPES.get_name(weighted.get_type_code()) == \
+        "WeightedDiscreteWalker2Dup0.5"
+
+
+def test_weighted_walker_direction_toward_origin() -> None:
+    weighted = walker.WeightedDiscreteWalker2D({"direction": "origin",
+                                                "weight": 1})
+    weighted.set_state(np.array([3.0, 4.0]))
+    for _ in range(3):
+        weighted.optional_step()
+        weighted.walk()
+    # a full weight toward the origin always steps toward it
+    assert np.allclose(weighted.get_location(), [1.2, 1.6])
@@ -1,15 +1,56 @@
+import bisect
+import itertools
 import random
 import math
 import typing
-import uuid
 import numpy as np
 import obstacles
+import forces
+
+
+class WalkerTypes:
+    """
+    This class is a registry of the walkers' types, which gives every type
+    name (e.g. WeightedDiscreteWalker2Dup0.5) a small integer code, so the
+    types can be stored in integer arrays and named only for the output.
+    """
+
+    def __init__(self) -> None:
+        self.__codes: dict[str, int] = {}
+        self.__names: list[str] = []
+
+    def get_code(self, name: str) -> int:
+        """
+        This method returns the code of the type name, registering it if
+        it is new.
+        """
+        if name not in self.__codes:
+            self.__codes[name] = len(self.__names)
+            self.__names.append(name)
+        return self.__codes[name]
+
+    def get_name(self, code: int) -> str:
+        """
+        This method returns the name of the type code.
+        """
+        return self.__names[code]
+
+    def get_names(self, codes: np.ndarray) -> np.ndarray:
+        """
+        This method returns the names of an array of type codes.
+        """
+        return np.array(self.__names, dtype=object)[codes]
+
+
+WALKER_TYPES = WalkerTypes()
 
 
 class Walker:
     """
     This class represents a walker.
     """
+    # the ids of the walkers, in their creation order
+    _ids = itertools.count()
 
     def __init__(self) -> None:
         """
@@ -17,9 +58,12 @@ class Walker:
         Most of the methods are not implemented, Do not use this class directly.
         """
         self._step: float = 0
-        self._uuid = str(uuid.uuid4())
+        self._id = next(Walker._ids)
         self._charge: float = 0
         self._type = "Walker"
+        # the walker draws from the random module, unless it was given its
+        # own generator
+        self._random: typing.Optional[random.Random] = None
 
     def get_charge(self) -> float:
         """
@@ -33,11 +77,38 @@ class Walker:
         """
         return self._type
 
+    def get_id(self) -> int:
+        """
+        This method returns the integer id of the walker.
+        """
+        return self._id
+
+    def get_type_code(self) -> int:
+        """
+        This method returns the code of the walker's type.
+        """
+        return WALKER_TYPES.get_code(self._type)
+
     def get_uuid(self) -> str:
         """
-        This method returns the uuid of the walker.
+        This method returns the unique name of the walker, for display. It
+        is built from its type and id on every call, and is not stored.
         """
-        return f"{self._type}_{self._uuid}"
+        return f"{self._type}_{self._id}"
+
+    def get_random(self) -> typing.Any:
+        """
+        This method returns the generator the walker draws from: its own,
+        or the random module.
+        """
+        return self._random if self._random is not None else random
+
+    def set_random(self, rng: typing.Optional[random.Random]) -> None:
+        """
+        This method gives the walker its own generator, or returns it to
+        the random module if rng is None.
+        """
+        self._random = rng
 
     def set_next_step(self, new_next_step: np.ndarray) -> None:
         """
@@ -64,6 +135,23 @@ class Walker:
     def restart(self) -> None:
         raise NotImplementedError("This method is not implemented")
 
+    def get_state(self) -> typing.Any:
+        raise NotImplementedError("This method is not implemented")
+
+    def set_state(self, state: typing.Any) -> None:
+        raise NotImplementedError("This method is not implemented")
+
+    def can_walk_on_spheres(self) -> bool:
+        """
+        This method returns True if the walker makes unit steps in uniform
+        directions, so its steps inside a sphere can be drawn at once (see
+        simulation.OriginDistanceSimulator2D).
+        """
+        return False
+
+    def jump(self, vector: np.ndarray) -> None:
+        raise NotImplementedError("This method is not implemented")
+
     def optional_step(self, *args) -> np.ndarray:
         raise NotImplementedError("This method is not implemented")
 
@@ -90,6 +178,20 @@ class Walker2D(Walker):
         """
         self._location = np.zeros(2)
 
+    def get_state(self) -> np.ndarray:
+        """
+        This method returns the state of the walker (its location), to
+        restore it later with set_state.
+        """
+        return self._location.copy()
+
+    def set_state(self, state: np.ndarray) -> None:
+        """
+        This method restores a state returned by get_state.
+        """
+        self._location = state.copy()
+        self._next_step = self._location
+
     def get_location(self) -> np.ndarray:
         """
         This method returns the current location of the walker.
@@ -103,6 +205,14 @@ class Walker2D(Walker):
         """
         self._next_step = new_next_step
 
+    def jump(self, vector: np.ndarray) -> None:
+        """
+        This method moves the walker by the vector at once, without
+        validating it.
+        """
+        self._location = self._location + vector
+        self._next_step = self._location
+
 
 class ContinuousWalker2D(Walker2D):
     """
@@ -165,11 +275,14 @@ class RandomDirectionWalker2D(ContinuousWalker2D):
         self._step = 1.0
         self._type = "RandomDirectionWalker2D"
 
+    def can_walk_on_spheres(self) -> bool:
+        return True
+
     def _get_direction(self, *args) -> float:
         """
         This method returns random direction in radians.
         """
-        return random.uniform(0, 2) * math.pi
+        return self.get_random().uniform(0, 2) * math.pi
 
     def _get_step(self) -> float:
         """
@@ -192,7 +305,7 @@ class RandomDirectionStepWalker2D(ContinuousWalker2D):
         """
         This method returns random direction in radians.
         """
-        return random.uniform(0, 2) * math.pi
+        return self.get_random().uniform(0, 2) * math.pi
 
     def _get_step(self) -> float:
         self.__choose_step()
@@ -202,7 +315,7 @@ class RandomDirectionStepWalker2D(ContinuousWalker2D):
         """
         This method chooses the step size - between 0.5 and 1.5.
         """
-        self._step = random.uniform(0.5, 1.5)
+        self._step = self.get_random().uniform(0.5, 1.5)
 
 
 class RegularDiscreteWalker2D(DiscreteWalker2D):
@@ -218,7 +331,7 @@ class RegularDiscreteWalker2D(DiscreteWalker2D):
         self._type = "RegularDiscreteWalker2D"
 
     def _get_direction(self, *args) -> np.ndarray:
-        return random.choice(RegularDiscreteWalker2D.angles)
+        return self.get_random().choice(RegularDiscreteWalker2D.angles)
 
     def _get_step(self) -> float:
         return self._step
@@ -231,20 +344,27 @@ class WeightedDiscreteWalker2D(DiscreteWalker2D):
     down, left, right, toward origin), when the options are weighted
     differently.
     """
+    angles = {"up": np.array([0, 1]), "down": np.array([0, -1]),
+              "left": np.array([-1, 0]), "right": np.array([1, 0]),
+              "origin": np.zeros(2)}
+    # the cumulative weights of the directions, by weighted direction and
+    # weight, so they are built once for all the walkers of a type
+    _cumulative_weights: dict[tuple[str, float], list[float]] = {}
 
     def __init__(self, *args):
         super().__init__()
 
-        self.__angles = {"up": np.array([0, 1]), "down": np.array([0, -1]),
-                         "left": np.array([-1, 0]), "right": np.array([1, 0]), "origin": np.zeros(2)}
+        self.__angles = list(WeightedDiscreteWalker2D.angles.values())
+        self.__origin_index = list(
+            WeightedDiscreteWalker2D.angles.keys()).index("origin")
 
         self._step: float = 1
         self._next_step = np.zeros(2)
-        if args[0]["direction"] in self.__angles.keys():
+        if args[0]["direction"] in WeightedDiscreteWalker2D.angles.keys():
             self.__direction = args[0]["direction"]
         else:
             raise ValueError("direction must be in " + str(
-                self.__angles.keys()))
+                WeightedDiscreteWalker2D.angles.keys()))
 
         if 0 <= args[0]["weight"] <= 1:
             self.__weighted_percent = args[0]["weight"]
@@ -252,29 +372,62 @@ class WeightedDiscreteWalker2D(DiscreteWalker2D):
             raise ValueError("weight must be between 0 and 1")
 
         self._type = f"WeightedDiscreteWalker2D{self.__direction}{self.__weighted_percent}"
+        self.__cumulative_weights = self.get_cumulative_weights()
+
+    def get_direction(self) -> str:
+        """
+        This method returns the weighted direction of the walker.
+        """
+        return self.__direction
+
+    def get_weight(self) -> float:
+        """
+        This method returns the weight of the weighted direction.
+        """
+        return self.__weighted_percent
 
     def __get_weights(self) -> list[float]:
         """
         This method returns the weights of the directions.
         """
-        usual_percent = (1 - self.__weighted_percent) / (len(self.__angles.keys()) - 1)
+        directions = WeightedDiscreteWalker2D.angles.keys()
+        usual_percent = (1 - self.__weighted_percent) / (len(directions) - 1)
         return [self.__weighted_percent if (direction == self.__direction)
-                else usual_percent for direction in self.__angles.keys()]
+                else usual_percent for direction in directions]
 
-    def __get_direction_toward_origin(self) -> None:
+    def get_cumulative_weights(self) -> list[float]:
+        """
+        This method returns the cumulative weights of the directions, in the
+        order of angles. The table is built once per weighted direction and
+        weight.
+        """
+        key = (self.__direction, self.__weighted_percent)
+        if key not in WeightedDiscreteWalker2D._cumulative_weights:
+            WeightedDiscreteWalker2D._cumulative_weights[key] = list(
+                itertools.accumulate(self.__get_weights()))
+        return WeightedDiscreteWalker2D._cumulative_weights[key]
+
+    def __get_direction_toward_origin(self) -> np.ndarray:
         """
         This method returns the direction toward the origin, based on the current location.
         """
         delta = np.linalg.norm(self._location)
-        self.__angles['origin'] = self._location / -delta if delta != 0 else\
-            np.zeros(2)
+        return self._location / -delta if delta != 0 else np.zeros(2)
 
     def _get_direction(self, *args) -> np.ndarray:
         """
-        This method returns the direction of the walker.
+        This method returns the direction of the walker, drawn from the
+        cumulative weights (like random.choices does with cum_weights).
+        Only the direction toward the origin depends on the location, so it
+        is computed only when it is drawn.
         """
-        self.__get_direction_toward_origin()
-        return random.choices(list(self.__angles.values()), self.__get_weights())[0]
+        index = bisect.bisect(self.__cumulative_weights,
+                              self.get_random().random() *
+                              self.__cumulative_weights[-1],
+                              0, len(self.__cumulative_weights) - 1)
+        if index == self.__origin_index:
+            return self.__get_direction_toward_origin()
+        return self.__angles[index]
 
     def _get_step(self) -> float:
         return self._step
@@ -288,44 +441,36 @@ class IonWalker2D(ContinuousWalker2D):
         super().__init__()
         self._charge = values["charge"]
         self.__step: float = 2
-        self.__uuid = str(uuid.uuid4())
         self._next_step = np.zeros(2)
         self._type = f"IonWalker2DCharge{self._charge}"
 
     def _get_step(self) -> float:
         return self.__step
 
-    def __get_object_attraction(self, obj: typing.Union[Walker, obstacles.Obstacle])\
+    def _get_direction(self, walkers: list[Walker],
+                       obstacles_list: list[obstacles.Obstacle],
+                       attraction: typing.Optional[np.ndarray] = None) \
             -> np.ndarray:
         """
-        This method returns the attraction direction of the walker to another
-        object.
-        """
-        if obj.get_charge() != 0:
-            direction = self._location - obj.get_location()
-            if np.linalg.norm(direction) != 0:
-                norm_direction = direction / np.linalg.norm(direction)
-            else:
-                norm_direction = direction
-            if np.dot(direction, direction) > 1:
-                return (norm_direction *
-                              ((obj.get_charge() * self._charge) /
-                               (np.dot(direction, direction))))
-        return np.zeros(2)
-
-    def _get_direction(self, walkers: list[Walker], obstacles: list[obstacles.Obstacle]) -> np.ndarray:
-        """
         This method returns the direction of the walker, based on the
         attraction to other charged walkers and obstacles.
         This method is based on Coulomb's law (F = k * q1 * q2 / r^2).
-        """
-        direction = np.zeros(2)
-        for walker in walkers:
-            if walker.get_uuid() != self.__uuid:
-                direction += self.__get_object_attraction(walker)
-        for obstacle in obstacles:
-            direction += self.__get_object_attraction(obstacle)
-        return direction
+        If the attraction was already computed for the whole board, it is
+        used as is.
+        """
+        if attraction is not None:
+            return attraction
+        if self._charge == 0:
+            return np.zeros(2)
+        sources = [obj for obj in list(walkers) + list(obstacles_list)
+                   if obj.get_charge() != 0]
+        sources_locations = np.array([obj.get_location() for obj in sources],
+                                     dtype=float).reshape(-1, 2)
+        sources_charges = np.array([obj.get_charge() for obj in sources],
+                                   dtype=float)
+        return forces.get_direct_attractions(
+            self._location[np.newaxis, :], np.array([self._charge]),
+            sources_locations, sources_charges)[0]
 
     def optional_step(self, *args) -> np.ndarray:
         """
@@ -334,10 +479,9 @@ class IonWalker2D(ContinuousWalker2D):
         walkers and obstacles, and a random direction.
         """
         step = self._get_step()
-        random_direction = random.uniform(0, 2) * math.pi
+        random_direction = self.get_random().uniform(0, 2) * math.pi
         random_direction_array = np.array([math.cos(random_direction),
                                      math.sin(random_direction)])
         direction = self._get_direction(*args)
         self._next_step = self._location + direction * step + random_direction_array
         return self._next_step
-